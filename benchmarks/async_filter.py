@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+"""
+Compares the throughput of `afilter_queryset` against `filter_queryset` wrapped in `sync_to_async`
+when many searches run concurrently on the same event loop.
+
+Usage: python benchmarks/async_filter.py [--concurrency 50] [--requests 2000] [--rows 5000]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import Request, setup  # noqa: E402
+
+
+def get_filter_class():
+    from drf_search import aio, fields, filters
+
+    class ArticleSearchFilter(aio.AsyncSearchFilterMixin, filters.BaseSearchFilter):
+        title = fields.SearchField("title", default=True)
+        body = fields.SearchField("body", default=True)
+        id = fields.IntegerSearchField("id")
+    return ArticleSearchFilter
+
+
+async def run(concurrency, requests, search):
+    from asgiref.sync import sync_to_async
+    from tests.models import Article
+    filter_class = get_filter_class()
+
+    def sync_search(request):
+        return list(filter_class().filter_queryset(request, Article.objects.all())[:20])
+
+    async def async_search(request):
+        queryset = await filter_class().afilter_queryset(request, Article.objects.all())
+        return await filter_class.aevaluate(queryset[:20])
+
+    wrapped_search = sync_to_async(sync_search)
+    results = dict()
+    for name, handler in (("sync_to_async(filter_queryset)", wrapped_search), ("afilter_queryset", async_search)):
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def bounded(request):
+            async with semaphore:
+                return await handler(request)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(bounded(Request(search)) for _ in range(requests)))
+        elapsed = time.perf_counter() - start
+        results[name] = requests / elapsed
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--search", default="title: blue, train")
+    args = parser.parse_args()
+
+    setup(args.rows)
+    results = asyncio.run(run(args.concurrency, args.requests, args.search))
+    for name, throughput in results.items():
+        print("{:<32} {:>10.1f} searches/s".format(name, throughput))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Shared setup of the benchmarks: a throwaway SQLite database of synthetic articles, users and contributors"""
+import os
+import random
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "tests.test_settings")
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+WORDS = [
+    "blue", "train", "kind", "giant", "steps", "miles", "sketches", "spain", "round", "midnight",
+    "bitches", "brew", "love", "supreme", "moanin", "time", "out", "saxophone", "colossus", "mingus",
+    "ah", "um", "somethin", "else", "speak", "no", "evil", "maiden", "voyage", "idle", "moments",
+]
+BATCH_SIZE = 10000
+
+
+class Request(object):
+    """The part of a DRF request that the search filters read"""
+
+    def __init__(self, search, **params):
+        params["search"] = search
+        self.query_params = params
+
+
+def setup_django(database=None):
+    """Points the test settings at a SQLite file, so that every thread sees the same data, and sets up Django"""
+    settings.DATABASES["default"]["NAME"] = database or os.path.join(tempfile.mkdtemp(), "benchmark.sqlite3")
+    django.setup()
+
+
+def create_tables():
+    from django.core.management import call_command
+    call_command("migrate", run_syncdb=True, verbosity=0)
+
+
+def populate(rows, seed=0, users=None, contributors=None):
+    """
+    Fills the database with `rows` articles made of random words.
+    Every article has a random user, and one in every ten articles has a random contributor.
+
+    :param rows (int): the amount of articles to create
+    :param seed (int): the seed of the random data, so that every run searches the same data
+    """
+    from django.contrib.auth.models import User
+    from tests.models import Article, Contributor
+
+    generator = random.Random(seed)
+    users = users or max(1, rows // 100)
+    contributors = contributors or max(1, rows // 100)
+    User.objects.bulk_create(
+        (User(username="user{}".format(i), email="user{}@{}.com".format(i, generator.choice(WORDS)))
+         for i in range(users)), batch_size=BATCH_SIZE)
+    Contributor.objects.bulk_create(
+        (Contributor(display_name=" ".join(generator.sample(WORDS, 2)).title()) for _ in range(contributors)),
+        batch_size=BATCH_SIZE)
+    user_ids = list(User.objects.values_list("pk", flat=True))
+    contributor_ids = list(Contributor.objects.values_list("pk", flat=True))
+
+    for start in range(0, rows, BATCH_SIZE):
+        Article.objects.bulk_create(
+            Article(title=" ".join(generator.sample(WORDS, generator.randint(2, 5))).title(),
+                    body=" ".join(generator.choice(WORDS) for _ in range(generator.randint(10, 40))),
+                    user_id=generator.choice(user_ids))
+            for _ in range(min(BATCH_SIZE, rows - start)))
+
+    through = Article.contributors.through
+    article_ids = list(Article.objects.values_list("pk", flat=True)[::10])
+    through.objects.bulk_create(
+        (through(article_id=article_id, contributor_id=generator.choice(contributor_ids))
+         for article_id in article_ids), batch_size=BATCH_SIZE)
+
+
+def setup(rows, seed=0, database=None):
+    """Sets up Django on a new database with `rows` synthetic articles"""
+    setup_django(database)
+    create_tables()
+    populate(rows, seed=seed)
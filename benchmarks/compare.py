@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+"""
+Compares two result files of `benchmarks/suite.py`, and exits with 1 if any benchmark regressed.
+
+Usage: python benchmarks/compare.py before.json after.json [--metric p50] [--threshold 10]
+"""
+import argparse
+import json
+import sys
+
+LOWER_IS_BETTER = ("mean", "min", "p50", "p90", "p99", "max")
+
+
+def load(path):
+    with open(path) as results:
+        data = json.load(results)
+    return data["meta"], dict(((result["benchmark"], result["corpus"]), result) for result in data["results"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--metric", default="p50", choices=LOWER_IS_BETTER + ("ops_per_sec",))
+    parser.add_argument("--threshold", type=float, default=10.0, help="the change in percent that is a regression")
+    args = parser.parse_args()
+
+    before_meta, before = load(args.before)
+    after_meta, after = load(args.after)
+    print("before: {} ({} rows)".format(before_meta.get("commit"), before_meta.get("rows")))
+    print("after:  {} ({} rows)".format(after_meta.get("commit"), after_meta.get("rows")))
+    print("{:<18} {:<9} {:>14} {:>14} {:>9}".format("benchmark", "corpus", "before", "after", "change"))
+
+    regressions = 0
+    for key in sorted(set(before) & set(after)):
+        old, new = before[key][args.metric], after[key][args.metric]
+        change = (new - old) / old * 100 if old else 0.0
+        if args.metric in LOWER_IS_BETTER:
+            regressed = change > args.threshold
+        else:
+            regressed = change < -args.threshold
+        regressions += regressed
+        print("{:<18} {:<9} {:>14.6g} {:>14.6g} {:>+8.1f}%{}".format(
+            key[0], key[1], old, new, change, "  REGRESSED" if regressed else ""))
+    for key in sorted(set(before) ^ set(after)):
+        print("{:<18} {:<9} only in {}".format(key[0], key[1], "before" if key in before else "after"))
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
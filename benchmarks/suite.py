@@ -0,0 +1,231 @@
+#!/usr/bin/env python
+"""
+Benchmarks the stages of a search against a SQLite database of synthetic articles:
+    `split_terms`: parsing the search string into field and term associations
+    `filter_searching`: parsing and validating the search terms
+    `filter_queryset`: the whole search, including evaluating the first page of results
+
+Every stage is run against generated corpora of search strings (short, long, fielded, aliased, list and regex),
+and reported as ops/sec and latency percentiles. The results can be written as JSON and compared across
+commits with `benchmarks/compare.py`.
+
+Usage:
+    python benchmarks/suite.py --rows 100000 --output before.json
+    python benchmarks/suite.py --rows 100000 --output after.json
+    python benchmarks/compare.py before.json after.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import ROOT, WORDS, Request, setup  # noqa: E402
+
+STAGES = ("split_terms", "filter_searching", "filter_queryset")
+CORPORA = ("short", "long", "fielded", "aliased", "list", "regex", "mixed")
+
+
+def get_filter_class(extra_fields=0):
+    """
+    Builds a filter class with a field of every kind, and `extra_fields` more generated fields
+    to measure how the amount of fields affects a search.
+    """
+    from drf_search import fields, filters
+
+    attrs = {
+        "title": fields.SearchField("title", default=True),
+        "body": fields.SearchField("body", default=True),
+        "title_exact": fields.ExactSearchField("title", match_case=False),
+        "title_start": fields.SearchField("title", field_lookup="istartswith"),
+        "id": fields.IntegerSearchField("id", default=True, aliases="pk"),
+        "titles": fields.ListSearchField("title"),
+        "email": fields.EmailSearchField("user__email", default=True, aliases="@"),
+        "author": fields.StringSearchField("user__username", aliases=["by", "user"]),
+        "contributor": fields.SearchField("contributors__display_name", aliases="with"),
+        "regex": fields.RegexSearchField("title", match_case=False),
+    }
+    lookups = ("icontains", "istartswith", "iexact", "iendswith")
+    for index in range(extra_fields):
+        attrs["extra{}".format(index)] = fields.SearchField(
+            ("title", "body")[index % 2], field_lookup=lookups[index % len(lookups)],
+            default=index % 3 == 0, aliases="x{}".format(index))
+    return type(str("BenchmarkSearchFilter"), (filters.BaseSearchFilter,), attrs)
+
+
+def generate_corpus(kind, size, seed=0, rows=1000):
+    """
+    Generates `size` search strings of the given kind
+
+    Example:
+        short -> 'blue'
+        long -> 'blue, kind of, train, ...'
+        fielded -> 'title: blue train, body: miles'
+        aliased -> '@: user3@blue.com, by: user4'
+        list -> 'titles: ["Blue Train"]'
+        regex -> 'regex: ^blue.*train'
+    """
+    generator = random.Random("{}-{}".format(seed, kind))
+    word = lambda: generator.choice(WORDS)  # noqa: E731
+
+    def short():
+        return word()
+
+    def long():
+        return ", ".join(" ".join(word() for _ in range(generator.randint(1, 3))) for _ in range(8))
+
+    def fielded():
+        return ", ".join("{}: {} {}".format(generator.choice(["title", "body", "title_start", "contributor"]),
+                                            word(), word()) for _ in range(generator.randint(1, 3)))
+
+    def aliased():
+        return ", ".join(generator.choice([
+            "@: user{}@{}.com".format(generator.randint(0, rows // 100), word()),
+            "by: user{}".format(generator.randint(0, rows // 100)),
+            "pk: {}".format(generator.randint(1, rows)),
+            "with: {}".format(word())]) for _ in range(generator.randint(1, 3)))
+
+    def list_():
+        # search terms are separated by commas, so a list can only ever hold a single value
+        return "titles: [{}]".format(json.dumps(" ".join(generator.sample(WORDS, 2)).title()))
+
+    def regex():
+        return "regex: ^{}.*{}".format(word(), word())
+
+    def mixed():
+        return generator.choice([short, long, fielded, aliased, list_, regex])()
+
+    make = {"short": short, "long": long, "fielded": fielded, "aliased": aliased, "list": list_,
+            "regex": regex, "mixed": mixed}[kind]
+    return list(make() for _ in range(size))
+
+
+def percentile(ordered, percent):
+    """Returns the nearest-rank percentile of a sorted list"""
+    if not ordered:
+        return None
+    rank = max(0, min(len(ordered) - 1, int(round(percent / 100.0 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+def summarize(latencies, elapsed):
+    ordered = sorted(latencies)
+    return {
+        "ops": len(ordered),
+        "ops_per_sec": len(ordered) / elapsed if elapsed else None,
+        "mean": sum(ordered) / len(ordered),
+        "min": ordered[0],
+        "p50": percentile(ordered, 50),
+        "p90": percentile(ordered, 90),
+        "p99": percentile(ordered, 99),
+        "max": ordered[-1],
+    }
+
+
+def get_stage(stage, filter_class, page_size):
+    from tests.models import Article
+
+    if stage == "split_terms":
+        return lambda request: filter_class().split_terms(request)
+    if stage == "filter_searching":
+        return lambda request: filter_class().filter_searching(request)
+    return lambda request: list(filter_class().filter_queryset(request, Article.objects.all())[:page_size])
+
+
+def run_benchmark(stage, corpus, filter_class, iterations, warmup, page_size):
+    """Runs the stage `iterations` times over the corpus, after running it `warmup` times"""
+    from rest_framework.exceptions import ParseError
+
+    run = get_stage(stage, filter_class, page_size)
+    requests = list(Request(search) for search in corpus)
+    for index in range(warmup):
+        try:
+            run(requests[index % len(requests)])
+        except ParseError:
+            pass
+
+    latencies = list()
+    start = time.perf_counter()
+    for index in range(iterations):
+        request = requests[index % len(requests)]
+        before = time.perf_counter()
+        try:
+            run(request)
+        except ParseError:
+            pass  # searches that are not valid for any field are still measured
+        latencies.append(time.perf_counter() - before)
+    return summarize(latencies, time.perf_counter() - start)
+
+
+def get_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=ROOT).decode("utf-8").strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000, help="the amount of synthetic articles")
+    parser.add_argument("--seed", type=int, default=0, help="the seed of the data and the corpora")
+    parser.add_argument("--database", help="reuse a SQLite file that was populated with the same rows and seed")
+    parser.add_argument("--extra-fields", type=int, default=20, help="fields added to the filter class")
+    parser.add_argument("--corpus-size", type=int, default=200, help="search strings per corpus")
+    parser.add_argument("--iterations", type=int, default=2000, help="runs per parsing benchmark")
+    parser.add_argument("--query-iterations", type=int, default=200, help="runs per filter_queryset benchmark")
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--page-size", type=int, default=20, help="results evaluated by filter_queryset")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--corpora", nargs="+", choices=CORPORA, default=list(CORPORA))
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.database and os.path.exists(args.database):
+        from benchmarks.common import setup_django
+        setup_django(args.database)
+    else:
+        setup(args.rows, seed=args.seed, database=args.database)
+    print("set up {} rows in {:.1f}s".format(args.rows, time.perf_counter() - start), file=sys.stderr)
+
+    import django
+    filter_class = get_filter_class(args.extra_fields)
+    results = list()
+    print("{:<18} {:<9} {:>12} {:>10} {:>10} {:>10}".format("benchmark", "corpus", "ops/sec", "p50 ms", "p90 ms",
+                                                            "p99 ms"))
+    for stage in args.stages:
+        iterations = args.query_iterations if stage == "filter_queryset" else args.iterations
+        for kind in args.corpora:
+            corpus = generate_corpus(kind, args.corpus_size, seed=args.seed, rows=args.rows)
+            result = run_benchmark(stage, corpus, filter_class, iterations, args.warmup, args.page_size)
+            result.update(benchmark=stage, corpus=kind)
+            results.append(result)
+            print("{:<18} {:<9} {:>12.1f} {:>10.3f} {:>10.3f} {:>10.3f}".format(
+                stage, kind, result["ops_per_sec"], result["p50"] * 1000, result["p90"] * 1000,
+                result["p99"] * 1000))
+
+    if args.output:
+        meta = {
+            "commit": get_commit(),
+            "date": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "platform": platform.platform(),
+            "rows": args.rows,
+            "seed": args.seed,
+            "extra_fields": args.extra_fields,
+            "corpus_size": args.corpus_size,
+            "page_size": args.page_size,
+        }
+        with open(args.output, "w") as output:
+            json.dump({"meta": meta, "results": results}, output, indent=2, sort_keys=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+# coding=utf-8
+"""
+The async search path, for filters that are used from async views.
+This module requires Python 3.5+ and asgiref, and is not imported by the rest of the package.
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from collections import OrderedDict, defaultdict
+from asgiref.sync import sync_to_async
+from django.db.models import QuerySet
+from rest_framework.exceptions import NotFound, ParseError
+from .fields import SearchField
+from .query import LeafNode
+from .signals import SearchMetrics, search_finished
+from .validators import SearchTerm, is_async_validator
+
+
+async def avalidate(search_field, search_term):
+    """
+    Determines whether the `search_term` passes every validator of the field, awaiting the async validators.
+    Sync validators are called inline, as they should never do any I/O.
+    The result of every validator is remembered on the term, just like `SearchTerm.validate`.
+    Fields that override `is_valid` are validated with it instead.
+    """
+    if not isinstance(search_term, SearchTerm):
+        search_term = SearchTerm(search_term)
+    if type(search_field).is_valid is not SearchField.is_valid:
+        return search_field.is_valid(search_term)  # the field validates the term its own way
+    for validator in search_field._validators:
+        if not is_async_validator(validator):
+            is_valid = search_term.validate(validator)
+        else:
+            is_valid = search_term._results.get(validator)
+            if is_valid is None:
+                is_valid = search_term._results[validator] = bool(await validator(search_term))
+        if not is_valid:
+            return False
+    return True
+
+
+async def _call_cache(cache, name, *args):
+    """Calls the async version of a cache method, which is only available on Django 4.0+"""
+    method = getattr(cache, "a{}".format(name), None)
+    if method is None:
+        return await sync_to_async(getattr(cache, name))(*args)
+    return await method(*args)
+
+
+async def aget_version(result_cache, model):
+    """Returns the current version of the model's data in a `SearchResultCache`"""
+    key = result_cache._version_key(model)
+    await _call_cache(result_cache.cache, "add", key, 1, None)
+    return await _call_cache(result_cache.cache, "get", key, 1)
+
+
+async def aevaluate(queryset):
+    """Evaluates the queryset without blocking the event loop"""
+    if hasattr(QuerySet, "__aiter__"):  # Django 4.1+
+        return [item async for item in queryset]
+    return await sync_to_async(list)(queryset)
+
+
+class AsyncSearchFilterMixin(object):
+    """
+    Adds an async search path to a `BaseSearchFilter`, with the sync path left unchanged.
+    Parsing, the search plan cache and building the query are pure CPU work, and are shared with the sync path.
+    Validators that are coroutine functions are awaited, and the result cache and the evaluation of
+    the results use the async cache and ORM APIs, falling back to `sync_to_async` on older versions of Django.
+    The `memory_index` of the filter is loaded with `sync_to_async` before its first search.
+
+    Example:
+        class ArticleSearchFilter(AsyncSearchFilterMixin, filters.BaseSearchFilter):
+            ...
+
+        async def search(request):
+            queryset = await ArticleSearchFilter().afilter_queryset(request, Article.objects.all())
+            results = await ArticleSearchFilter.aevaluate(queryset)
+    """
+
+    async def afilter_queryset(self, request, queryset, view=None):
+        """The async equivalent of `filter_queryset`"""
+        if not search_finished.has_listeners(type(self)):
+            self.search_metrics = None
+            return await self._afilter_queryset(request, queryset, view)
+
+        self.search_metrics = metrics = SearchMetrics()
+        with metrics.phase("total"):
+            queryset = await self._afilter_queryset(request, queryset, view)
+        send = getattr(search_finished, "asend", None)  # Django 5.0+
+        if send is None:
+            search_finished.send(sender=type(self), search_filter=self, request=request, metrics=metrics)
+        else:
+            await send(sender=type(self), search_filter=self, request=request, metrics=metrics)
+        return queryset
+
+    async def _afilter_queryset(self, request, queryset, view=None):
+        if self.memory_index is not None and not self.memory_index.loaded:
+            # the index would otherwise be loaded with the sync ORM while the query is being built
+            await sync_to_async(self.memory_index.load)()
+        if self.boolean_queries:
+            return await self.afilter_boolean_search(request, queryset, view)
+
+        searches = await self.aget_search_plan(request)
+        if len(searches) < 1:
+            if len(request.query_params.get(self.search_param, "")) > 0:
+                raise ParseError("The search was not valid for any of the provided fields")
+            return queryset  # we were not searching on anything
+
+        searches = self.check_search_cost(queryset, searches)
+        if self.cache_results:
+            return await self.aget_cached_results(request, queryset, searches, view)
+        return self.search_queryset(request, queryset, searches, view)
+
+    async def afilter_boolean_search(self, request, queryset, view=None):
+        """The async equivalent of `filter_boolean_search`"""
+        tree = self.get_search_tree(request)
+        if tree is None:
+            return queryset  # we were not searching on anything
+
+        searches = list()
+        with self.measure("validate"):
+            tree = await self.avalidate_search_tree(queryset, tree, searches)
+        return self.search_boolean_tree(queryset, tree, searches)
+
+    async def avalidate_search_tree(self, queryset, node, searches):
+        """The async equivalent of `validate_search_tree`"""
+        if not isinstance(node, LeafNode):
+            children = list()
+            for child in node.children:
+                children.append(await self.avalidate_search_tree(queryset, child, searches))
+            return type(node)(*children)
+
+        leaf = list()
+        for field_names, term in self.iter_leaf_searches(node):
+            leaf.append((term, set(field.construct(term) for field in await self.avalidate_fields(field_names, term))))
+        return self.build_search_leaf(queryset, leaf, searches)
+
+    async def aget_search_plan(self, request):
+        """The async equivalent of `get_search_plan`"""
+        cache = self.get_search_plan_cache()
+        if not cache.maxsize:
+            return await self.afilter_searching(request)
+
+        key = self.get_search_plan_key(request)
+        plan = cache.get(key)
+        if plan is None:
+            plan = tuple((term, frozenset(fields)) for term, fields in await self.afilter_searching(request))
+            cache.set(key, plan)
+        return plan
+
+    async def afilter_searching(self, request):
+        """The async equivalent of `filter_searching`"""
+        searches = defaultdict(set)
+        profiles = dict()
+        with self.measure("split_terms"):
+            split_terms = self.split_terms(request)
+        for field_names, term in split_terms:
+            profile = profiles.get(term)
+            if profile is None:
+                profile = profiles[term] = SearchTerm(term)
+            with self.measure("validate"):
+                for field in await self.avalidate_fields(field_names, profile):
+                    searches[profile].add(field.construct(profile))
+        return list(searches.items())
+
+    async def avalidate_fields(self, field_names, search_term):
+        """The async equivalent of `_validate_fields`, returning a list of the valid SearchFields"""
+        if not isinstance(search_term, SearchTerm):
+            search_term = SearchTerm(search_term)
+        validated = dict()
+        valid_fields = list()
+        metrics = self.search_metrics
+        for field_name in field_names:
+            search_field = self._search_fields.get(field_name)
+            if search_field is None:
+                raise NotFound("Field '{}' is not searchable".format(field_name))
+            signature = search_field.validator_signature
+            is_valid = validated.get(signature)
+            if is_valid is None:
+                is_valid = validated[signature] = await avalidate(search_field, search_term)
+            if metrics is not None:
+                metrics.record_validation(field_name, is_valid)
+            if is_valid:
+                valid_fields.append(search_field)
+        return valid_fields
+
+    async def aget_cached_results(self, request, queryset, searches, view=None):
+        """The async equivalent of `get_cached_results`"""
+        result_cache = self.get_result_cache()
+        models = self.get_result_models(queryset, searches)
+        parts = self.get_result_key_parts(queryset, searches)
+        if parts is None:
+            return self.search_queryset(request, queryset, searches, view)
+        versions = dict()
+        for model in models:
+            versions[model] = await aget_version(result_cache, model)
+        key = result_cache.make_key(parts, versions)
+        pks = await _call_cache(result_cache.cache, "get", key)
+        if pks is None:
+            results = self.search_queryset(request, queryset, searches, view)
+            with self.measure("execute"):
+                pks = list(OrderedDict.fromkeys(await aevaluate(
+                    results.values_list("pk", flat=True)[:self.result_cache_max_results + 1])))
+            if len(pks) > self.result_cache_max_results:
+                return results
+            await _call_cache(result_cache.cache, "set", key, pks, result_cache.timeout)
+        return self.filter_by_pks(queryset, pks)
+
+    @staticmethod
+    async def aevaluate(queryset):
+        """Evaluates the searched queryset without blocking the event loop"""
+        return await aevaluate(queryset)
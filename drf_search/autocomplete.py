@@ -0,0 +1,229 @@
+# coding=utf-8
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import six
+import bisect
+import heapq
+import threading
+from collections import Counter, OrderedDict, namedtuple
+from django.db.models.constants import LOOKUP_SEP
+from django.db.models.signals import post_delete, post_save
+from .filters import SearchRequest
+
+Completion = namedtuple("Completion", ["field", "value", "count"])
+
+# sorts after every character, so that `prefix + PREFIX_END` is the upper bound of every value with the prefix
+PREFIX_END = "\U0010ffff"
+
+
+class CompletionIndex(object):
+    """
+    Holds the values of a model field as a sorted array of their lowercased values,
+    so that the values with a prefix are found by binary search,
+    along with how many rows have each value.
+
+    :attr field_name (str): The name of the model field that is being indexed
+    """
+
+    def __init__(self, field_name):
+        self.field_name = field_name
+        self.clear()
+
+    def clear(self):
+        self._rows = dict()
+        self._keys = list()
+        self._totals = dict()
+        self._spellings = dict()
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add(self, pk, value):
+        """Sets the value of a single row, replacing the value it had before"""
+        previous = self._rows.get(pk)
+        if previous == value:
+            return
+        if previous is not None:
+            self.remove(pk)
+        if value is None or value == "":
+            return
+        value = six.text_type(value)
+        self._rows[pk] = value
+        folded = value.lower()
+        total = self._totals.get(folded)
+        if total is None:
+            bisect.insort(self._keys, folded)
+            self._spellings[folded] = Counter()
+            total = 0
+        self._totals[folded] = total + 1
+        self._spellings[folded][value] += 1
+
+    def remove(self, pk):
+        """Removes the value of a single row"""
+        value = self._rows.pop(pk, None)
+        if value is None:
+            return
+        folded = value.lower()
+        self._totals[folded] -= 1
+        self._spellings[folded][value] -= 1
+        if self._spellings[folded][value] <= 0:
+            del self._spellings[folded][value]
+        if self._totals[folded] <= 0:
+            del self._totals[folded]
+            del self._spellings[folded]
+            del self._keys[bisect.bisect_left(self._keys, folded)]
+
+    def complete(self, prefix, limit=10):
+        """
+        Finds the most common values that start with the prefix, case-insensitively.
+        Every value is returned with its most common spelling.
+
+        Example:
+            input -> ('mi', 2)
+            output -> [('Miles Davis', 12), ('Mingus', 3)]
+
+        :return (list): tuples of value and the amount of rows that have it, most common first
+        """
+        prefix = six.text_type(prefix).lower()
+        start = bisect.bisect_left(self._keys, prefix)
+        end = bisect.bisect_left(self._keys, prefix + PREFIX_END, start)
+        keys = heapq.nsmallest(limit, (self._keys[position] for position in range(start, end)),
+                               key=lambda key: (-self._totals[key], key))
+        return list((self._spellings[key].most_common(1)[0][0], self._totals[key]) for key in keys)
+
+
+class Autocomplete(object):
+    """
+    Completes what is being typed into a search of a `BaseSearchFilter` from memory,
+    using the values of its fields that are declared with `autocomplete=True`.
+    The last search term of the search is completed, and a field given in it (ex: `name: Mi`) only completes
+    the values of that field, just like the search itself.
+    The values are loaded on the first completion, and are then kept up to date with the `post_save`
+    and `post_delete` signals of the model. The fields must be fields of the model itself, and not of a relation.
+
+    The values are NOT read from the queryset of the view that is searched. Without a `queryset`, the values
+    of every row of the model's table are completed, including the rows that the view would never return
+    (ex: soft-deleted or private rows). Pass the base queryset of the view to only complete the values of its rows.
+    The queryset is shared by every request, so it can not depend on the request (ex: the rows of its user).
+
+    Example:
+        autocomplete = Autocomplete(ArtistSearchFilter, Artist, Artist.objects.filter(is_public=True))
+        autocomplete.complete("name: mi", limit=2)
+        # [Completion(field='name', value='Miles Davis', count=12), Completion(field='name', value='Mingus', count=3)]
+
+    :attr filter_class: The `BaseSearchFilter` class whose search is completed
+    :attr model: The model class that is being searched
+    :attr queryset: The rows whose values are completed, or None for every row of the model
+    """
+
+    def __init__(self, filter_class, model, queryset=None):
+        self.filter_class = filter_class
+        self.model = model
+        self.queryset = queryset
+        self.loaded = False
+        self._lock = threading.RLock()
+        self._indexes = OrderedDict()
+        for search_field in filter_class._search_fields.values():
+            if search_field.autocomplete and search_field.field_name not in self._indexes:
+                if LOOKUP_SEP in search_field.field_name:
+                    raise ValueError("`{}` can not be autocompleted, as it spans a relation".format(
+                        search_field.field_name))
+                self._indexes[search_field.field_name] = CompletionIndex(search_field.field_name)
+
+    def load(self):
+        """Loads the values of every autocompleted field, and keeps them up to date from then on"""
+        field_names = list(self._indexes)
+        rows = self.get_queryset().values_list("pk", *field_names)
+        with self._lock:
+            for index in self._indexes.values():
+                index.clear()
+            for row in rows.iterator():
+                for field_name, value in zip(field_names, row[1:]):
+                    self._indexes[field_name].add(row[0], value)
+            self.loaded = True
+        self.connect()
+
+    def get_queryset(self):
+        """Returns the rows whose values are completed"""
+        if self.queryset is None:
+            return self.model._base_manager.all()
+        return self.queryset.all()
+
+    def get_field_names(self, search, request=None):
+        """
+        Determines which fields the last search term of the search completes, and what it has to complete.
+
+        Example:
+            input -> 'title: blue, name: Mi'
+            output -> (('name',), 'Mi')
+
+        :return (tuple): the names of the `SearchField`s and the prefix to complete
+        """
+        search_filter = self.filter_class()
+        tokens = list(search_filter._iter_search(SearchRequest(request, search_filter.search_param, search)))
+        if not tokens:
+            return search_filter._default_field_names, ""
+        field, term = tokens[-1]
+        return search_filter.resolve_fields(field, (term or "").lstrip())
+
+    def complete(self, search, limit=10, request=None):
+        """
+        Completes the last search term of the search with the most common values of its fields.
+
+        :param search (str): the search that is being typed
+        :param limit (int): the maximum amount of completions
+        :param request: the request of the search, if any
+        :return (list): the `Completion`s, most common first
+        """
+        field_names, prefix = self.get_field_names(search, request)
+        search_fields = self.filter_class._search_fields
+        if not self.loaded:
+            with self._lock:
+                if not self.loaded:
+                    self.load()
+
+        completions = list()
+        seen = set()
+        with self._lock:
+            for field_name in field_names:
+                search_field = search_fields.get(field_name)
+                if search_field is None or not search_field.autocomplete or search_field.field_name in seen:
+                    continue
+                seen.add(search_field.field_name)
+                completions.extend(
+                    Completion(field_name, value, count)
+                    for value, count in self._indexes[search_field.field_name].complete(prefix, limit))
+        return heapq.nsmallest(limit, completions, key=lambda completion: (-completion.count, completion.value))
+
+    def _dispatch_uid(self, signal_name):
+        return "drf_search.autocomplete.{}.{}.{}".format(self.model._meta.label_lower, id(self), signal_name)
+
+    def _on_save(self, sender, instance, **kwargs):
+        # a saved row may have left (or joined) the queryset
+        if self.queryset is not None and not self.get_queryset().filter(pk=instance.pk).exists():
+            return self._on_delete(sender, instance)
+        with self._lock:
+            for field_name, index in self._indexes.items():
+                index.add(instance.pk, getattr(instance, field_name))
+
+    def _on_delete(self, sender, instance, **kwargs):
+        with self._lock:
+            for index in self._indexes.values():
+                index.remove(instance.pk)
+
+    def connect(self):
+        """Keeps the values up to date by listening to the model's `post_save` and `post_delete` signals"""
+        post_save.connect(self._on_save, sender=self.model, weak=False, dispatch_uid=self._dispatch_uid("save"))
+        post_delete.connect(self._on_delete, sender=self.model, weak=False, dispatch_uid=self._dispatch_uid("delete"))
+
+    def disconnect(self):
+        """Stops listening to the model's signals, and drops the values until they are loaded again"""
+        post_save.disconnect(sender=self.model, dispatch_uid=self._dispatch_uid("save"))
+        post_delete.disconnect(sender=self.model, dispatch_uid=self._dispatch_uid("delete"))
+        with self._lock:
+            for index in self._indexes.values():
+                index.clear()
+            self.loaded = False
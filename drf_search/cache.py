@@ -0,0 +1,160 @@
+# coding=utf-8
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
+from django.core.cache import caches
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "evictions", "maxsize", "currsize"])
+
+
+class SearchPlanCache(object):
+    """
+    A thread-safe, bounded LRU cache for parsed search plans.
+
+    :attr maxsize (int): The maximum amount of plans to hold. A falsy value disables the cache
+    :attr hits (int): The amount of lookups that found a cached plan
+    :attr misses (int): The amount of lookups that did not find a cached plan
+    :attr evictions (int): The amount of plans that were dropped to make room for newer plans
+    """
+
+    def __init__(self, maxsize=0):
+        self.maxsize = maxsize or 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        """Returns the plan stored for `key`, marking it as the most recently used"""
+        with self._lock:
+            try:
+                value = self._data.pop(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data[key] = value
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        """Stores the plan for `key`, evicting the least recently used plan if the cache is full"""
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            if key in self._data:
+                self._data.pop(key)
+            elif len(self._data) >= self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+            self._data[key] = value
+
+    def clear(self):
+        """Drops every cached plan and resets the counters"""
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def info(self):
+        """Returns a snapshot of the cache counters"""
+        return CacheInfo(self.hits, self.misses, self.evictions, self.maxsize, len(self._data))
+
+
+_watching = set()
+_watched_lock = threading.Lock()
+
+
+def _invalidate_sender(sender, **kwargs):
+    for result_cache in list(_watching):
+        result_cache.invalidate(sender)
+
+
+class SearchResultCache(object):
+    """
+    Stores the ordered pks of search results in Django's cache framework.
+    Every cached result is keyed on the version of each model it depends on, and that version is bumped
+    whenever one of those models is saved or deleted, which invalidates every result that depended on it.
+
+    :attr alias (str): The name of the cache in the `CACHES` setting
+    :attr timeout (int): How many seconds a result is cached for
+    :attr prefix (str): The prefix of every key stored in the cache
+    """
+
+    def __init__(self, alias="default", timeout=300, prefix="drf_search"):
+        self.alias = alias
+        self.timeout = timeout
+        self.prefix = prefix
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def _version_key(self, model):
+        return "{}:version:{}.{}".format(self.prefix, model._meta.app_label, model._meta.model_name)
+
+    def get_version(self, model):
+        """Returns the current version of the model's data"""
+        key = self._version_key(model)
+        self.cache.add(key, 1, None)
+        return self.cache.get(key, 1)
+
+    def invalidate(self, model):
+        """Invalidates every cached result that depends on the model"""
+        key = self._version_key(model)
+        try:
+            self.cache.incr(key)
+        except ValueError:
+            self.cache.set(key, 2, None)
+
+    def watch(self):
+        """
+        Invalidates the results that depend on a model whenever any of its rows are saved or deleted.
+        The receivers listen to every model, as the models that a search depends on are only known once it is run,
+        and the rows may be saved by a process that never searches (ex: a worker or the admin).
+        """
+        with _watched_lock:
+            if not _watching:
+                post_save.connect(_invalidate_sender, dispatch_uid="drf_search.cache")
+                post_delete.connect(_invalidate_sender, dispatch_uid="drf_search.cache")
+                m2m_changed.connect(_invalidate_sender, dispatch_uid="drf_search.cache")
+            _watching.add(self)
+
+    def get_key(self, parts, models):
+        """Builds the key of a result from its identifying parts and the versions of the models it depends on"""
+        return self.make_key(parts, dict((model, self.get_version(model)) for model in models))
+
+    def make_key(self, parts, versions):
+        """Builds the key of a result from its identifying parts and a mapping of model to model version"""
+        versions = sorted(
+            ("{}.{}".format(model._meta.app_label, model._meta.model_name), version)
+            for model, version in versions.items())
+        digest = hashlib.sha1(repr((tuple(parts), versions)).encode("utf-8")).hexdigest()
+        return "{}:results:{}".format(self.prefix, digest)
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, pks):
+        self.cache.set(key, list(pks), self.timeout)
+
+    def __eq__(self, other):
+        return isinstance(other, SearchResultCache) and (
+            (self.alias, self.prefix) == (other.alias, other.prefix))
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((self.alias, self.prefix))
@@ -0,0 +1,22 @@
+# coding=utf-8
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+try:
+    from types import MappingProxyType as frozen_mapping
+except ImportError:  # Python 2 has no read-only mapping view
+    def frozen_mapping(mapping):
+        return mapping
+
+try:
+    from django.db import NotSupportedError
+except ImportError:  # Django < 2.0
+    from django.db import DatabaseError as NotSupportedError
+
+try:
+    from rest_framework.compat import distinct
+except ImportError:  # removed in djangorestframework 3.7
+    def distinct(queryset, base):
+        return queryset.distinct()
@@ -4,10 +4,16 @@ from __future__ import division
 from __future__ import print_function
 from __future__ import unicode_literals
 
-import re
 import six
 import inspect
-from .validators import validate_list, validate_numerical, validate_boolean, validate_email, validate_string
+from decimal import Decimal, InvalidOperation
+from .fts import FULL_TEXT_LOOKUP
+from .fuzzy import DEFAULT_MAX_DISTANCE, FUZZY_LOOKUP, FuzzyTerm
+from .trigrams import TRIGRAM_LOOKUPS
+from .validators import (COMPARISON_OPERATORS, SearchTerm, call_validator, parse_comparison, parse_json_list,
+                         validate_list, validate_numerical, validate_numerical_comparison, validate_boolean,
+                         validate_decimal, validate_decimal_comparison, validate_email, validate_string,
+                         validate_no_whitespace, validate_words)
 
 # Ref: https://docs.djangoproject.com/en/2.0/ref/models/querysets/#field-lookups
 VALID_LOOKUPS = [
@@ -21,7 +27,81 @@ VALID_LOOKUPS = [
     "in", "isnull",
     "range", "date",
     "year", "month", "week", "week_day", "quarter",
-    "time", "hour", "minute", "second"]
+    "time", "hour", "minute", "second",
+    FULL_TEXT_LOOKUP, FUZZY_LOOKUP] + sorted(TRIGRAM_LOOKUPS)  # registered by drf_search.fts, .fuzzy and .trigrams
+
+# lookups that compare text, which are always searched with the search value as it was given
+TEXT_LOOKUPS = frozenset([
+    "iexact", "contains", "icontains", "startswith", "istartswith", "endswith", "iendswith",
+    "regex", "iregex", FULL_TEXT_LOOKUP, FUZZY_LOOKUP]).union(TRIGRAM_LOOKUPS)
+
+_slot_names = dict()
+_frozen_classes = dict()
+
+
+def get_slot_names(cls):
+    """Returns the names of every slot that is declared by the class and its bases"""
+    names = _slot_names.get(cls)
+    if names is None:
+        names = list()
+        for klass in reversed(cls.__mro__):
+            slots = klass.__dict__.get("__slots__", ())
+            for name in ([slots] if isinstance(slots, six.string_types) else slots):
+                if name not in names and name not in ("__dict__", "__weakref__"):
+                    names.append(name)
+        names = _slot_names[cls] = tuple(names)
+    return names
+
+
+def _frozen_setattr(self, name, value):
+    raise AttributeError("Can not set `{}` on a frozen {}".format(name, type(self).__name__))
+
+
+def _frozen_delattr(self, name):
+    raise AttributeError("Can not delete `{}` from a frozen {}".format(name, type(self).__name__))
+
+
+def _frozen_copy(self):
+    return self  # a frozen field can never change, so its copies are the field itself
+
+
+def _frozen_reduce(self):
+    # the frozen class can not be found by its name, so the field is pickled as a mutable field and frozen again
+    return _freeze, (_thaw(self),)
+
+
+def _thaw(field):
+    """Returns a mutable copy of a frozen field, without running any of the `__init__` methods again"""
+    thawed = object.__new__(field._mutable_class)
+    for name in get_slot_names(type(field)):
+        try:
+            setattr(thawed, name, getattr(field, name))
+        except AttributeError:
+            pass  # the slot was never set
+    if hasattr(field, "__dict__"):
+        thawed.__dict__.update(field.__dict__)
+    return thawed
+
+
+def _freeze(field):
+    return field.freeze()
+
+
+def get_frozen_class(cls):
+    """Returns the immutable version of a SearchField class, which is only created once per class"""
+    frozen_class = _frozen_classes.get(cls)
+    if frozen_class is None:
+        frozen_class = _frozen_classes[cls] = type(cls)(str(cls.__name__), (cls,), {
+            "__module__": cls.__module__,
+            "__slots__": (),
+            "__setattr__": _frozen_setattr,
+            "__delattr__": _frozen_delattr,
+            "__copy__": _frozen_copy,
+            "__reduce__": _frozen_reduce,
+            "frozen": True,
+            "_mutable_class": cls,
+        })
+    return frozen_class
 
 
 class SearchField(object):
@@ -34,10 +114,22 @@ class SearchField(object):
     :attr default (bool): Determines whether this field should be used if no fields are specified during search
     :attr match_case (bool): Determines whether to use the case sensitive field lookup
     :attr aliases (list): Alternative names that can be used to refer to the SearchField
+    :attr weight (float): How much a match on this field counts towards the relevance of a result
+    :attr trigrams (bool): Determines whether a `contains` or `icontains` lookup is narrowed down with the
+                           trigram table of the model first (see `drf_search.trigrams.TrigramIndex`)
+    :attr autocomplete (bool): Determines whether the values of the field are completed by
+                               `drf_search.autocomplete.Autocomplete`
+
+    Filter classes hold frozen copies of their fields (see `freeze`), which can not be changed,
+    and which are shared with their subclasses.
     """
+    __slots__ = ("field_name", "field_lookup", "match_case", "default", "weight", "aliases", "trigrams",
+                 "autocomplete", "_validators", "_constructed")
+    frozen = False
 
     def __init__(self, field_name, field_lookup=None, validators=None,
-                 default=False, match_case=None, aliases=None, **kwargs):
+                 default=False, match_case=None, aliases=None, weight=1, trigrams=False,
+                 autocomplete=False, **kwargs):
         self.field_name = field_name
         self.field_lookup = "contains" if match_case else "icontains"
         if field_lookup is not None:
@@ -46,6 +138,9 @@ class SearchField(object):
                 self.field_lookup = field_lookup
         self.match_case = match_case
         self.default = default
+        self.weight = weight
+        self.trigrams = bool(trigrams)
+        self.autocomplete = bool(autocomplete)
         self._constructed = None
         self._validators = []
         if validators is not None:
@@ -57,16 +152,43 @@ class SearchField(object):
     def __str__(self):
         return self.constructed
 
+    def freeze(self):
+        """
+        Returns an immutable copy of the field, with its `constructed` lookup computed up front.
+        Unlike `copy.deepcopy`, none of the `__init__` methods are run again, and a frozen field is returned as is.
+        """
+        if self.frozen:
+            return self
+        frozen = object.__new__(get_frozen_class(type(self)))
+        for name in get_slot_names(type(self)):
+            try:
+                object.__setattr__(frozen, name, getattr(self, name))
+            except AttributeError:
+                pass  # the slot was never set
+        if hasattr(self, "__dict__"):  # subclasses that do not declare `__slots__`
+            object.__setattr__(frozen, "__dict__", dict(self.__dict__))
+        object.__setattr__(frozen, "_validators", tuple(self._validators))
+        object.__setattr__(frozen, "aliases", tuple(self.aliases))
+        object.__setattr__(frozen, "_constructed", self.constructed)
+        return frozen
+
     def __deepcopy__(self, *args):
-        partial = getattr(self, "partial", None)  # needed for EmailSearchField
-        return type(self)(
+        # the options of the subclasses are only passed to the subclasses that have them
+        # (`partial` for EmailSearchField, `ranges` for NumericalSearchField, `max_distance` for FuzzySearchField)
+        options = dict((name, getattr(self, name)) for name in ("partial", "ranges", "max_distance")
+                       if hasattr(self, name))
+        field_class = getattr(type(self), "_mutable_class", type(self))  # copies of frozen fields can be changed
+        return field_class(
             self.field_name,
             field_lookup=self.field_lookup,
             default=self.default,
             match_case=self.match_case,
-            partial=partial,
             validators=list(v for v in self._validators),
-            aliases=list(a for a in self.aliases))
+            aliases=list(a for a in self.aliases),
+            weight=self.weight,
+            trigrams=self.trigrams,
+            autocomplete=self.autocomplete,
+            **options)
 
     @property
     def constructed(self):
@@ -75,16 +197,57 @@ class SearchField(object):
             field_lookup = ""
             if self.field_lookup:
                 field_lookup = "__{}".format(self.field_lookup)
+                transforms, _, lookup = self.field_lookup.rpartition("__")
+                if self.trigrams and "trigram_{}".format(lookup) in TRIGRAM_LOOKUPS:
+                    # the trigram table narrows down the rows before the lookup is run
+                    field_lookup = "__{}trigram_{}".format(transforms + "__" if transforms else "", lookup)
             self._constructed = "{field}{lookup}".format(field=self.field_name, lookup=field_lookup)
         return self._constructed
 
+    @property
+    def lookups(self):
+        """All of the constructed field lookups that `construct` can return"""
+        return (self.constructed,)
+
+    def construct(self, search_value):
+        """Returns the constructed field lookup that a valid search value is searched with"""
+        return self.constructed
+
+    @property
+    def validator_signature(self):
+        """
+        Fields that share the same signature will always agree on whether a search value is valid,
+        as they share their `is_valid` method and their validators.
+        """
+        return (six.get_unbound_function(type(self).is_valid),) + tuple(self._validators)
+
     def is_valid(self, search_value):
         """Determines whether the `search_value` passes every validators for this field"""
-        return all(validator(search_value) for validator in self._validators)
+        if isinstance(search_value, SearchTerm):
+            return all(search_value.validate(validator) for validator in self._validators)
+        return all(call_validator(validator, search_value) for validator in self._validators)
+
+    @property
+    def compares_text(self):
+        """Determines whether the lookup of the field compares text, rather than the field's own type"""
+        return self.field_lookup.rpartition("__")[2] in TEXT_LOOKUPS if self.field_lookup else False
+
+    def to_python(self, search_value):
+        """
+        Converts a valid search value into the value that the field lookup is searched with.
+        Only called on search values that passed `is_valid`.
+
+        Example:
+            input -> '42' (for an `IntegerSearchField`)
+            output -> 42
+        """
+        return search_value
 
 
 class ExactSearchField(SearchField):
     """SearchField for searching by `exact` or `iexact`"""
+    __slots__ = ()
+
     def __init__(self, field_name, match_case=True, **kwargs):
         kwargs["field_lookup"] = "exact" if match_case else "iexact"
         super(ExactSearchField, self).__init__(field_name, match_case=match_case, **kwargs)
@@ -92,6 +255,8 @@ class ExactSearchField(SearchField):
 
 class StringSearchField(SearchField):
     """SearchField that validates the search value as a strictly non-numerical string"""
+    __slots__ = ()
+
     def __init__(self, field_name, **kwargs):
         super(StringSearchField, self).__init__(field_name, **kwargs)
         self._validators = [validate_string] + self._validators
@@ -99,6 +264,8 @@ class StringSearchField(SearchField):
 
 class RegexSearchField(SearchField):
     """SearchField for searching by `regex` or `iregex`"""
+    __slots__ = ()
+
     def __init__(self, field_name, match_case=True, **kwargs):
         kwargs["field_lookup"] = "regex" if match_case else "iregex"
         super(RegexSearchField, self).__init__(field_name, match_case=match_case, **kwargs)
@@ -111,6 +278,8 @@ class EmailSearchField(SearchField):
     :attr partial (bool): Determines whether to allow searching by partial or full emails
                           If False, a validator that matches the search value as an email will be added
     """
+    __slots__ = ("partial",)
+
     def __init__(self, field_name, partial=False, match_case=False, **kwargs):
         if partial is False:
             kwargs["field_lookup"] = "exact" if match_case else "iexact"
@@ -118,16 +287,94 @@ class EmailSearchField(SearchField):
             kwargs["field_lookup"] = "contains" if match_case else "icontains"
         super(EmailSearchField, self).__init__(field_name, match_case=match_case, **kwargs)
         self.partial = partial
-        self._validators.append(lambda x: not re.search(r"\s", x.strip()))
+        self._validators.append(validate_no_whitespace)
         if self.partial is False:
             self._validators = [validate_email] + self._validators
 
 
-class IntegerSearchField(SearchField):
-    """SearchField that validates the search value as a strictly numerical value"""
-    def __init__(self, field_name, field_lookup="exact", **kwargs):
-        super(IntegerSearchField, self).__init__(field_name, field_lookup=field_lookup, **kwargs)
-        self._validators = [validate_numerical] + self._validators
+class NumericalSearchField(SearchField):
+    """
+    The base SearchField for numbers, which searches for integers unless a subclass overrides
+    its validators and `to_number`.
+    With `ranges=True`, it also searches for comparisons and ranges of numbers
+    with the `gt`, `gte`, `lt`, `lte` and `range` lookups, so that the database can scan an index
+    instead of matching every value:
+        `>500`, `>=500`, `<10`, `<=10`, `100..200`
+
+    :attr ranges (bool): Determines whether comparisons and ranges can be searched
+    """
+    __slots__ = ("ranges",)
+    number_validator = staticmethod(validate_numerical)
+    comparison_validator = staticmethod(validate_numerical_comparison)
+    comparison_lookups = tuple(lookup for _, lookup in COMPARISON_OPERATORS) + ("range",)
+
+    def __init__(self, field_name, field_lookup="exact", ranges=False, **kwargs):
+        super(NumericalSearchField, self).__init__(field_name, field_lookup=field_lookup, **kwargs)
+        self.ranges = ranges
+        validator = self.comparison_validator if ranges else self.number_validator
+        self._validators = [validator] + self._validators
+
+    def to_number(self, value):
+        """Converts a single number, raising ValueError if it is not one"""
+        return int(value)
+
+    def get_comparison(self, search_value):
+        if not self.ranges:
+            return None
+        if isinstance(search_value, SearchTerm):
+            return search_value.comparison
+        return parse_comparison(search_value)
+
+    @property
+    def lookups(self):
+        lookups = (self.constructed,)
+        if self.ranges:
+            lookups += tuple("{}__{}".format(self.field_name, lookup) for lookup in self.comparison_lookups)
+        return lookups
+
+    def construct(self, search_value):
+        comparison = self.get_comparison(search_value)
+        if comparison is None:
+            return self.constructed
+        return "{}__{}".format(self.field_name, comparison[0])
+
+    def to_python(self, search_value):
+        try:
+            comparison = self.get_comparison(search_value)
+            if comparison is not None:
+                lookup, value = comparison
+                if lookup == "range":
+                    return sorted(self.to_number(operand) for operand in value)  # `200..100` is `100..200`
+                return self.to_number(value)
+            if self.compares_text:
+                return search_value
+            return self.to_number(search_value)
+        except (TypeError, ValueError):
+            return search_value  # left to the database (ex: digits that are not decimal, such as `²`)
+
+
+class IntegerSearchField(NumericalSearchField):
+    """
+    SearchField that validates the search value as a strictly numerical value
+    (or a comparison or range of them, with `ranges=True`)
+    """
+    __slots__ = ()
+
+
+class DecimalSearchField(NumericalSearchField):
+    """
+    SearchField that validates the search value as a decimal value (ex: `-1.5`)
+    (or a comparison or range of them, with `ranges=True`)
+    """
+    __slots__ = ()
+    number_validator = staticmethod(validate_decimal)
+    comparison_validator = staticmethod(validate_decimal_comparison)
+
+    def to_number(self, value):
+        try:
+            return Decimal(value.strip() if isinstance(value, six.string_types) else value)
+        except InvalidOperation:
+            raise ValueError("`{}` is not a decimal".format(value))
 
 
 class BooleanSearchField(SearchField):
@@ -135,15 +382,81 @@ class BooleanSearchField(SearchField):
     SearchField that validates the search value as a boolean value
     The following will be valid, as well as their case-insensitive equivalent:
         `True`, `False`, `1`, `0`
+    With the default `iexact` lookup, valid search values are searched with the `exact` lookup and a real boolean,
+    as the text of a boolean column (ex: `1` on SQLite) never matches `true`.
     """
+    __slots__ = ()
+
     def __init__(self, field_name, field_lookup="iexact", **kwargs):
         super(BooleanSearchField, self).__init__(field_name, field_lookup=field_lookup, **kwargs)
         self._validators = [validate_boolean] + self._validators
 
+    @property
+    def lookups(self):
+        lookups = (self.constructed,)
+        if self.field_lookup == "iexact":
+            lookups += ("{}__exact".format(self.field_name),)
+        return lookups
+
+    def construct(self, search_value):
+        if self.field_lookup == "iexact":
+            return "{}__exact".format(self.field_name)
+        return self.constructed
+
+    def to_python(self, search_value):
+        compares_text = self.compares_text and self.field_lookup != "iexact"  # `iexact` is searched with `exact`
+        if compares_text or not isinstance(search_value, six.string_types):
+            return search_value
+        return search_value.lower() in ("true", "1")
+
 
 class ListSearchField(SearchField):
     """SearchField that expects a list as the search value"""
+    __slots__ = ()
+
     def __init__(self, field_name, **kwargs):
         kwargs["field_lookup"] = "in"
         super(ListSearchField, self).__init__(field_name, **kwargs)
         self._validators = [validate_list] + self._validators
+
+    def to_python(self, search_value):
+        if isinstance(search_value, SearchTerm):
+            values = search_value.json_list  # already parsed by `validate_list`
+        elif isinstance(search_value, six.string_types):
+            values = parse_json_list(search_value)
+        else:
+            values = search_value
+        return search_value if values is None else list(values)
+
+
+class FullTextSearchField(SearchField):
+    """
+    SearchField for searching against the SQLite FTS5 table of the model using the `fts` lookup
+    The table is created and kept in sync by `drf_search.fts.FullTextIndex`
+    """
+    __slots__ = ()
+
+    def __init__(self, field_name, **kwargs):
+        kwargs["field_lookup"] = FULL_TEXT_LOOKUP
+        super(FullTextSearchField, self).__init__(field_name, **kwargs)
+        self._validators = [validate_words] + self._validators
+
+
+class FuzzySearchField(SearchField):
+    """
+    SearchField for searching by values that are within a few edits of the search value, using the `fuzzy` lookup
+    (ex: `Mils Davis` matches `Miles Davis`)
+    The search value is resolved to the matching values with the BK-tree of `drf_search.fuzzy.FuzzyIndex`
+
+    :attr max_distance (int): The maximum amount of single character edits between the search value and a value
+    """
+    __slots__ = ("max_distance",)
+
+    def __init__(self, field_name, max_distance=DEFAULT_MAX_DISTANCE, **kwargs):
+        kwargs["field_lookup"] = FUZZY_LOOKUP
+        super(FuzzySearchField, self).__init__(field_name, **kwargs)
+        self.max_distance = DEFAULT_MAX_DISTANCE if max_distance is None else max_distance
+        self._validators = [validate_words] + self._validators
+
+    def to_python(self, search_value):
+        return FuzzyTerm(search_value, self.max_distance)
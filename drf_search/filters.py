@@ -4,31 +4,58 @@ from __future__ import division
 from __future__ import print_function
 from __future__ import unicode_literals
 
-import re
 import six
-import copy
 import operator
 import functools
 import rest_framework.filters
-import rest_framework.compat
-from django.db.models import Q
+from django.db import connections
+from django.core.exceptions import EmptyResultSet
+from django.db.models import BooleanField, Case, Count, Exists, FloatField, IntegerField, OuterRef, Q, Value, When
 from collections import OrderedDict, defaultdict
 from rest_framework.exceptions import NotFound, ParseError
+from .cache import SearchPlanCache, SearchResultCache
+from .compat import distinct, frozen_mapping
 from .fields import SearchField
+from .fts import FULL_TEXT_LOOKUP, full_text_rank
+from .validators import SearchTerm
+from .lexer import compile_field_pattern, parse_boolean_search, tokenize, unquote
+from .query import (REGEX_LOOKUPS, AndNode, LeafNode, OrNode, SearchCost, compile_search, count_clauses,
+                    crosses_to_many, joined_models, never, optimize_q, query_key, query_lookups, related_models,
+                    relation_paths, simplify_search)
+from .signals import NULL_PHASE, SearchMetrics, search_finished
+from .streaming import iter_keyset
+from .trigrams import TRIGRAM_LOOKUPS
 
 
 class SearchFilterMetaclass(type):
     def __new__(mcs, name, bases, attrs):
-        attrs["_search_fields"] = mcs._get_search_fields(bases, attrs)
-        return super(SearchFilterMetaclass, mcs).__new__(mcs, name, bases, attrs)
+        search_fields = OrderedDict(
+            (six.text_type(field_name), field) for field_name, field
+            in mcs._get_search_fields(bases, attrs).items())
+        # the field metadata is frozen here so that the request path only ever does lookups
+        attrs["_search_fields"] = frozen_mapping(search_fields)
+        attrs["_search_field_names"] = frozenset(search_fields.keys())
+        attrs["_default_field_names"] = tuple(
+            field_name for field_name, field in search_fields.items() if field.default is True)
+        attrs["_constructed_fields"] = frozen_mapping(dict(
+            (lookup, field) for field in reversed(list(search_fields.values())) for lookup in field.lookups))
+        new_class = super(SearchFilterMetaclass, mcs).__new__(mcs, name, bases, attrs)
+        # every class gets its own plan cache so that subclasses never share plans
+        new_class._search_plan_cache = SearchPlanCache(getattr(new_class, "search_plan_cache_size", 0))
+        new_class._field_pattern = compile_field_pattern(getattr(new_class, "field_regex", r"([\w]+\:)"))
+        new_class._relation_cache = dict()
+        if getattr(new_class, "cache_results", False):
+            # the results are invalidated from the moment the class is defined, even in processes that never search
+            SearchResultCache(new_class.result_cache_alias, new_class.result_cache_timeout).watch()
+        return new_class
 
     @classmethod
     def _get_search_fields(cls, bases, attrs):
-        """Grabs a copy of all the `SearchField` classes that are associated with the class"""
+        """Grabs a frozen copy of all the `SearchField` classes that are associated with the class"""
         fields = list()
         for field_name, obj in attrs.items():
             if isinstance(obj, SearchField):
-                neu = copy.deepcopy(obj)
+                neu = obj.freeze()
                 fields.append((field_name, neu))
                 for alias in neu.aliases:
                     if alias not in list(name for name, _ in fields):
@@ -41,7 +68,10 @@ class SearchFilterMetaclass(type):
             base_fields = list()
             if hasattr(base, "_search_fields"):
                 field_names = list(name for name, _ in fields)
-                for field_name, obj in base._search_fields:
+                base_search_fields = base._search_fields
+                if hasattr(base_search_fields, "items"):
+                    base_search_fields = base_search_fields.items()
+                for field_name, obj in base_search_fields:
                     if field_name not in field_names:
                         base_fields.append((field_name, obj))
                     for alias in obj.aliases:
@@ -52,41 +82,844 @@ class SearchFilterMetaclass(type):
         return OrderedDict(fields)
 
 
+class SearchRequest(object):
+    """
+    Stands in for a request, with its search replaced by another search string.
+    Every other attribute is read from the original request, if there is one.
+    """
+
+    def __init__(self, request, search_param, search):
+        self._request = request
+        params = getattr(request, "query_params", None)
+        params = params.copy() if params is not None else dict()
+        params[search_param] = search
+        self.query_params = params
+
+    def __getattr__(self, name):
+        if self._request is None:
+            raise AttributeError(name)
+        return getattr(self._request, name)
+
+
 @six.add_metaclass(SearchFilterMetaclass)
 class BaseSearchFilter(rest_framework.filters.SearchFilter):
+    """
+    :attr field_regex (str): The pattern used to find the field names within the search string
+    :attr search_plan_cache_size (int): The maximum amount of parsed searches to remember for this class
+                                        If 0, the parsed searches are not cached
+    :attr full_text_ordering (bool): Determines whether to order the results by the bm25 rank of
+                                     the `FullTextSearchField` matches
+    :attr use_exists_subqueries (bool): Determines whether fields that span a to-many relation are searched
+                                        with correlated `EXISTS` subqueries instead of joins,
+                                        which removes the need to call `queryset.distinct()`
+    :attr use_union_queries (bool): Determines whether paginated searches combine the fields of a term
+                                    with a UNION of per-field subqueries instead of an OR
+    :attr rank_results (bool): Determines whether to order the results by their `search_rank`,
+                               which is computed from the weight of the fields that matched
+    :attr lookup_weights (dict): How much a match with each lookup counts towards the `search_rank`
+                                 Lookups that are not listed count as 1
+    :attr max_search_terms (int): The maximum amount of valid search terms
+    :attr max_search_clauses (int): The maximum amount of field lookups across all of the search terms
+    :attr max_search_joins (int): The maximum amount of relations the search may join to
+    :attr max_search_cost (int): The maximum total cost of the search, where every field lookup costs 1
+                                 (or `regex_search_cost` for regex lookups) and every joined relation costs 1
+    :attr regex_search_cost (int): The cost of a single regex lookup
+    :attr truncate_expensive_searches (bool): Determines whether a search that is over a limit drops its
+                                              last terms instead of being rejected
+    :attr search_cost (SearchCost): The cost of the last search, set by `filter_queryset`
+    :attr cache_results (bool): Determines whether the ordered pks of the results are cached in Django's cache
+                                until a model that the search depends on is saved or deleted
+    :attr result_cache_alias (str): The name of the cache in the `CACHES` setting to store the results in
+    :attr result_cache_timeout (int): How many seconds the results are cached for
+    :attr result_cache_max_results (int): Searches with more results than this are not cached
+    :attr boolean_queries (bool): Determines whether the search is parsed as a boolean search,
+                                  with `AND`, `OR`, `NOT` and parentheses (see `BooleanSearchParser`)
+                                  Boolean searches do not use the plan cache, the result cache or union queries
+    :attr max_batch_size (int): The maximum amount of search strings that `batch_search` accepts
+    :attr stream_chunk_size (int): The amount of rows that `stream_queryset` fetches at once
+    :attr memory_index (InvertedIndex): If set, the lookups that the index can answer are searched in memory
+                                        and filtered by pk, instead of being searched in the database
+    :attr search_metrics (SearchMetrics): The timings of the last search, set by `filter_queryset`
+                                          only while a receiver of `search_finished` is connected
+    """
     field_regex = r"([\w]+\:)"
+    search_plan_cache_size = 0
+    full_text_ordering = False
+    use_exists_subqueries = False
+    use_union_queries = False
+    rank_results = False
+    lookup_weights = {"exact": 4, "iexact": 3, "startswith": 2, "istartswith": 2}
+    max_search_terms = None
+    max_search_clauses = None
+    max_search_joins = None
+    max_search_cost = None
+    regex_search_cost = 10
+    truncate_expensive_searches = False
+    search_cost = None
+    cache_results = False
+    result_cache_alias = "default"
+    result_cache_timeout = 300
+    result_cache_max_results = 1000
+    boolean_queries = False
+    max_batch_size = 50
+    stream_chunk_size = 1000
+    memory_index = None
+    search_metrics = None
 
     @classmethod
     def get_field_names(cls):
         """Returns a list of all the field names for this class"""
-        return list(six.text_type(name) for name, _ in cls._search_fields.items())
+        return list(cls._search_fields.keys())
 
     @classmethod
     def get_default_fields(cls):
         """Returns all fields marked as default on the filter"""
-        return OrderedDict(
-            (six.text_type(field_name), field) for field_name, field
-            in cls._search_fields.items()
-            if field.default is True)
+        return OrderedDict((field_name, cls._search_fields[field_name]) for field_name in cls._default_field_names)
+
+    @classmethod
+    def get_search_plan_cache(cls):
+        """Returns the `SearchPlanCache` that holds the parsed searches for this class"""
+        return cls._search_plan_cache
+
+    @classmethod
+    def crosses_to_many(cls, model, lookup):
+        """Determines whether the lookup joins across a to-many relation, only analyzing each lookup once"""
+        key = (model, lookup)
+        result = cls._relation_cache.get(key)
+        if result is None:
+            result = cls._relation_cache[key] = crosses_to_many(model, lookup)
+        return result
+
+    @classmethod
+    def get_relation_paths(cls, model, lookup):
+        """Returns the relations that the lookup joins to, only analyzing each lookup once"""
+        key = (model, lookup, "joins")
+        result = cls._relation_cache.get(key)
+        if result is None:
+            result = cls._relation_cache[key] = tuple(relation_paths(model, lookup))
+        return result
+
+    @classmethod
+    def get_related_models(cls, model, lookup):
+        """Returns the models that the lookup reads from, only analyzing each lookup once"""
+        key = (model, lookup, "models")
+        result = cls._relation_cache.get(key)
+        if result is None:
+            result = cls._relation_cache[key] = tuple(related_models(model, lookup))
+        return result
+
+    def get_result_cache(self):
+        """Returns the `SearchResultCache` that the results of this filter are cached in"""
+        return SearchResultCache(self.result_cache_alias, self.result_cache_timeout)
 
     def filter_queryset(self, request, queryset, *args):
         """Grabs all searches from the request and OR's each one into the same filter"""
-        searches = self.filter_searching(request)
+        view = args[0] if args else None
+        if not search_finished.has_listeners(type(self)):
+            self.search_metrics = None
+            return self._filter_queryset(request, queryset, view)
+
+        self.search_metrics = metrics = SearchMetrics()
+        with metrics.phase("total"):
+            queryset = self._filter_queryset(request, queryset, view)
+        search_finished.send(sender=type(self), search_filter=self, request=request, metrics=metrics)
+        return queryset
+
+    def _filter_queryset(self, request, queryset, view=None):
+        if self.boolean_queries:
+            return self.filter_boolean_search(request, queryset, view)
+        searches = self.get_search_plan(request)
 
         if len(searches) < 1:
             if len(request.query_params.get(self.search_param, "")) > 0:
                 raise ParseError("The search was not valid for any of the provided fields")
             return queryset  # we were not searching on anything
 
+        searches = self.check_search_cost(queryset, searches)
+        if self.cache_results:
+            return self.get_cached_results(request, queryset, searches, view)
+        return self.search_queryset(request, queryset, searches, view)
+
+    def filter_boolean_search(self, request, queryset, view=None):
+        """
+        Filters the queryset by the boolean search of the request.
+        Every search within the boolean search is validated like any other search term, and a search that is not
+        valid for any of its fields never matches, instead of being dropped.
+        The search is not cached in the plan cache or the result cache, and is never searched with union queries.
+
+        :raises: ParseError if the search is not a valid boolean search, if none of its searches are valid,
+                 or if it is over any of the cost limits
+        """
+        tree = self.get_search_tree(request)
+        if tree is None:
+            return queryset  # we were not searching on anything
+
+        searches = list()
+        with self.measure("validate"):
+            tree = self.validate_search_tree(queryset, tree, searches)
+        return self.search_boolean_tree(queryset, tree, searches)
+
+    def get_search_tree(self, request):
+        """
+        Parses the boolean search of the request into its tree.
+
+        :raises: ParseError if the search is not a valid boolean search
+        :return (SearchNode): the tree, or None if the request is not searching for anything
+        """
+        try:
+            with self.measure("tokenize"):
+                return parse_boolean_search(request.query_params.get(self.search_param, ""))
+        except ValueError as error:
+            raise ParseError("The search is not a valid boolean search: {}".format(error))
+
+    def check_boolean_search_cost(self, queryset, searches):
+        """
+        Checks the searches of a boolean search against the cost limits of the filter,
+        and stores their cost on `search_cost`.
+
+        :raises: ParseError if none of the searches are valid, or if they are over any of the limits
+        """
+        if not searches:
+            raise ParseError("The search was not valid for any of the provided fields")
+        self.search_cost = cost = self.get_search_cost(queryset, searches)
+        exceeded = self._get_exceeded_limit(cost)
+        if exceeded is not None:  # a boolean search can not be truncated
+            raise ParseError("The search is too complex: {}".format(exceeded))
+
+    def search_boolean_tree(self, queryset, tree, searches):
+        """
+        Filters the queryset by the validated tree of a boolean search, and orders it if the filter ranks its results.
+
+        :param queryset: the queryset that is being searched
+        :param tree (SearchNode): the tree from `validate_search_tree`
+        :param searches (list): the field and search term associations that `validate_search_tree` collected
+        :return: the searched queryset
+        """
+        self.check_boolean_search_cost(queryset, searches)
+        with self.measure("build"):
+            tree = simplify_search(tree)
+            if never(tree):
+                return queryset.none()
+            queries = self.build_boolean_filters(queryset, tree)
+            base = queryset
+            for query in queries:
+                queryset = queryset.filter(query)
+            if not self.use_exists_subqueries:
+                queryset = distinct(queryset, base)
+            if self.full_text_ordering:
+                queryset = self.order_by_full_text_rank(queryset, searches)
+            if self.rank_results:
+                queryset = self.order_by_search_rank(queryset, searches)
+        if self.search_metrics is not None:
+            self.search_metrics.clauses = sum(count_clauses(query) for query in queries)
+        return queryset
+
+    def build_boolean_filters(self, queryset, tree):
+        """
+        Compiles the simplified tree of a boolean search into the queries that the queryset should be filtered by,
+        where each query is applied with its own `queryset.filter()` call.
+        Like `build_filters`, the AND'd searches at the top of the tree that join across a to-many relation
+        keep their own filter call, so that each of them can match a different related row.
+
+        :param queryset: the queryset that is being searched
+        :param tree (SearchNode): the validated and simplified tree of the boolean search
+        :return (list): the Q objects to filter the queryset by
+        """
+        children = tree.children if isinstance(tree, AndNode) else (tree,)
+        single_valued = list()
+        multi_valued = list()
+        for child in children:
+            query = optimize_q(compile_search(child))
+            if not self.use_exists_subqueries and any(
+                    self.crosses_to_many(queryset.model, lookup) for lookup in query_lookups(query)):
+                multi_valued.append(query)
+            else:
+                single_valued.append(query)
+
+        if len(single_valued) > 1:
+            single_valued = [optimize_q(functools.reduce(operator.and_, single_valued))]
+        return single_valued + multi_valued
+
+    def validate_search_tree(self, queryset, node, searches):
+        """
+        Validates every leaf of the tree of a boolean search, replacing it with an `OrNode` of the queries
+        for every field the leaf's term is valid for (which never matches if there are none).
+        A leaf that searches more than one field (ex: `title: blue id: 5`) must match all of them.
+
+        :param queryset: the queryset that is being searched
+        :param node (SearchNode): the tree of the boolean search
+        :param searches (list): the field and search term associations of every valid leaf are appended to it
+        :return (SearchNode): the validated tree
+        """
+        if not isinstance(node, LeafNode):
+            return type(node)(*(self.validate_search_tree(queryset, child, searches) for child in node.children))
+
+        leaf = list()
+        for field_names, term in self.iter_leaf_searches(node):
+            leaf.append((term, set(field.construct(term) for field in self._validate_fields(field_names, term))))
+        return self.build_search_leaf(queryset, leaf, searches)
+
+    def iter_leaf_searches(self, node):
+        """Yields the field names and the `SearchTerm` of every search within a leaf of a boolean search"""
+        for parsed_field, search_term in tokenize(self.get_field_pattern(), node.text):
+            if search_term is None:
+                continue
+            field_names, term = self.resolve_fields(parsed_field, unquote(search_term))
+            yield field_names, SearchTerm(term)
+
+    def build_search_leaf(self, queryset, leaf, searches):
+        """
+        Builds the node that replaces a leaf of a boolean search from its validated searches.
+
+        :param leaf (list): the search term and the valid constructed fields of every search within the leaf
+        :param searches (list): the searches that are valid for at least one field are appended to it
+        :return (SearchNode): an `OrNode` of the queries of each search, combined with an `AndNode`
+        """
+        nodes = list()
+        for term, fields in leaf:
+            if fields:
+                searches.append((term, fields))
+            nodes.append(OrNode(*(self.build_query(queryset, field, term) for field in sorted(fields))))
+        return nodes[0] if len(nodes) == 1 else AndNode(*nodes)
+
+    def search_queryset(self, request, queryset, searches, view=None):
+        """
+        Filters the queryset by the searches, and orders it if the filter ranks its results.
+
+        :param request: the request of the search
+        :param queryset: the queryset that is being searched
+        :param searches (list): the field and search term associations from `filter_searching`
+        :param view: the view that is being searched, if any
+        :return: the searched queryset
+        """
         base = queryset
+        union = self.use_union_queries and getattr(view, "paginator", None) is not None
+        with self.measure("build"):
+            queries = self.build_filters(base, searches, union=union)
+            for query in queries:
+                queryset = queryset.filter(query)
+
+            # Filtering against a many-to-many field requires us to
+            # call queryset.distinct() in order to avoid duplicate items
+            # in the resulting queryset.
+            # This is not needed when those fields are searched with subqueries.
+            if not self.use_exists_subqueries:
+                queryset = distinct(queryset, base)
+            if self.full_text_ordering:
+                queryset = self.order_by_full_text_rank(queryset, searches)
+            if self.rank_results:
+                queryset = self.order_by_search_rank(queryset, searches)
+        if self.search_metrics is not None:
+            self.search_metrics.clauses = sum(count_clauses(query) for query in queries)
+        return queryset
+
+    def measure(self, phase):
+        """
+        Times the block as a phase of the search on `search_metrics`.
+        Nothing is timed when no receiver of `search_finished` is connected.
+
+        Example:
+            with self.measure("build"):
+                ...
+        """
+        if self.search_metrics is None:
+            return NULL_PHASE
+        return self.search_metrics.phase(phase)
+
+    def batch_search(self, request, queryset, searches, limit=None):
+        """
+        Runs many search strings in a single query, and groups the results by the search that they matched.
+        Every search string goes through the same parsing, validation and cost checks as `filter_queryset`.
+        Each row is annotated with whether it matched each search (`search_match_0`, `search_match_1`, ...),
+        and the rows of every search keep the ordering of the queryset.
+        Search strings that are empty or not valid for any field have no results.
+        The cost limits apply to every search string, and a single search string over them rejects the whole batch,
+        as its results could otherwise not be told apart from those of a search that matched nothing.
+
+        Example:
+            input -> (request, Article.objects.all(), ['title: blue', 'miles'])
+            output -> OrderedDict([('title: blue', [<Article: Kind of Blue>]), ('miles', [])])
+
+        :param request: the request of the search, if any
+        :param queryset: the queryset that is being searched
+        :param searches (list): the search strings
+        :param limit (int): the maximum amount of results to fetch for each search, in the ordering of the queryset
+        :raises: ParseError if there are more than `max_batch_size` search strings,
+                 if any of the search strings is over the cost limits,
+                 or if any of them is not a valid boolean search when `boolean_queries` is set
+        :return (OrderedDict): the results of every search string
+        """
+        searches = list(OrderedDict.fromkeys(searches))
+        if self.max_batch_size is not None and len(searches) > self.max_batch_size:
+            raise ParseError("The batch of {} searches exceeds the limit of {}".format(
+                len(searches), self.max_batch_size))
+
+        results = OrderedDict((search, list()) for search in searches)
+        queries = OrderedDict()
+        for search in searches:
+            query = self.build_batch_query(SearchRequest(request, self.search_param, search), queryset)
+            if query is not None:
+                queries[search] = query
+        if not queries:
+            return results
+
+        limited = limit is not None and connections[queryset.db].features.allow_sliced_subqueries_with_in
+        if limited:
+            # every search only matches its first `limit` rows, so that the rest are never fetched
+            ordering = self._get_ordering(queryset)
+            for search, query in queries.items():
+                queries[search] = Q(pk__in=queryset.filter(query).order_by(*ordering).values("pk")[:limit])
+
+        annotations = OrderedDict(
+            ("search_match_{}".format(index), Case(When(query, then=Value(True)), default=Value(False),
+                                                   output_field=BooleanField()))
+            for index, query in enumerate(queries.values()))
+        rows = queryset.annotate(**annotations).filter(functools.reduce(operator.or_, queries.values()))
+        for row in rows:
+            for index, search in enumerate(queries):
+                matches = results[search]
+                if getattr(row, "search_match_{}".format(index)) and (limited or limit is None or len(matches) < limit):
+                    matches.append(row)
+        return results
+
+    def build_batch_query(self, request, queryset):
+        """
+        Builds a single query that matches the results of the search of the request.
+        Searches that need more than one `queryset.filter()` call (ex: terms that join across a to-many relation)
+        are matched with a subquery of the searched pks, so that the batch never joins to a to-many relation.
+
+        :return (Q): the query, or None if the request is not searching for anything that is valid
+        """
+        if self.boolean_queries:
+            tree = self.get_search_tree(request)
+            if tree is None:
+                return None
+            searches = list()
+            tree = self.validate_search_tree(queryset, tree, searches)
+            if not searches:
+                return None
+            self.check_boolean_search_cost(queryset, searches)
+            tree = simplify_search(tree)
+            if never(tree):
+                return None
+            queries = self.build_boolean_filters(queryset, tree)
+        else:
+            searches = self.get_search_plan(request)
+            if len(searches) < 1:
+                return None
+            searches = self.check_search_cost(queryset, searches)
+            queries = self.build_filters(queryset, searches)
+        joins_to_many = not self.use_exists_subqueries and any(
+            self.crosses_to_many(queryset.model, field) for _, fields in searches for field in fields)
+        if len(queries) == 1 and not joins_to_many:
+            return queries[0]
+
+        searched = queryset.order_by()
+        for query in queries:
+            searched = searched.filter(query)
+        return Q(pk__in=searched.values("pk"))
+
+    def stream_queryset(self, request, queryset, view=None, ordering=None, fields=None, serializer_class=None,
+                        chunk_size=None):
+        """
+        Searches the queryset just like `filter_queryset`, and then yields the results one chunk at a time,
+        walking the results by keyset (`WHERE key > last_key`) instead of an OFFSET.
+        Only one chunk of rows is ever held in memory, which makes it suitable for exports of large result sets.
+        The results are iterated in the given `ordering` instead of the ordering of the search,
+        which must be made of non-nullable fields, and ends with the pk so that the keys are unique.
+
+        Example:
+            rows = ArticleSearchFilter().stream_queryset(request, Article.objects.all(),
+                                                         serializer_class=ArticleSerializer)
+            return StreamingHttpResponse(json_lines(rows), content_type="application/x-ndjson")
+
+        :param request: the request of the search
+        :param queryset: the queryset that is being searched
+        :param view: the view that is being searched, if any
+        :param ordering (list): the ordering to iterate in (ex: `['-created']`), which defaults to the pk
+                                (ex: `['search_rank']` can be used with `rank_results`)
+        :param fields (list): if given, the rows are yielded as dicts of these fields
+        :param serializer_class: if given, the rows are yielded as the data of this serializer
+        :param chunk_size (int): the amount of rows to fetch at once, which defaults to `stream_chunk_size`
+        :return: generator of the rows of the results
+        """
+        queryset = self.filter_queryset(request, queryset, view)
+        chunks = iter_keyset(queryset, ordering, chunk_size or self.stream_chunk_size, fields=fields)
+        for chunk in chunks:
+            if serializer_class is not None:
+                chunk = serializer_class(chunk, many=True, context={"request": request, "view": view}).data
+            for row in chunk:
+                yield row
+
+    def get_search_facets(self, request, queryset, view=None):
+        """
+        Counts how many of the results of the search match each field and each search term, in a single query.
+        Every count is a conditional aggregate (`Count` with a `filter`) over the results of the search,
+        which are searched without the view so that the counts are never limited to the page that the view serves.
+        The search is parsed, validated and costed once, and does not send `search_finished`.
+
+        Example:
+            input -> (request, User.objects.all()) (searching for `miles, @: coltrane`)
+            output -> {
+                'count': 5,
+                'fields': OrderedDict([('email', 4), ('name', 2)]),
+                'terms': [
+                    {'term': 'miles', 'count': 3, 'fields': OrderedDict([('email', 2), ('name', 2)])},
+                    {'term': 'coltrane', 'count': 2, 'fields': OrderedDict([('email', 2)])}]}
+
+        :param request: the request of the search
+        :param queryset: the queryset that is being searched
+        :param view: the view that is being searched, if any (it does not change the counts)
+        :return (dict): the counts of the search, or None if the request is not searching for anything
+        """
+        self.search_metrics = None
+        searches, results = self.get_facet_searches(request, queryset)
+        if not searches:
+            return None
+        names = dict()
+        for field_name, search_field in self._search_fields.items():
+            if field_name not in search_field.aliases:
+                for lookup in search_field.lookups:
+                    names.setdefault(lookup, field_name)
+
+        field_queries = OrderedDict()
+        term_queries = OrderedDict()
         for term, fields in searches:
-            queries = (Q(**{field: term}) for field in fields)
-            queryset = queryset.filter(functools.reduce(operator.or_, queries))
+            term_fields = term_queries.setdefault(six.text_type(term), OrderedDict())
+            for field in sorted(fields):
+                field_name = names.get(field, field)
+                query = self.build_query(queryset, field, term)
+                for queries in (term_fields, field_queries):
+                    queries[field_name] = queries[field_name] | query if field_name in queries else query
+
+        aggregates = OrderedDict([("count", Count("pk", distinct=True))])
+        for index, query in enumerate(field_queries.values()):
+            aggregates["field_{}".format(index)] = Count("pk", distinct=True, filter=query)
+        for index, term_fields in enumerate(term_queries.values()):
+            query = functools.reduce(operator.or_, term_fields.values())
+            aggregates["term_{}".format(index)] = Count("pk", distinct=True, filter=query)
+            for field_index, field_query in enumerate(term_fields.values()):
+                aggregates["term_{}_field_{}".format(index, field_index)] = Count(
+                    "pk", distinct=True, filter=field_query)
+
+        counts = queryset.filter(pk__in=results.order_by().values("pk")).aggregate(**aggregates)
+        return {
+            "count": counts["count"],
+            "fields": OrderedDict(
+                (field_name, counts["field_{}".format(index)]) for index, field_name in enumerate(field_queries)),
+            "terms": list({
+                "term": term,
+                "count": counts["term_{}".format(index)],
+                "fields": OrderedDict(
+                    (field_name, counts["term_{}_field_{}".format(index, field_index)])
+                    for field_index, field_name in enumerate(term_fields)),
+            } for index, (term, term_fields) in enumerate(term_queries.items()))
+        }
+
+    def get_facet_searches(self, request, queryset):
+        """
+        Returns the field and search term associations that `get_search_facets` counts the matches of,
+        along with the queryset searched by them (which is None if there are no valid searches).
+        """
+        if not self.boolean_queries:
+            searches = self.get_search_plan(request)
+            if not searches:
+                return searches, None
+            searches = self.check_search_cost(queryset, searches)
+            return searches, self.search_queryset(request, queryset, searches)
+
+        tree = self.get_search_tree(request)
+        searches = list()
+        if tree is not None:
+            tree = self.validate_search_tree(queryset, tree, searches)
+        if not searches:
+            return searches, None
+        return searches, self.search_boolean_tree(queryset, tree, searches)
+
+    def _iter_search_costs(self, queryset, searches):
+        """Yields the cost of the searches up to and including each search"""
+        clauses = regex = 0
+        joins = set()
+        for index, (term, fields) in enumerate(searches):
+            for field in fields:
+                clauses += 1
+                if field.rpartition("__")[2] in REGEX_LOOKUPS:
+                    regex += 1
+                joins.update(self.get_relation_paths(queryset.model, field))
+            total = (clauses - regex) + regex * self.regex_search_cost + len(joins)
+            yield SearchCost(index + 1, clauses, len(joins), regex, total)
+
+    def get_search_cost(self, queryset, searches):
+        """Computes the `SearchCost` of the searches before any query is built for them"""
+        cost = SearchCost(0, 0, 0, 0, 0)
+        for cost in self._iter_search_costs(queryset, searches):
+            pass
+        return cost
+
+    def _get_exceeded_limit(self, cost):
+        limits = (
+            ("terms", cost.terms, self.max_search_terms),
+            ("clauses", cost.clauses, self.max_search_clauses),
+            ("joins", cost.joins, self.max_search_joins),
+            ("cost", cost.total, self.max_search_cost))
+        for name, value, limit in limits:
+            if limit is not None and value > limit:
+                return "{} {} exceeds the limit of {}".format(name, value, limit)
+        return None
+
+    def check_search_cost(self, queryset, searches):
+        """
+        Checks the searches against the cost limits of the filter, and stores their cost on `search_cost`.
+        If `truncate_expensive_searches` is set, the searches are cut off at the last term that fits
+        within the limits. Otherwise a search over any of the limits is rejected.
+
+        :param queryset: the queryset that is being searched
+        :param searches (list): the field and search term associations from `filter_searching`
+        :raises: ParseError if the search is over any of the limits and can not be truncated
+        :return (list): the searches that are within the limits
+        """
+        self.search_cost = cost = self.get_search_cost(queryset, searches)
+        exceeded = self._get_exceeded_limit(cost)
+        if exceeded is None:
+            return searches
+
+        if self.truncate_expensive_searches:
+            kept = None
+            for truncated_cost in self._iter_search_costs(queryset, searches):
+                if self._get_exceeded_limit(truncated_cost) is not None:
+                    break
+                kept = truncated_cost
+            if kept is not None:
+                self.search_cost = kept
+                return list(searches)[:kept.terms]
+        raise ParseError("The search is too complex: {}".format(exceeded))
+
+    def build_filters(self, queryset, searches, union=False):
+        """
+        Optimizes the searches into the queries that the queryset should be filtered by,
+        where each query is applied with its own `queryset.filter()` call.
+
+        Every search term is OR'd across its fields and simplified with `optimize_q`.
+        Duplicate terms are dropped, and the terms that do not join across a to-many relation
+        are AND'd into a single query, as chaining them would not change what they match.
+        Terms that join across a to-many relation keep their own filter call, since every call
+        joins the relation again.
+
+        :param queryset: the queryset that is being searched
+        :param searches (list): the field and search term associations from `filter_searching`
+        :param union (bool): whether terms with multiple fields should be searched with `build_union`
+        :return (list): the Q objects to filter the queryset by
+        """
+        single_valued = list()
+        multi_valued = list()
+        seen = set()
+        for term, fields in searches:
+            if union and len(fields) > 1:
+                query = Q(pk__in=self.build_union(queryset, fields, term))
+                joins_to_many = False
+            else:
+                queries = (self.build_query(queryset, field, term) for field in fields)
+                query = optimize_q(functools.reduce(operator.or_, queries))
+                joins_to_many = not self.use_exists_subqueries and any(
+                    self.crosses_to_many(queryset.model, field) for field in fields)
+            key = query_key(query)
+            if key in seen:
+                continue
+            seen.add(key)
+            if joins_to_many:
+                multi_valued.append(query)
+            else:
+                single_valued.append(query)
+
+        if len(single_valued) > 1:
+            single_valued = [optimize_q(functools.reduce(operator.and_, single_valued))]
+        return single_valued + multi_valued
+
+    def build_union(self, queryset, fields, term):
+        """
+        Builds a subquery that returns the pks of the rows that match the term in any of the fields,
+        as the UNION of one subquery per field.
+        Unlike an OR across the fields, every one of those subqueries can use the index of its own field.
+        The page's LIMIT is not pushed into the subqueries, as the paginator counts the same queryset.
+
+        :param queryset: the queryset that is being searched
+        :param fields (iterable): the constructed field lookups of the term
+        :param term (str): the search term
+        :return: the combined queryset of pks
+        """
+        branches = list(queryset.filter(self.build_query(queryset, field, term)).order_by().values("pk")
+                        for field in sorted(fields))
+        return branches[0].union(*branches[1:])
+
+    def get_cached_results(self, request, queryset, searches, view=None):
+        """
+        Returns the results of the search from the result cache, searching and caching them if they are not.
+        The key of the results is made from the filter class, the query of the queryset before the search,
+        the searches and the versions of every model the search and the queryset join, so that saving or
+        deleting any of their rows invalidates the results. Rows that are changed without sending signals
+        (ex: `queryset.update()`), and models that the queryset only reads in subqueries, do not invalidate them.
+        At most `result_cache_max_results + 1` pks are fetched to find out whether the results can be cached,
+        and the searched queryset is returned as is when they can not.
+
+        :param request: the request of the search
+        :param queryset: the queryset that is being searched
+        :param searches (list): the field and search term associations from `filter_searching`
+        :param view: the view that is being searched, if any
+        :return: the queryset filtered to the pks of the results, in the order of the results
+        """
+        result_cache = self.get_result_cache()
+        models = self.get_result_models(queryset, searches)
+        parts = self.get_result_key_parts(queryset, searches)
+        if parts is None:
+            return self.search_queryset(request, queryset, searches, view)
+        key = result_cache.get_key(parts, models)
+        pks = result_cache.get(key)
+        if pks is not None:
+            return self.filter_by_pks(queryset, pks)
+
+        results = self.search_queryset(request, queryset, searches, view)
+        with self.measure("execute"):
+            pks = list(OrderedDict.fromkeys(
+                results.values_list("pk", flat=True)[:self.result_cache_max_results + 1]))
+        if len(pks) > self.result_cache_max_results:
+            return results
+        result_cache.set(key, pks)
+        return self.filter_by_pks(queryset, pks)
+
+    def get_result_models(self, queryset, searches):
+        """Returns every model that the search and the queryset join, making sure that the result cache is watched"""
+        models = set([queryset.model])
+        models.update(joined_models(queryset.query))
+        for _, fields in searches:
+            for field in fields:
+                models.update(self.get_related_models(queryset.model, field))
+        self.get_result_cache().watch()
+        return models
+
+    def get_result_key_parts(self, queryset, searches):
+        """
+        Returns what identifies the results of the search, apart from the versions of the models.
+        :return (tuple): the filter class, the query of the queryset and the searches,
+                         or None if the queryset can never have any results
+        """
+        try:
+            base_query = six.text_type(queryset.query)
+        except EmptyResultSet:
+            return None
+        plan = sorted((six.text_type(term), sorted(fields)) for term, fields in searches)
+        return "{}.{}".format(type(self).__module__, type(self).__name__), base_query, plan
 
-        # Filtering against a many-to-many field requires us to
-        # call queryset.distinct() in order to avoid duplicate items
-        # in the resulting queryset.
-        return rest_framework.compat.distinct(queryset, base)
+    def filter_by_pks(self, queryset, pks):
+        """Filters the queryset to the pks, ordering the rows in the same order as the pks"""
+        if not pks:
+            return queryset.none()
+        preserved = Case(*(When(pk=pk, then=Value(position)) for position, pk in enumerate(pks)),
+                         output_field=IntegerField())
+        return queryset.filter(pk__in=pks).order_by(preserved)
+
+    def _get_ordering(self, queryset):
+        if queryset.query.order_by:
+            return queryset.query.order_by
+        if queryset.query.default_ordering:
+            return queryset.model._meta.ordering
+        return ()
+
+    def build_query(self, queryset, field, term):
+        """
+        Builds the query that searches a constructed field for the term.
+        Lookups that the `memory_index` can answer are searched in memory, and become a query on the pks.
+        If `use_exists_subqueries` is set, fields that span a to-many relation are
+        searched with a correlated `EXISTS` subquery so that the outer query has no join to it.
+
+        :param queryset: the queryset that is being searched
+        :param field (str): the constructed field lookup (ex: `contributors__display_name__icontains`)
+        :param term (str): the search term
+        :return (Q): the query for the field and term
+        """
+        if self.memory_index is not None:
+            query = self.memory_index.build_query(queryset.model, field, self.get_search_value(field, term))
+            if query is not None:
+                return query
+        if self.use_exists_subqueries and self.crosses_to_many(queryset.model, field):
+            return self._build_exists_query(queryset, field, term)
+        return Q(**{field: self.get_search_value(field, term)})
+
+    def _build_exists_query(self, queryset, field, term):
+        model = queryset.model
+        return Q(Exists(model._base_manager.filter(pk=OuterRef("pk"), **{field: self.get_search_value(field, term)})))
+
+    def get_search_value(self, field, term):
+        """
+        Converts the term into the value that the constructed field lookup is searched with,
+        using the `to_python` of the SearchField that the lookup was constructed from.
+
+        Example:
+            input -> ('id__exact', '42')
+            output -> 42
+        """
+        search_field = self._constructed_fields.get(field)
+        if search_field is None:
+            return term
+        return search_field.to_python(term)
+
+    def build_rank(self, queryset, searches):
+        """
+        Builds the `search_rank` of the rows as the sum of the weights of every field and term they match.
+        The weight of a match is the field's `weight` times the weight of the lookup in `lookup_weights`,
+        where a partial lookup (such as `icontains`) that matches the whole value counts as an exact match.
+        Fields that span a to-many relation are matched with an `EXISTS` subquery, so that
+        the rank never duplicates rows.
+
+        :param queryset: the queryset that is being searched
+        :param searches (list): the field and search term associations from `filter_searching`
+        :return: the expression that computes the rank of a row
+        """
+        ranks = list()
+        for term, fields in searches:
+            for field in sorted(fields):
+                search_field = self._constructed_fields.get(field)
+                weight = search_field.weight if search_field is not None else 1
+                field_name, _, lookup = field.rpartition("__")
+                lookup = TRIGRAM_LOOKUPS.get(lookup, lookup)
+                lookups = [(field, lookup)]
+                if lookup in ("contains", "icontains", "startswith", "istartswith", "endswith", "iendswith"):
+                    exact = "iexact" if lookup.startswith("i") else "exact"
+                    lookups.insert(0, ("{}__{}".format(field_name, exact), exact))
+
+                whens = list()
+                for constructed, lookup_name in lookups:
+                    if self.crosses_to_many(queryset.model, constructed):
+                        query = self._build_exists_query(queryset, constructed, term)
+                    else:
+                        query = Q(**{constructed: self.get_search_value(constructed, term)})
+                    whens.append(When(query, then=Value(weight * self.lookup_weights.get(lookup_name, 1))))
+                ranks.append(Case(*whens, default=Value(0), output_field=FloatField()))
+        return functools.reduce(operator.add, ranks)
+
+    def order_by_search_rank(self, queryset, searches):
+        """Orders the queryset by its `search_rank`, keeping the queryset's own ordering for rows that rank the same"""
+        ordering = self._get_ordering(queryset)
+        return queryset.annotate(search_rank=self.build_rank(queryset, searches)).order_by("-search_rank", *ordering)
+
+    def order_by_full_text_rank(self, queryset, searches):
+        """
+        Orders the queryset by the bm25 rank of every full text lookup in the searches,
+        keeping the queryset's own ordering for rows that rank the same.
+        Only full text lookups on the queryset's own model take part in the rank.
+        """
+        model = queryset.model
+        matches = list()
+        for term, fields in searches:
+            for field in fields:
+                field_path, _, lookup = field.rpartition("__")
+                if lookup == FULL_TEXT_LOOKUP and "__" not in field_path:
+                    matches.append((model._meta.get_field(field_path).column, term))
+
+        rank = full_text_rank(model, matches)
+        if rank is None:
+            return queryset
+        ordering = queryset.query.order_by or model._meta.ordering
+        return queryset.annotate(full_text_rank=rank).order_by("full_text_rank", *ordering)
 
     def construct_field_name(self, field_name):
         """
@@ -104,12 +937,49 @@ class BaseSearchFilter(rest_framework.filters.SearchFilter):
         """
         return "_".join(field_name.split())
 
+    def get_search_plan_key(self, request):
+        """
+        Normalizes the search terms of the request into the key used by the search plan cache.
+        The key is made of the tokens that the plan is built from, so only the whitespace that the tokenizer
+        strips around the fields and the terms is ignored, and whitespace within a term is kept.
+
+        Example:
+            input -> ' first   name: Miles,  Davis '
+            output -> ((None, 'first'), ('name', 'Miles'), (None, 'Davis'))
+        """
+        return tuple(self._iter_search(request))
+
+    def get_search_plan(self, request):
+        """
+        Returns the result of `filter_searching` for the request.
+        If the class has a search plan cache, then repeated searches will reuse the previously
+        parsed and validated plan instead of running the regex splitting and validators again.
+        """
+        cache = self.get_search_plan_cache()
+        if not cache.maxsize:
+            return self.filter_searching(request)
+
+        key = self.get_search_plan_key(request)
+        plan = cache.get(key)
+        if plan is None:
+            plan = tuple((term, frozenset(fields)) for term, fields in self.filter_searching(request))
+            cache.set(key, plan)
+        return plan
+
     def filter_searching(self, request):
         """Returns a list of all valid constructed field name and search term associations"""
         searches = defaultdict(set)
-        for field_names, term in self.split_terms(request):
-            for field in self._validate_fields(field_names, term):
-                searches[term].add(field.constructed)
+        profiles = dict()
+        with self.measure("split_terms"):
+            split_terms = self.split_terms(request)
+        for field_names, term in split_terms:
+            # the same term is only ever classified once, even across multiple field groups
+            profile = profiles.get(term)
+            if profile is None:
+                profile = profiles[term] = SearchTerm(term)
+            with self.measure("validate"):
+                for field in self._validate_fields(field_names, profile):
+                    searches[profile].add(field.construct(profile))
         return list(searches.items())
 
     def get_search_terms(self, request):
@@ -117,23 +987,18 @@ class BaseSearchFilter(rest_framework.filters.SearchFilter):
         params = request.query_params.get(self.search_param, "")
         return params.strip().split(",")
 
+    def get_field_pattern(self):
+        """Returns the compiled `field_regex`, which is only compiled once per class"""
+        pattern = self._field_pattern
+        if pattern.pattern != self.field_regex:
+            pattern = compile_field_pattern(self.field_regex)
+        return pattern
+
     def _iter_search(self, request):
         """Splits the raw search string into field and search term associations"""
+        field_pattern = self.get_field_pattern()
         for search_term in self.get_search_terms(request):
-            split_list = (split for split in re.split(self.field_regex, search_term.strip()) if split)
-            while True:
-                try:
-                    split = next(split_list).strip()
-                except StopIteration:
-                    break
-                field = None
-                term = split
-                if re.match(self.field_regex, split):
-                    field = split.replace(":", "")
-                    try:
-                        term = next(split_list).strip() or None
-                    except StopIteration:
-                        term = None
+            for field, term in tokenize(field_pattern, search_term):
                 yield field, term
 
     def split_terms(self, request):
@@ -149,38 +1014,54 @@ class BaseSearchFilter(rest_framework.filters.SearchFilter):
         :param request: The request object for the search
         :return: A list of tuples of field names (tuple of strings) and term (string) associations
         """
-        split_terms = list()
-        valid_field_names = self.get_field_names()
-        for parsed_field, search_term in self._iter_search(request):
-            if search_term is None:
-                continue
+        with self.measure("tokenize"):
+            tokens = list(self._iter_search(request))
+        return list(self.resolve_fields(parsed_field, search_term) for parsed_field, search_term in tokens
+                    if search_term is not None)
 
-            if parsed_field:
-                field = self.construct_field_name(parsed_field)
-                if field in valid_field_names:
-                    split_terms.append(((field,), search_term))
-                else:
-                    default_fields = tuple(self.get_default_fields().keys())
-                    split_terms.append((default_fields, "{}: {}".format(field, search_term)))
-            else:
-                field = tuple(self.get_default_fields().keys())
-                split_terms.append((field, search_term))
-        return split_terms
+    def resolve_fields(self, parsed_field, search_term):
+        """
+        Resolves the field that was parsed for a search term into the names of the fields that it searches.
+        If no field is given, or the field is not searchable, the default fields are searched instead.
+
+        Example:
+            input -> ('jazz', 'first')
+            output -> (('default1', 'default2'), 'jazz: first')
+
+        :return (tuple): the field names and the search term
+        """
+        if parsed_field:
+            field = self.construct_field_name(parsed_field)
+            if field in self._search_field_names:
+                return (field,), search_term
+            return self._default_field_names, "{}: {}".format(field, search_term)
+        return self._default_field_names, search_term
 
     def _validate_fields(self, field_names, search_term):
         """
         Converts the str names of the fields to the SearchField objects.
         Returns a set of all the associated fields that are passed that are valid
         for the search term.
+        Fields that share the same validators are only validated once for the whole group.
 
         :param field_names (iterable): names/aliases of SearchFields for this filter
         :param search_term (str): search term that the fields will be searching for.
         :raises: AttributeError if a field name with no association is passed in
         :return (set): all the SearchFields passed in that are valid for the search term
         """
+        if not isinstance(search_term, SearchTerm):
+            search_term = SearchTerm(search_term)
+        validated = dict()
+        metrics = self.search_metrics
         for field_name in field_names:
             search_field = self._search_fields.get(field_name)
             if search_field is None:
                 raise NotFound("Field '{}' is not searchable".format(field_name))
-            if search_field.is_valid(search_term):
+            signature = search_field.validator_signature
+            is_valid = validated.get(signature)
+            if is_valid is None:
+                is_valid = validated[signature] = search_field.is_valid(search_term)
+            if metrics is not None:
+                metrics.record_validation(field_name, is_valid)
+            if is_valid:
                 yield search_field
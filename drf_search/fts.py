@@ -0,0 +1,172 @@
+# coding=utf-8
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from django.db import connections, router
+from django.db.models import Field, FloatField, Lookup
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_save, post_delete
+from .compat import NotSupportedError
+from .validators import WORD_REGEX
+
+FULL_TEXT_LOOKUP = "fts"
+
+
+def get_full_text_table(model):
+    """Returns the name of the FTS5 virtual table that backs the full text search of the model"""
+    return "{}_fts".format(model._meta.db_table)
+
+
+def build_match_expression(column, term):
+    """
+    Converts a search term into an FTS5 MATCH expression restricted to a single column.
+    Every word of the term is quoted so that user input can never be parsed as FTS5 syntax.
+
+    Example:
+        input -> ('title', 'Miles "Davis"')
+        output -> '{"title"} : ("Miles" "Davis")'
+
+    :return (str): the MATCH expression, or None if the term has no words to match on
+    """
+    words = WORD_REGEX.findall(term)
+    if not words:
+        return None
+    return '{{"{}"}} : ({})'.format(column, " ".join('"{}"'.format(word) for word in words))
+
+
+class FullTextMatch(Lookup):
+    """
+    Matches the rows of a model against its FTS5 table.
+    Usage: `Model.objects.filter(title__fts="miles davis")`
+    """
+    lookup_name = FULL_TEXT_LOOKUP
+
+    def as_sql(self, compiler, connection):
+        raise NotSupportedError("The `{}` lookup is only supported on SQLite".format(self.lookup_name))
+
+    def as_sqlite(self, compiler, connection):
+        model = self.lhs.target.model
+        quote_name = connection.ops.quote_name
+        table = quote_name(get_full_text_table(model))
+        rowid = "{}.{}".format(compiler.quote_name_unless_alias(self.lhs.alias), quote_name(model._meta.pk.column))
+        expression = build_match_expression(self.lhs.target.column, self.rhs)
+        if expression is None:
+            return "0 = 1", []
+        return "{} IN (SELECT rowid FROM {} WHERE {} MATCH %s)".format(rowid, table, table), [expression]
+
+
+Field.register_lookup(FullTextMatch)
+
+
+def full_text_rank(model, matches):
+    """
+    Builds a bm25 score for every row of the model against the given column and term matches.
+    The lower the score, the more relevant the row is. Rows that did not match score 0.
+
+    :param model: the model class that has a `FullTextIndex`
+    :param matches (iterable): tuples of column name and search term
+    :return: an expression that can be annotated onto a queryset of the model
+    """
+    expressions = list(filter(None, (build_match_expression(column, term) for column, term in matches)))
+    if not expressions:
+        return None
+    quote_name = connections[router.db_for_read(model)].ops.quote_name
+    table = quote_name(get_full_text_table(model))
+    sql = "SELECT bm25({table}) FROM {table} WHERE {table} MATCH %s AND {table}.rowid = {model_table}.{pk}".format(
+        table=table,
+        model_table=quote_name(model._meta.db_table),
+        pk=quote_name(model._meta.pk.column))
+    match = " OR ".join("({})".format(expression) for expression in expressions)
+    return Coalesce(RawSQL(sql, [match], output_field=FloatField()), 0.0)
+
+
+class FullTextIndex(object):
+    """
+    Creates and keeps the FTS5 virtual table of a model in sync with the model's table.
+    The model must have an integer primary key, as it is used as the `rowid` of the FTS5 table.
+
+    Example:
+        index = FullTextIndex(Article, ["title", "body"])
+        index.create()
+        index.rebuild()
+        index.connect()  # keep the table in sync on every save and delete
+
+    :attr model: The model class that is being indexed
+    :attr fields (list): The names of the model fields that are indexed
+    """
+
+    def __init__(self, model, fields):
+        self.model = model
+        self.fields = list(fields)
+
+    @property
+    def table(self):
+        return get_full_text_table(self.model)
+
+    @property
+    def columns(self):
+        return list(self.model._meta.get_field(field).column for field in self.fields)
+
+    def _execute(self, sql, params=None, using=None):
+        using = using or router.db_for_write(self.model)
+        with connections[using].cursor() as cursor:
+            cursor.execute(sql, params or [])
+
+    def _quoted(self, using=None):
+        quote_name = connections[using or router.db_for_write(self.model)].ops.quote_name
+        return quote_name(self.table), list(quote_name(column) for column in self.columns)
+
+    def create(self, using=None):
+        """Creates the FTS5 virtual table if it does not already exist"""
+        table, columns = self._quoted(using)
+        self._execute("CREATE VIRTUAL TABLE IF NOT EXISTS {} USING fts5({})".format(table, ", ".join(columns)),
+                      using=using)
+
+    def drop(self, using=None):
+        table, _ = self._quoted(using)
+        self._execute("DROP TABLE IF EXISTS {}".format(table), using=using)
+
+    def rebuild(self, using=None):
+        """Repopulates the whole FTS5 table from the model's table"""
+        table, columns = self._quoted(using)
+        quote_name = connections[using or router.db_for_write(self.model)].ops.quote_name
+        self._execute("DELETE FROM {}".format(table), using=using)
+        self._execute("INSERT INTO {table}(rowid, {columns}) SELECT {pk}, {columns} FROM {model_table}".format(
+            table=table,
+            columns=", ".join(columns),
+            pk=quote_name(self.model._meta.pk.column),
+            model_table=quote_name(self.model._meta.db_table)), using=using)
+
+    def update(self, instance, using=None):
+        """Replaces the indexed row of a single instance"""
+        table, columns = self._quoted(using)
+        self.delete(instance, using=using)
+        values = list(getattr(instance, field) for field in self.fields)
+        self._execute("INSERT INTO {}(rowid, {}) VALUES ({})".format(table, ", ".join(columns), ", ".join(
+            ["%s"] * (len(columns) + 1))), [instance.pk] + values, using=using)
+
+    def delete(self, instance, using=None):
+        """Removes the indexed row of a single instance"""
+        table, _ = self._quoted(using)
+        self._execute("DELETE FROM {} WHERE rowid = %s".format(table), [instance.pk], using=using)
+
+    def _dispatch_uid(self, signal_name):
+        return "drf_search.fts.{}.{}".format(self.table, signal_name)
+
+    def _on_save(self, sender, instance, using=None, **kwargs):
+        self.update(instance, using=using)
+
+    def _on_delete(self, sender, instance, using=None, **kwargs):
+        self.delete(instance, using=using)
+
+    def connect(self):
+        """Keeps the FTS5 table in sync by listening to the model's `post_save` and `post_delete` signals"""
+        post_save.connect(self._on_save, sender=self.model, weak=False, dispatch_uid=self._dispatch_uid("save"))
+        post_delete.connect(self._on_delete, sender=self.model, weak=False, dispatch_uid=self._dispatch_uid("delete"))
+
+    def disconnect(self):
+        post_save.disconnect(sender=self.model, dispatch_uid=self._dispatch_uid("save"))
+        post_delete.disconnect(sender=self.model, dispatch_uid=self._dispatch_uid("delete"))
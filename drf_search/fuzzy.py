@@ -0,0 +1,243 @@
+# coding=utf-8
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import six
+import threading
+from django.db import router
+from django.db.models import Field, Lookup
+from django.db.models.signals import post_delete, post_save
+from .compat import NotSupportedError
+
+FUZZY_LOOKUP = "fuzzy"
+DEFAULT_MAX_DISTANCE = 2
+
+
+def edit_distance(first, second):
+    """
+    Returns the Levenshtein distance between two strings,
+    which is the least amount of single character insertions, deletions or substitutions between them.
+
+    Example:
+        input -> ('mils davis', 'miles davis')
+        output -> 1
+    """
+    if len(first) < len(second):
+        first, second = second, first
+    previous = list(range(len(second) + 1))
+    for index, char in enumerate(first, 1):
+        current = [index]
+        for other_index, other_char in enumerate(second, 1):
+            current.append(min(
+                previous[other_index] + 1,
+                current[other_index - 1] + 1,
+                previous[other_index - 1] + (char != other_char)))
+        previous = current
+    return previous[-1]
+
+
+class FuzzyTerm(six.text_type):
+    """A search term that knows how far away from it a value may be, for the `fuzzy` lookup"""
+
+    def __new__(cls, value, max_distance=DEFAULT_MAX_DISTANCE):
+        term = super(FuzzyTerm, cls).__new__(cls, value)
+        term.max_distance = max_distance
+        return term
+
+
+class BKTree(object):
+    """
+    A Burkhard-Keller tree, which finds every value within an edit distance of a term
+    while only comparing the term against a small part of the values.
+    Every child of a node is keyed on its distance to the node, so that, by the triangle inequality,
+    only the children within `max_distance` of the term's own distance to the node can hold a match.
+
+    :attr distance: The function that measures the distance between two values
+    """
+
+    def __init__(self, distance=edit_distance):
+        self.distance = distance
+        self._root = None
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def add(self, value):
+        """Adds the value to the tree, unless it is already in it"""
+        if self._root is None:
+            self._root = (value, dict())
+            self._size += 1
+            return
+        node = self._root
+        while True:
+            distance = self.distance(value, node[0])
+            if distance == 0:
+                return
+            child = node[1].get(distance)
+            if child is None:
+                node[1][distance] = (value, dict())
+                self._size += 1
+                return
+            node = child
+
+    def search(self, term, max_distance):
+        """
+        Finds every value within `max_distance` of the term.
+
+        Example:
+            input -> ('mils', 1)
+            output -> [(1, 'miles'), (1, 'mils')]
+
+        :return (list): tuples of distance and value, closest first
+        """
+        if self._root is None:
+            return []
+        matches = list()
+        nodes = [self._root]
+        while nodes:
+            value, children = nodes.pop()
+            distance = self.distance(term, value)
+            if distance <= max_distance:
+                matches.append((distance, value))
+            for child_distance, child in children.items():
+                if distance - max_distance <= child_distance <= distance + max_distance:
+                    nodes.append(child)
+        return sorted(matches)
+
+
+class FuzzyIndex(object):
+    """
+    Holds a BK-tree of the distinct values of a model field, compared case-insensitively.
+    The tree is built on the first search. After that, the values of saved instances are added to it as they
+    are saved. The values that were replaced or deleted are left in the tree, as they match no rows anyway.
+    The tree is rebuilt on the next search once they make up more than `stale_ratio` of the tree.
+
+    :attr model: The model class that is being indexed
+    :attr field_name (str): The name of the model field that is being indexed
+    :attr max_candidates (int): The maximum amount of values that a term is resolved to, closest first
+    """
+    stale_ratio = 0.25
+    max_candidates = 500
+
+    def __init__(self, model, field_name):
+        self.model = model
+        self.field_name = field_name
+        self.loaded = False
+        self._lock = threading.RLock()
+        self._clear()
+
+    def _clear(self):
+        self._tree = BKTree()
+        self._values = dict()
+        self._stale = 0
+
+    def load(self, using=None):
+        """Builds the tree from the distinct values of the field, and keeps it up to date from then on"""
+        values = self.model._base_manager.using(using or router.db_for_read(self.model)).values_list(
+            self.field_name, flat=True).distinct()
+        with self._lock:
+            self._clear()
+            for value in values.iterator():
+                self._add(value)
+            self.loaded = True
+        self.connect()
+
+    def _add(self, value):
+        if value is None:
+            return
+        value = six.text_type(value)
+        folded = value.lower()
+        originals = self._values.get(folded)
+        if originals is None:
+            originals = self._values[folded] = set()
+            self._tree.add(folded)
+        originals.add(value)
+
+    def _on_save(self, sender, instance, **kwargs):
+        with self._lock:
+            self._add(getattr(instance, self.field_name))
+            if not kwargs.get("created"):
+                self._stale += 1
+
+    def _on_delete(self, sender, instance, **kwargs):
+        with self._lock:
+            self._stale += 1
+
+    def search(self, term, max_distance=DEFAULT_MAX_DISTANCE):
+        """
+        Resolves the term to the values of the field that are within `max_distance` edits of it.
+        The distance is capped below the length of the term, so that short terms do not match every short value.
+
+        Example:
+            input -> ('Mils Davis', 2)
+            output -> ['Miles Davis']
+        """
+        folded = six.text_type(term).lower()
+        max_distance = min(max_distance, max(len(folded) - 1, 0))
+        with self._lock:
+            if not self.loaded or self._stale > max(len(self._tree), 1) * self.stale_ratio:
+                self.load()
+            values = list()
+            for _, match in self._tree.search(folded, max_distance):
+                values.extend(sorted(self._values[match]))
+                if len(values) >= self.max_candidates:
+                    break
+            return values[:self.max_candidates]
+
+    def _dispatch_uid(self, signal_name):
+        return "drf_search.fuzzy.{}.{}.{}".format(self.model._meta.label_lower, self.field_name, signal_name)
+
+    def connect(self):
+        """Keeps the tree up to date by listening to the model's `post_save` and `post_delete` signals"""
+        post_save.connect(self._on_save, sender=self.model, weak=False, dispatch_uid=self._dispatch_uid("save"))
+        post_delete.connect(self._on_delete, sender=self.model, weak=False, dispatch_uid=self._dispatch_uid("delete"))
+
+    def disconnect(self):
+        """Stops listening to the model's signals, and drops the tree until it is built again"""
+        post_save.disconnect(sender=self.model, dispatch_uid=self._dispatch_uid("save"))
+        post_delete.disconnect(sender=self.model, dispatch_uid=self._dispatch_uid("delete"))
+        with self._lock:
+            self._clear()
+            self.loaded = False
+
+
+_fuzzy_indexes = dict()
+_fuzzy_lock = threading.Lock()
+
+
+def get_fuzzy_index(model, field_name):
+    """Returns the `FuzzyIndex` of the model field, which is only created once per field"""
+    with _fuzzy_lock:
+        index = _fuzzy_indexes.get((model, field_name))
+        if index is None:
+            index = _fuzzy_indexes[(model, field_name)] = FuzzyIndex(model, field_name)
+    return index
+
+
+class FuzzyMatch(Lookup):
+    """
+    Matches the rows whose value is within an edit distance of the term, case-insensitively.
+    The term is resolved to the matching values with the `FuzzyIndex` of the field, and searched with an `IN`.
+    Usage: `Model.objects.filter(name__fuzzy="Mils Davis")` or `name__fuzzy=FuzzyTerm("Mils Davis", 1)`
+    """
+    lookup_name = FUZZY_LOOKUP
+
+    def get_prep_lookup(self):
+        return self.rhs  # keeps the `max_distance` of a FuzzyTerm
+
+    def as_sql(self, compiler, connection):
+        target = getattr(self.lhs, "target", None)
+        if target is None or not isinstance(self.rhs, six.string_types):
+            raise NotSupportedError("The `{}` lookup only supports a string on a model field".format(self.lookup_name))
+        max_distance = getattr(self.rhs, "max_distance", DEFAULT_MAX_DISTANCE)
+        values = get_fuzzy_index(target.model, target.name).search(self.rhs, max_distance)
+        if not values:
+            return "0 = 1", []
+        lhs_sql, lhs_params = self.process_lhs(compiler, connection)
+        return "{} IN ({})".format(lhs_sql, ", ".join(["%s"] * len(values))), list(lhs_params) + values
+
+
+Field.register_lookup(FuzzyMatch)
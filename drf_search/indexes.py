@@ -0,0 +1,197 @@
+# coding=utf-8
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import six
+import threading
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save
+
+GRAM_SIZE = 3
+TEXT_MATCHES = {
+    "contains": lambda value, term: term in value,
+    "startswith": lambda value, term: value.startswith(term),
+    "endswith": lambda value, term: value.endswith(term),
+}
+
+
+def get_grams(value, size=GRAM_SIZE):
+    """
+    Splits the value into its distinct n-grams.
+
+    Example:
+        input -> 'blues'
+        output -> {'blu', 'lue', 'ues'}
+    """
+    return set(value[index:index + size] for index in range(len(value) - size + 1))
+
+
+def get_match_name(lookup):
+    """Returns the name of the case sensitive version of the lookup (ex: `icontains` -> `contains`)"""
+    return lookup[1:] if lookup.startswith("i") else lookup
+
+
+class InvertedIndex(object):
+    """
+    Holds the values of some fields of a small model in memory, so that they can be searched without a table scan.
+    Every value is indexed by its n-grams, and `exact`, `iexact`, `contains`, `icontains`, `startswith`,
+    `istartswith`, `endswith` and `iendswith` lookups are answered from the index as a query on the pks.
+    Every other lookup is left to the database.
+
+    The index is loaded on its first search, and is then kept up to date with the `post_save` and `post_delete`
+    signals of the model. Changes that do not send those signals (ex: `QuerySet.update()`, `bulk_create()`, or a
+    rolled back transaction) are only picked up by calling `load()` again.
+
+    Example:
+        class CountrySearchFilter(filters.BaseSearchFilter):
+            memory_index = InvertedIndex(Country, ["name", "code"])
+            name = fields.SearchField("name", default=True)
+
+    :attr model: The model class that is being indexed
+    :attr fields (list): The names of the concrete model fields that are indexed
+    """
+
+    def __init__(self, model, fields):
+        self.model = model
+        self.fields = list(fields)
+        self.loaded = False
+        self._lock = threading.RLock()
+        self._clear()
+
+    def _clear(self):
+        self._values = dict((field, dict()) for field in self.fields)
+        self._exact = dict((field, dict()) for field in self.fields)
+        self._folded = dict((field, dict()) for field in self.fields)
+        self._grams = dict((field, dict()) for field in self.fields)
+
+    def load(self):
+        """Loads every row of the model into the index, and keeps the index in sync from then on"""
+        rows = self.model._base_manager.values_list("pk", *self.fields)
+        with self._lock:
+            self._clear()
+            for row in rows.iterator():
+                for field, value in zip(self.fields, row[1:]):
+                    self._add(field, row[0], value)
+            self.loaded = True
+        self.connect()
+
+    def _add(self, field, pk, value):
+        if value is None:
+            return
+        self._values[field][pk] = value
+        self._exact[field].setdefault(value, set()).add(pk)
+        text = six.text_type(value).lower()
+        self._folded[field].setdefault(text, set()).add(pk)
+        for gram in get_grams(text):
+            self._grams[field].setdefault(gram, set()).add(pk)
+
+    def _remove(self, field, pk):
+        value = self._values[field].pop(pk, None)
+        if value is None:
+            return
+        text = six.text_type(value).lower()
+        for postings, key in [(self._exact[field], value), (self._folded[field], text)] + list(
+                (self._grams[field], gram) for gram in get_grams(text)):
+            pks = postings.get(key)
+            if pks is not None:
+                pks.discard(pk)
+                if not pks:
+                    del postings[key]
+
+    def update(self, instance):
+        """Replaces the indexed values of a single instance"""
+        with self._lock:
+            for field in self.fields:
+                self._remove(field, instance.pk)
+                self._add(field, instance.pk, getattr(instance, field))
+
+    def delete(self, instance):
+        """Removes the indexed values of a single instance"""
+        with self._lock:
+            for field in self.fields:
+                self._remove(field, instance.pk)
+
+    @staticmethod
+    def answers(lookup):
+        """Determines whether the index can answer the lookup"""
+        return lookup in ("exact", "iexact") or get_match_name(lookup) in TEXT_MATCHES
+
+    def match(self, field, lookup, value):
+        """
+        Finds the pks of the rows whose field matches the value with the lookup.
+
+        Example:
+            input -> ('name', 'icontains', 'can')
+            output -> {1, 4}
+
+        :return (set): the matching pks, or None if the field or the lookup is not answered by the index
+        """
+        if value is None or field not in self._values or not self.answers(lookup):
+            return None
+        if not self.loaded:
+            self.load()
+        with self._lock:
+            if lookup == "exact":
+                return set(self._exact[field].get(value, ()))
+            term = six.text_type(value)
+            if lookup == "iexact":
+                return set(self._folded[field].get(term.lower(), ()))
+            return self._match_text(field, lookup, term)
+
+    def _match_text(self, field, lookup, term):
+        folded = term.lower()
+        if len(folded) < GRAM_SIZE:
+            candidates = self._values[field].keys()
+        else:
+            postings = sorted((self._grams[field].get(gram, set()) for gram in get_grams(folded)), key=len)
+            candidates = set.intersection(*postings)
+
+        matches = TEXT_MATCHES[get_match_name(lookup)]
+        ignore_case = lookup.startswith("i")
+        values = self._values[field]
+        if ignore_case:
+            term = folded
+        return set(pk for pk in candidates if matches(
+            six.text_type(values[pk]).lower() if ignore_case else six.text_type(values[pk]), term))
+
+    def build_query(self, model, field, value):
+        """
+        Builds the query on the pks that matches a constructed field lookup, without searching the table.
+
+        Example:
+            input -> (Country, 'name__icontains', 'can')
+            output -> Q(pk__in=[1, 4])
+
+        :return (Q): the query, or None if the lookup has to be searched in the database
+        """
+        if model is not self.model:
+            return None
+        field, _, lookup = field.rpartition("__")
+        pks = self.match(field, lookup, value)
+        if pks is None:
+            return None
+        return Q(pk__in=sorted(pks))
+
+    def _dispatch_uid(self, signal_name):
+        return "drf_search.indexes.{}.{}.{}".format(self.model._meta.label_lower, id(self), signal_name)
+
+    def _on_save(self, sender, instance, **kwargs):
+        self.update(instance)
+
+    def _on_delete(self, sender, instance, **kwargs):
+        self.delete(instance)
+
+    def connect(self):
+        """Keeps the index in sync by listening to the model's `post_save` and `post_delete` signals"""
+        post_save.connect(self._on_save, sender=self.model, weak=False, dispatch_uid=self._dispatch_uid("save"))
+        post_delete.connect(self._on_delete, sender=self.model, weak=False, dispatch_uid=self._dispatch_uid("delete"))
+
+    def disconnect(self):
+        """Stops listening to the model's signals, and drops the index until it is loaded again"""
+        post_save.disconnect(sender=self.model, dispatch_uid=self._dispatch_uid("save"))
+        post_delete.disconnect(sender=self.model, dispatch_uid=self._dispatch_uid("delete"))
+        with self._lock:
+            self._clear()
+            self.loaded = False
@@ -0,0 +1,185 @@
+# coding=utf-8
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import re
+import six
+from .query import AndNode, LeafNode, NotNode, OrNode
+
+# quoted text is matched first, so that the operators within it are searched for as text
+BOOLEAN_TOKEN_REGEX = re.compile(r'"(?:[^"\\]|\\.)*"|[(),]|\b(?:AND|OR|NOT)\b', re.UNICODE)
+BOOLEAN_OPERATORS = frozenset(["(", ")", ",", "AND", "OR", "NOT"])
+
+
+def compile_field_pattern(field_regex):
+    """Compiles the `field_regex` of a filter, allowing already compiled patterns to be passed through"""
+    if isinstance(field_regex, six.string_types):
+        return re.compile(field_regex)
+    return field_regex
+
+
+def tokenize(field_pattern, search_term):
+    """
+    Splits a single search term into field and search term associations in one left-to-right scan.
+    A field without a search term following it will be yielded with a `None` term.
+
+    Example:
+        input -> 'title: draft email: miles.davis@jazz.com'
+        output -> [('title', 'draft'), ('email', 'miles.davis@jazz.com')]
+
+    :param field_pattern: compiled pattern that matches a field name (ex: `title:`)
+    :param search_term (str): the search term to split
+    :return: generator of tuples of field name (str or None) and term (str or None)
+    """
+    field = None
+    position = 0
+    for match in field_pattern.finditer(search_term):
+        start, end = match.span()
+        if start == end:
+            continue  # zero-width matches cannot separate anything
+        term = search_term[position:start].strip()
+        if field is not None:
+            yield field, term or None
+        elif term:
+            yield None, term
+        field = match.group(0).strip().replace(":", "")
+        position = end
+
+    term = search_term[position:].strip()
+    if field is not None:
+        yield field, term or None
+    elif term:
+        yield None, term
+
+
+def tokenize_boolean(search):
+    """
+    Splits a boolean search into its operators and the text between them.
+    Operators must be upper case, and are searched for as text when they are quoted.
+
+    Example:
+        input -> 'title: blue AND NOT (id: 5 OR "AND")'
+        output -> ['title: blue', 'AND', 'NOT', '(', 'id: 5', 'OR', '"AND"', ')']
+    """
+    text = ""
+    position = 0
+    for match in BOOLEAN_TOKEN_REGEX.finditer(search):
+        token = match.group(0)
+        text += search[position:match.start()]
+        position = match.end()
+        if token not in BOOLEAN_OPERATORS:
+            text += token  # quoted text
+            continue
+        if text.strip():
+            yield text.strip()
+        text = ""
+        yield token
+    text += search[position:]
+    if text.strip():
+        yield text.strip()
+
+
+class BooleanSearchParser(object):
+    """
+    Parses a boolean search into a tree of `SearchNode`, where every leaf is a `LeafNode` of the text between
+    the operators. From the lowest to the highest precedence:
+        `,`: the searches on either side must both match (as in a search without operators)
+        `OR`: either side must match
+        `AND` (or nothing at all between two searches): both sides must match
+        `NOT`: the search after it must not match
+        `(` `)`: groups the searches within them
+
+    Example:
+        input -> 'title: blue OR title: train, NOT id: 5'
+        output -> AndNode(OrNode(LeafNode('title: blue'), LeafNode('title: train')), NotNode(LeafNode('id: 5')))
+    """
+
+    def __init__(self, search):
+        self.tokens = list(tokenize_boolean(search))
+        self.position = 0
+
+    def peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def advance(self):
+        token = self.peek()
+        self.position += 1
+        return token
+
+    def parse(self):
+        """:raises: ValueError if the search is not a valid boolean search"""
+        node = self.parse_list()
+        if self.peek() is not None:
+            raise ValueError("Unexpected `{}`".format(self.peek()))
+        return node
+
+    def parse_list(self):
+        nodes = list()
+        while True:
+            while self.peek() == ",":  # empty searches between commas are skipped
+                self.advance()
+            if self.peek() in (None, ")"):
+                break
+            nodes.append(self.parse_or())
+            if self.peek() != ",":
+                break
+        return nodes[0] if len(nodes) == 1 else AndNode(*nodes)
+
+    def parse_or(self):
+        nodes = [self.parse_and()]
+        while self.peek() == "OR":
+            self.advance()
+            nodes.append(self.parse_and())
+        return nodes[0] if len(nodes) == 1 else OrNode(*nodes)
+
+    def parse_and(self):
+        nodes = [self.parse_not()]
+        while self.peek() not in (None, ",", ")", "OR"):
+            if self.peek() == "AND":
+                self.advance()
+            nodes.append(self.parse_not())
+        return nodes[0] if len(nodes) == 1 else AndNode(*nodes)
+
+    def parse_not(self):
+        if self.peek() == "NOT":
+            self.advance()
+            return NotNode(self.parse_not())
+        return self.parse_atom()
+
+    def parse_atom(self):
+        token = self.advance()
+        if token == "(":
+            if self.peek() == ")":
+                raise ValueError("Empty parentheses")
+            node = self.parse_list()
+            if self.advance() != ")":
+                raise ValueError("Missing `)`")
+            return node
+        if token is None:
+            raise ValueError("Missing a search at the end")
+        if token in BOOLEAN_OPERATORS:
+            raise ValueError("Unexpected `{}`".format(token))
+        return LeafNode(token)
+
+
+def parse_boolean_search(search):
+    """Parses a boolean search with `BooleanSearchParser`, returning None if there is nothing to search for"""
+    parser = BooleanSearchParser(search)
+    if all(token == "," for token in parser.tokens):
+        return None
+    return parser.parse()
+
+
+def unquote(search_term):
+    """
+    Removes the quotes around a search term that was quoted to search for an operator as text
+
+    Example:
+        input -> '"AND"'
+        output -> 'AND'
+    """
+    if len(search_term) > 1 and search_term[0] == search_term[-1] == '"':
+        return re.sub(r'\\(.)', r'\1', search_term[1:-1])
+    return search_term
@@ -0,0 +1,28 @@
+# coding=utf-8
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from drf_search.trigrams import TrigramIndex
+
+
+class Command(BaseCommand):
+    help = "Creates the trigram table of a model if needed, and repopulates it from the model's table"
+
+    def add_arguments(self, parser):
+        parser.add_argument("model", help="The model to index, as `app_label.ModelName`")
+        parser.add_argument("fields", nargs="+", help="The names of the model fields to index")
+        parser.add_argument("--database", default=None, help="The database to rebuild the trigram table in")
+
+    def handle(self, *args, **options):
+        try:
+            model = apps.get_model(options["model"])
+        except (LookupError, ValueError) as e:
+            raise CommandError(str(e))
+        index = TrigramIndex(model, options["fields"])
+        index.create(using=options["database"])
+        index.rebuild(using=options["database"])
+        self.stdout.write("Rebuilt the trigrams of {} for {}".format(model._meta.label, ", ".join(index.fields)))
@@ -0,0 +1,391 @@
+# coding=utf-8
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import six
+from collections import OrderedDict, namedtuple
+from django.apps import apps
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Q
+from django.db.models.constants import LOOKUP_SEP
+
+
+SearchCost = namedtuple("SearchCost", ["terms", "clauses", "joins", "regex", "total"])
+REGEX_LOOKUPS = frozenset(["regex", "iregex"])
+
+
+def relation_paths(model, lookup):
+    """
+    Returns every relation that an ORM lookup joins to, as the lookup path to that relation.
+
+    Example:
+        input -> (Article, 'user__groups__name__icontains')
+        output -> ['user', 'user__groups']
+    """
+    paths = list()
+    names = lookup.split(LOOKUP_SEP)
+    opts = model._meta
+    for index, name in enumerate(names):
+        try:
+            field = opts.pk if name == "pk" else opts.get_field(name)
+        except FieldDoesNotExist:
+            break  # the rest of the lookup are transforms and lookups
+        if not field.is_relation:
+            break
+        if index + 1 < len(names) and _has_field(field.related_model, names[index + 1]):
+            paths.append(LOOKUP_SEP.join(names[:index + 1]))
+            opts = field.related_model._meta
+        else:
+            break  # filtering on the relation itself does not need a join
+    return paths
+
+
+def related_models(model, lookup):
+    """
+    Returns every model whose rows an ORM lookup reads from, including the model it starts from
+    and the intermediate models of many-to-many relations.
+
+    Example:
+        input -> (Article, 'contributors__display_name__icontains')
+        output -> [Article, Article.contributors.through, Contributor]
+    """
+    models = [model]
+    opts = model._meta
+    for name in lookup.split(LOOKUP_SEP):
+        try:
+            field = opts.pk if name == "pk" else opts.get_field(name)
+        except FieldDoesNotExist:
+            break
+        if not field.is_relation:
+            break
+        through = getattr(field, "through", None) or getattr(getattr(field, "remote_field", None), "through", None)
+        if field.many_to_many and through is not None:
+            models.append(through)
+        models.append(field.related_model)
+        opts = field.related_model._meta
+    return models
+
+
+def joined_models(query):
+    """
+    Returns every model whose table an ORM query already joins, such as the models that the queryset
+    was filtered by before it is searched (including the intermediate models of many-to-many relations).
+    Tables that are only read by subqueries are not included.
+
+    Example:
+        input -> Article.objects.filter(user__is_active=True).query
+        output -> [User, Article]
+    """
+    tables = set(join.table_name for join in query.alias_map.values())
+    return list(model for model in apps.get_models(include_auto_created=True) if model._meta.db_table in tables)
+
+
+def _has_field(model, name):
+    if name == "pk":
+        return True
+    try:
+        model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return False
+    return True
+
+
+def crosses_to_many(model, lookup):
+    """
+    Determines whether an ORM lookup joins across a one-to-many or many-to-many relation,
+    which is what causes a filtered queryset to return duplicate rows.
+
+    Example:
+        input -> (Article, 'contributors__display_name__icontains')
+        output -> True
+
+    :param model: the model class the lookup starts from
+    :param lookup (str): the constructed lookup (ex: `user__email__iexact`)
+    :return (bool): whether any relation along the lookup is to-many
+    """
+    opts = model._meta
+    for name in lookup.split(LOOKUP_SEP):
+        try:
+            field = opts.pk if name == "pk" else opts.get_field(name)
+        except FieldDoesNotExist:
+            return False  # the rest of the lookup are transforms and lookups
+        if field.many_to_many or field.one_to_many:
+            return True
+        if not field.is_relation:
+            return False
+        opts = field.related_model._meta
+    return False
+
+
+def _hashable(value):
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return tuple(_hashable(item) for item in value)
+    try:
+        hash(value)
+    except TypeError:
+        return repr(value)
+    return value
+
+
+def query_key(node):
+    """
+    Returns a hashable key that is equal for two query nodes that search the exact same thing.
+    Expressions (such as `Exists`) are only ever equal to themselves.
+    """
+    if isinstance(node, Q):
+        return node.connector, node.negated, tuple(query_key(child) for child in node.children)
+    if isinstance(node, tuple):
+        lookup, value = node
+        return lookup, _hashable(value)
+    return id(node)
+
+
+def count_clauses(node):
+    """
+    Counts the lookups and expressions (such as `Exists`) within a query node.
+
+    Example:
+        input -> Q(id__in=[1, 2]) | Q(title__icontains='blue')
+        output -> 2
+    """
+    if isinstance(node, Q):
+        return sum(count_clauses(child) for child in node.children)
+    return 1
+
+
+def query_lookups(node):
+    """
+    Yields the field lookups within a query node, skipping expressions (such as `Exists`).
+
+    Example:
+        input -> Q(id__in=[1, 2]) | ~Q(title__icontains='blue')
+        output -> ['id__in', 'title__icontains']
+    """
+    if isinstance(node, Q):
+        for child in node.children:
+            for lookup in query_lookups(child):
+                yield lookup
+    elif isinstance(node, tuple):
+        yield node[0]
+
+
+def _split_lookup(lookup):
+    field, _, name = lookup.rpartition(LOOKUP_SEP)
+    return field, name
+
+
+def _in_values(lookup, value):
+    """Returns the field and the values a lookup matches by equality, or None if it can not be merged"""
+    field, name = _split_lookup(lookup)
+    if not field:
+        return None
+    if name == "exact":
+        return field, [value]
+    if name == "iexact" and isinstance(value, six.string_types) and value.lower() == value.upper():
+        return field, [value]  # the value has no case, so `iexact` is the same as `exact`
+    if name == "in" and isinstance(value, (list, tuple)):
+        return field, list(value)
+    return None
+
+
+def _merge_in_lookups(children):
+    """Merges the OR'd equality lookups on the same field into a single `__in` lookup"""
+    merged = OrderedDict()
+    result = list()
+    for child in children:
+        in_values = _in_values(*child) if isinstance(child, tuple) else None
+        if in_values is None:
+            result.append(child)
+            continue
+        field, values = in_values
+        if field not in merged:
+            merged[field] = (len(result), child, list())
+            result.append(child)
+        merged[field][2].extend(values)
+
+    for field, (index, original, values) in merged.items():
+        unique_values = list(OrderedDict((_hashable(value), value) for value in values).values())
+        if len(unique_values) > 1 or _split_lookup(original[0])[1] == "in":
+            result[index] = ("{}{}in".format(field, LOOKUP_SEP), unique_values)
+    return result
+
+
+def optimize_q(query):
+    """
+    Simplifies a Q tree without changing what it matches:
+        * nested nodes with the same connector are flattened into their parent
+        * duplicate lookups and nodes are dropped
+        * OR'd `exact` lookups (and `iexact` lookups on values without case) on the same field
+          are merged into a single `__in` lookup
+
+    Example:
+        input -> Q(id__exact=1) | (Q(id__exact=2) | Q(title__icontains='blue')) | Q(id__exact=1)
+        output -> Q(id__in=[1, 2]) | Q(title__icontains='blue')
+
+    :param query (Q): the query to optimize
+    :return (Q): a new, optimized query
+    """
+    children = list()
+    seen = set()
+    for child in query.children:
+        if isinstance(child, Q):
+            child = optimize_q(child)
+            if not child.children:
+                continue
+            if not child.negated and (child.connector == query.connector or len(child.children) == 1):
+                nested = child.children
+            else:
+                nested = [child]
+        else:
+            nested = [child]
+
+        for node in nested:
+            key = query_key(node)
+            if key not in seen:
+                seen.add(key)
+                children.append(node)
+
+    if query.connector == Q.OR:
+        children = _merge_in_lookups(children)
+
+    optimized = Q()
+    optimized.connector = query.connector
+    optimized.negated = query.negated
+    optimized.children = children
+    return optimized
+
+
+class SearchNode(object):
+    """
+    A node of the tree of a boolean search.
+    The children of a node are other nodes, or the `Q` objects that the leaves were compiled to.
+    """
+    __slots__ = ("children",)
+
+    def __init__(self, *children):
+        self.children = list(children)
+
+    def __eq__(self, other):
+        return type(self) is type(other) and node_key(self) == node_key(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(node_key(self))
+
+    def __repr__(self):
+        return "{}({})".format(type(self).__name__, ", ".join(repr(child) for child in self.children))
+
+
+class AndNode(SearchNode):
+    """Matches when all of its children match. An `AndNode` without children always matches"""
+    __slots__ = ()
+
+
+class OrNode(SearchNode):
+    """Matches when any of its children match. An `OrNode` without children never matches"""
+    __slots__ = ()
+
+
+class NotNode(SearchNode):
+    """Matches when its only child does not match"""
+    __slots__ = ()
+
+
+class LeafNode(SearchNode):
+    """The text of a search that has not been validated yet (ex: `title: kind of blue`)"""
+    __slots__ = ()
+
+    @property
+    def text(self):
+        return self.children[0]
+
+
+def always(node):
+    return isinstance(node, AndNode) and not node.children
+
+
+def never(node):
+    return isinstance(node, OrNode) and not node.children
+
+
+def node_key(node):
+    """Returns a hashable key that is equal for two nodes that search the exact same thing"""
+    if isinstance(node, SearchNode):
+        return type(node).__name__, tuple(node_key(child) for child in node.children)
+    if isinstance(node, six.string_types):
+        return node  # the text of a `LeafNode`
+    return query_key(node)
+
+
+def simplify_search(node):
+    """
+    Simplifies the tree of a boolean search without changing what it matches:
+        * nested `AndNode` and `OrNode` with the same type are flattened into their parent
+        * duplicate children are dropped
+        * branches that never match (ex: a search on a field the term was not valid for) are folded:
+          they drop out of an `OrNode` and make an `AndNode` never match
+        * double negations are removed
+
+    Example:
+        input -> AndNode(Q(a=1), OrNode(OrNode(), Q(b=1)), Q(a=1))
+        output -> AndNode(Q(a=1), Q(b=1))
+
+    :return: the simplified node, which never matches if it is `never` and always matches if it is `always`
+    """
+    if isinstance(node, NotNode):
+        child = simplify_search(node.children[0])
+        if isinstance(child, NotNode):
+            return child.children[0]
+        if always(child):
+            return OrNode()
+        if never(child):
+            return AndNode()
+        return NotNode(child)
+
+    if isinstance(node, (AndNode, OrNode)):
+        absorbs = never if isinstance(node, AndNode) else always
+        children = list()
+        seen = set()
+        for child in node.children:
+            child = simplify_search(child)
+            nested = child.children if type(child) is type(node) else [child]
+            for grandchild in nested:
+                if absorbs(grandchild):
+                    return grandchild
+                key = node_key(grandchild)
+                if key not in seen:
+                    seen.add(key)
+                    children.append(grandchild)
+        if len(children) == 1:
+            return children[0]
+        return type(node)(*children)
+    return node
+
+
+def compile_search(node):
+    """
+    Compiles the simplified tree of a boolean search into a single Q object
+
+    :raises: ValueError if the tree has a branch that never matches, or a leaf that was not validated
+    """
+    if isinstance(node, Q):
+        return node
+    if never(node):
+        raise ValueError("A search that never matches can not be compiled")
+    if isinstance(node, NotNode):
+        return ~compile_search(node.children[0])
+    if isinstance(node, AndNode):
+        query = Q()
+        for child in node.children:
+            query &= compile_search(child)
+        return query
+    if isinstance(node, OrNode):
+        query = Q()
+        for child in node.children:
+            query |= compile_search(child)
+        return query
+    raise ValueError("`{!r}` has not been validated".format(node))
@@ -0,0 +1,67 @@
+# coding=utf-8
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from collections import defaultdict
+from contextlib import contextmanager
+from django.dispatch import Signal
+
+try:
+    from time import perf_counter as timer
+except ImportError:  # Python 2
+    from time import time as timer
+
+# Sent by `BaseSearchFilter.filter_queryset` after every search, but only while a receiver is connected.
+# Arguments: `sender` (the filter class), `search_filter`, `request` and `metrics` (a `SearchMetrics`)
+search_finished = Signal()
+
+
+class SearchMetrics(object):
+    """
+    Collects where the time of a single search went.
+
+    The phases of `timings` are:
+        `tokenize`: splitting the raw search string with the `field_regex`
+        `split_terms`: matching the parsed fields to the search fields (includes `tokenize`)
+        `validate`: running the validators of the fields against the terms
+        `build`: building the Q objects and ordering expressions
+        `execute`: running SQL, only reported when the filter evaluates a query itself (ex: `cache_results`)
+        `total`: the whole of `filter_queryset`
+    A phase that did not run (ex: parsing when the search plan was cached) is missing from `timings`.
+
+    :attr timings (dict): The amount of seconds spent in each phase
+    :attr validations (dict): The amount of times each field passed and failed validation, as `[passed, failed]`
+    :attr clauses (int): The amount of lookups in the queries that the queryset was filtered by
+    """
+
+    def __init__(self):
+        self.timings = defaultdict(float)
+        self.validations = defaultdict(lambda: [0, 0])
+        self.clauses = 0
+
+    @contextmanager
+    def phase(self, name):
+        """Adds the time spent within the block to the phase"""
+        start = timer()
+        try:
+            yield
+        finally:
+            self.timings[name] += timer() - start
+
+    def record_validation(self, field_name, is_valid):
+        self.validations[field_name][0 if is_valid else 1] += 1
+
+
+class NullPhase(object):
+    """Stands in for `SearchMetrics.phase` when nothing is listening, so that timing costs nothing"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+NULL_PHASE = NullPhase()
@@ -0,0 +1,106 @@
+# coding=utf-8
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import six
+import json
+from django.db.models import F, Q
+from rest_framework.utils.encoders import JSONEncoder
+
+KEYSET_ANNOTATION = "keyset_{}"
+
+
+def parse_ordering(ordering):
+    """
+    Parses an ordering into a list of field and direction tuples, ending with the pk so that it is unique.
+    Every field of the ordering must be non-nullable.
+
+    Example:
+        input -> ['-created', 'title']
+        output -> [('created', True), ('title', False), ('pk', False)]
+
+    :return (list): tuples of field name and whether the field is in descending order
+    """
+    fields = list()
+    for field in ordering or ():
+        if not isinstance(field, six.string_types) or field == "?":
+            raise ValueError("`{!r}` can not be used to iterate by keyset".format(field))
+        descending = field.startswith("-")
+        fields.append((field.lstrip("-+"), descending))
+    if not any(field in ("pk", "id") for field, _ in fields):
+        fields.append(("pk", False))
+    return fields
+
+
+def keyset_query(ordering, values):
+    """
+    Builds the query that matches every row that comes after the row with the given values in the ordering.
+
+    Example:
+        input -> ([('created', True), ('pk', False)], [date(2018, 1, 1), 42])
+        output -> Q(created__lt=date(2018, 1, 1)) | Q(created=date(2018, 1, 1), pk__gt=42)
+
+    :param ordering (list): the parsed ordering from `parse_ordering`
+    :param values (list): the values of the last row, for every field of the ordering
+    """
+    query = Q()
+    for index, (field, descending) in enumerate(ordering):
+        after = dict((previous, value) for (previous, _), value in zip(ordering[:index], values[:index]))
+        after["{}__{}".format(field, "lt" if descending else "gt")] = values[index]
+        query |= Q(**after)
+    return query
+
+
+def iter_keyset(queryset, ordering=None, chunk_size=1000, fields=None):
+    """
+    Iterates over the queryset in chunks, fetching each chunk by the values of the last row of the previous chunk
+    (keyset pagination) instead of an OFFSET. Only one chunk is ever held in memory, and every chunk takes
+    the same time to fetch, as long as the database has an index on the ordering.
+
+    :param queryset: the queryset to iterate over, which must not be sliced
+    :param ordering (list): the ordering to iterate in (ex: `['-created']`), which defaults to the pk
+    :param chunk_size (int): the amount of rows to fetch at once
+    :param fields (list): if given, the rows are yielded as dicts of these fields instead of model instances
+    :return: generator of lists of rows, one list per chunk
+    """
+    ordering = parse_ordering(ordering)
+    keys = list(KEYSET_ANNOTATION.format(index) for index in range(len(ordering)))
+    queryset = queryset.annotate(**dict(
+        (key, F(field)) for key, (field, _) in zip(keys, ordering)))
+    queryset = queryset.order_by(*("-{}".format(key) if descending else key
+                                   for key, (_, descending) in zip(keys, ordering)))
+    key_ordering = list((key, descending) for key, (_, descending) in zip(keys, ordering))
+    if fields is not None:
+        queryset = queryset.values(*(list(fields) + keys))
+
+    query = Q()
+    while True:
+        chunk = list(queryset.filter(query)[:chunk_size])
+        if not chunk:
+            return
+        last = chunk[-1]
+        if fields is None:
+            values = list(getattr(last, key) for key in keys)
+        else:
+            values = list(last[key] for key in keys)
+            for row in chunk:
+                for key in keys:
+                    if key not in fields:
+                        del row[key]
+        yield chunk
+        if len(chunk) < chunk_size:
+            return
+        query = keyset_query(key_ordering, values)
+
+
+def json_lines(rows, encoder_class=JSONEncoder):
+    """
+    Encodes every row as a line of JSON, for a `StreamingHttpResponse`
+
+    Example:
+        StreamingHttpResponse(json_lines(rows), content_type="application/x-ndjson")
+    """
+    for row in rows:
+        yield json.dumps(row, cls=encoder_class) + "\n"
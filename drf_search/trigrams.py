@@ -0,0 +1,230 @@
+# coding=utf-8
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import six
+import hashlib
+import threading
+from django.db import connections, models, router
+from django.db.models import Field
+from django.db.models.lookups import Contains, IContains
+from django.db.models.signals import post_delete, post_save
+from .indexes import get_grams
+from .streaming import iter_keyset
+
+# the trigram lookups, and the lookup that each one is equivalent to
+TRIGRAM_LOOKUPS = {
+    "trigram_contains": "contains",
+    "trigram_icontains": "icontains",
+}
+
+_trigram_models = dict()
+# the names of the fields of every model whose trigrams are known to be complete, which the lookups narrow down
+_trigram_fields = dict()
+_trigram_lock = threading.Lock()
+
+
+def get_trigram_table(model):
+    """Returns the name of the table that holds the trigrams of the model"""
+    return "{}_trigram".format(model._meta.db_table)
+
+
+def get_trigram_model(model):
+    """
+    Returns the model of the table that holds the trigrams of the model's indexed fields,
+    which is only created once per model.
+    Every row holds one distinct trigram of the lowercased value of one field of one instance.
+    The model is unmanaged, and its table is created by `TrigramIndex.create`.
+    """
+    with _trigram_lock:
+        trigram_model = _trigram_models.get(model)
+        if trigram_model is None:
+            table = get_trigram_table(model)
+            index_name = "trigram_{}_idx".format(hashlib.sha1(table.encode("utf-8")).hexdigest()[:10])
+            meta = type(str("Meta"), (object,), {
+                "app_label": model._meta.app_label,
+                "db_table": table,
+                "managed": False,
+                "indexes": [models.Index(fields=["trigram", "field_name", "object_id"], name=index_name)],
+            })
+            trigram_model = _trigram_models[model] = type(str("{}Trigram".format(model.__name__)), (models.Model,), {
+                "__module__": model.__module__,
+                "Meta": meta,
+                "field_name": models.CharField(max_length=100),
+                "trigram": models.CharField(max_length=3),
+                "object_id": models.BigIntegerField(),
+            })
+    return trigram_model
+
+
+class TrigramLookupMixin(object):
+    """
+    Narrows a `contains` lookup down to the rows that have every trigram of the search term in the trigram table,
+    and then verifies the narrowed rows with the lookup itself.
+    Terms that are shorter than a trigram, and fields that are not in a rebuilt or connected `TrigramIndex`,
+    use the plain lookup.
+    """
+
+    def as_sql(self, compiler, connection):
+        # the backends only know the SQL of the plain lookup, which verifies the narrowed rows
+        sql, params = compiler.compile(self.verify_lookup(self.lhs, self.rhs))
+        target = getattr(self.lhs, "target", None)
+        indexed = _trigram_fields.get(getattr(target, "model", None), ())
+        if getattr(target, "name", None) not in indexed or not isinstance(self.rhs, six.string_types):
+            return sql, params
+        trigram_model = _trigram_models[target.model]
+        grams = sorted(get_grams(self.rhs.lower()))
+        if not grams:
+            return sql, params
+
+        quote_name = connection.ops.quote_name
+        pk = "{}.{}".format(compiler.quote_name_unless_alias(self.lhs.alias), quote_name(target.model._meta.pk.column))
+        candidates = ("SELECT {object_id} FROM {table} WHERE {field_name} = %s AND {trigram} IN ({grams}) "
+                      "GROUP BY {object_id} HAVING COUNT(*) = {count}").format(
+            object_id=quote_name("object_id"),
+            table=quote_name(trigram_model._meta.db_table),
+            field_name=quote_name("field_name"),
+            trigram=quote_name("trigram"),
+            grams=", ".join(["%s"] * len(grams)),
+            count=len(grams))
+        return "{} IN ({}) AND {}".format(pk, candidates, sql), [target.name] + grams + list(params)
+
+
+class TrigramContains(TrigramLookupMixin, Contains):
+    """Usage: `Model.objects.filter(title__trigram_contains="Davis")`"""
+    lookup_name = "trigram_contains"
+    verify_lookup = Contains
+
+
+class TrigramIContains(TrigramLookupMixin, IContains):
+    """Usage: `Model.objects.filter(title__trigram_icontains="davis")`"""
+    lookup_name = "trigram_icontains"
+    verify_lookup = IContains
+
+
+Field.register_lookup(TrigramContains)
+Field.register_lookup(TrigramIContains)
+
+
+class TrigramIndex(object):
+    """
+    Creates and keeps the trigram table of a model in sync with the model's table,
+    for the `SearchField`s that are declared with `trigrams=True`.
+    The model must have an integer primary key. The table is plain SQL, and works on every database backend.
+    The lookups only narrow down the fields of an index once it has been rebuilt or connected in this process,
+    so only connect an index whose table has already been rebuilt (ex: with `manage.py rebuild_trigrams`).
+
+    Example:
+        index = TrigramIndex(Article, ["title", "body"])
+        index.create()
+        index.rebuild()  # or `manage.py rebuild_trigrams tests.Article title body`
+        index.connect()  # keep the table in sync on every save and delete
+
+    :attr model: The model class that is being indexed
+    :attr fields (list): The names of the model fields that are indexed
+    """
+    batch_size = 1000
+
+    def __init__(self, model, fields):
+        self.model = model
+        self.fields = list(fields)
+        self.trigram_model = get_trigram_model(model)
+
+    @property
+    def table(self):
+        return get_trigram_table(self.model)
+
+    def _using(self, using=None):
+        return using or router.db_for_write(self.model)
+
+    def _execute(self, sql, params=None, using=None):
+        with connections[self._using(using)].cursor() as cursor:
+            cursor.execute(sql, params)
+
+    def create(self, using=None):
+        """Creates the trigram table and its index if they do not already exist"""
+        connection = connections[self._using(using)]
+        if self.table in connection.introspection.table_names():
+            return
+        # the statements are only built by the schema editor, so that this also works within a transaction on SQLite
+        schema_editor = connection.schema_editor()
+        sql, params = schema_editor.table_sql(self.trigram_model)
+        self._execute(sql, params or None, using=using)
+        for index in self.trigram_model._meta.indexes:
+            self._execute(str(index.create_sql(self.trigram_model, schema_editor)), using=using)
+
+    def register(self):
+        """Makes the lookups narrow the indexed fields down with the trigram table"""
+        with _trigram_lock:
+            _trigram_fields[self.model] = _trigram_fields.get(self.model, frozenset()).union(self.fields)
+
+    def unregister(self):
+        """Makes the lookups search the indexed fields with the plain lookup"""
+        with _trigram_lock:
+            fields = _trigram_fields.get(self.model, frozenset()).difference(self.fields)
+            if fields:
+                _trigram_fields[self.model] = fields
+            else:
+                _trigram_fields.pop(self.model, None)
+
+    def drop(self, using=None):
+        """Drops the trigram table, after which no field of the model is narrowed down with it"""
+        with _trigram_lock:
+            _trigram_fields.pop(self.model, None)
+        quote_name = connections[self._using(using)].ops.quote_name
+        self._execute("DROP TABLE IF EXISTS {}".format(quote_name(self.table)), using=using)
+
+    def get_rows(self, pk, values):
+        """Returns the trigram rows of an instance, from the values of its indexed fields"""
+        return list(
+            self.trigram_model(field_name=field, trigram=gram, object_id=pk)
+            for field, value in zip(self.fields, values) if value is not None
+            for gram in sorted(get_grams(six.text_type(value).lower())))
+
+    def rebuild(self, using=None):
+        """Repopulates the whole trigram table from the model's table"""
+        using = self._using(using)
+        manager = self.trigram_model._base_manager.db_manager(using)
+        manager.filter(field_name__in=self.fields).delete()
+        queryset = self.model._base_manager.using(using)
+        for chunk in iter_keyset(queryset, chunk_size=self.batch_size, fields=["pk"] + self.fields):
+            rows = list()
+            for row in chunk:
+                rows.extend(self.get_rows(row["pk"], list(row[field] for field in self.fields)))
+            manager.bulk_create(rows, batch_size=self.batch_size)
+        self.register()
+
+    def update(self, instance, using=None):
+        """Replaces the trigrams of a single instance"""
+        using = self._using(using)
+        self.delete(instance, using=using)
+        values = list(getattr(instance, field) for field in self.fields)
+        self.trigram_model._base_manager.db_manager(using).bulk_create(self.get_rows(instance.pk, values))
+
+    def delete(self, instance, using=None):
+        """Removes the trigrams of a single instance"""
+        self.trigram_model._base_manager.db_manager(self._using(using)).filter(
+            field_name__in=self.fields, object_id=instance.pk).delete()
+
+    def _dispatch_uid(self, signal_name):
+        return "drf_search.trigrams.{}.{}.{}".format(self.table, "-".join(self.fields), signal_name)
+
+    def _on_save(self, sender, instance, using=None, **kwargs):
+        self.update(instance, using=using)
+
+    def _on_delete(self, sender, instance, using=None, **kwargs):
+        self.delete(instance, using=using)
+
+    def connect(self):
+        """Keeps the trigram table in sync by listening to the model's `post_save` and `post_delete` signals"""
+        post_save.connect(self._on_save, sender=self.model, weak=False, dispatch_uid=self._dispatch_uid("save"))
+        post_delete.connect(self._on_delete, sender=self.model, weak=False, dispatch_uid=self._dispatch_uid("delete"))
+        self.register()
+
+    def disconnect(self):
+        """Stops keeping the trigram table in sync, after which the indexed fields use the plain lookup"""
+        post_save.disconnect(sender=self.model, dispatch_uid=self._dispatch_uid("save"))
+        post_delete.disconnect(sender=self.model, dispatch_uid=self._dispatch_uid("delete"))
+        self.unregister()
@@ -7,15 +7,152 @@ from __future__ import unicode_literals
 import re
 import six
 import json
+import inspect
+from decimal import Decimal
 
 EMAIL_REGEX = re.compile(r"(^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$)")
+WHITESPACE_REGEX = re.compile(r"\s")
+WORD_REGEX = re.compile(r"\w+", re.UNICODE)
+BOOLEAN_VALUES = frozenset(["true", "false", "0", "1"])
+DECIMAL_REGEX = re.compile(r"^[+-]?(\d+(\.\d*)?|\.\d+)$")
+COMPARISON_OPERATORS = ((">=", "gte"), ("<=", "lte"), (">", "gt"), ("<", "lt"))
+RANGE_SEPARATOR = ".."
+
+
+class SearchTerm(six.text_type):
+    """
+    A search term that lazily classifies itself for the builtin validators.
+    Every classification is computed at most once, no matter how many fields validate the term,
+    and the result of every validator that is run against the term is remembered as well.
+
+    :attr is_digit (bool): Whether the term is strictly numerical
+    :attr is_boolean (bool): Whether the term is a boolean literal (`true`, `false`, `1`, `0`)
+    :attr is_email (bool): Whether the term is a full email
+    :attr json_list (iterable): The term parsed as a JSON iterable, or None if it is not one
+    :attr has_whitespace (bool): Whether the stripped term contains any whitespace
+    :attr comparison (tuple): The term parsed by `parse_comparison`, or None if it is not a comparison
+    """
+    _missing = object()
+
+    def __new__(cls, value):
+        term = super(SearchTerm, cls).__new__(cls, value)
+        term._profile = {}
+        term._results = {}
+        return term
+
+    def _classify(self, name, classifier):
+        value = self._profile.get(name, self._missing)
+        if value is self._missing:
+            value = self._profile[name] = classifier(self)
+        return value
+
+    @property
+    def is_digit(self):
+        return self._classify("is_digit", six.text_type.isdigit)
+
+    @property
+    def is_boolean(self):
+        return self._classify("is_boolean", lambda x: x.lower() in BOOLEAN_VALUES)
+
+    @property
+    def is_email(self):
+        return self._classify("is_email", lambda x: EMAIL_REGEX.match(x) is not None)
+
+    @property
+    def json_list(self):
+        return self._classify("json_list", parse_json_list)
+
+    @property
+    def has_whitespace(self):
+        return self._classify("has_whitespace", lambda x: WHITESPACE_REGEX.search(x.strip()) is not None)
+
+    @property
+    def comparison(self):
+        return self._classify("comparison", parse_comparison)
+
+    def validate(self, validator):
+        """Returns whether the term passes the validator, only running the validator once per term"""
+        result = self._results.get(validator)
+        if result is None:
+            result = self._results[validator] = bool(call_validator(validator, self))
+        return result
+
+
+def is_async_validator(validator):
+    """Determines whether the validator has to be awaited"""
+    iscoroutinefunction = getattr(inspect, "iscoroutinefunction", None)
+    if iscoroutinefunction is None:
+        return False  # there are no coroutines to await before Python 3.5
+    return iscoroutinefunction(validator) or iscoroutinefunction(getattr(validator, "__call__", None))
+
+
+def call_validator(validator, value):
+    """
+    Runs a sync validator against the value.
+
+    :raises: TypeError if the validator is async, as only the async search path (`drf_search.aio`) can await it
+    """
+    if is_async_validator(validator):
+        raise TypeError("`{}` is an async validator, which can only be used with `afilter_queryset`".format(
+            getattr(validator, "__name__", repr(validator))))
+    return validator(value)
+
+
+def parse_json_list(x):
+    """Parses the string as a JSON iterable, returning None if it is not one"""
+    try:
+        value = json.loads(x)
+        list(value)
+    except (TypeError, ValueError):
+        return None
+    return value
+
+
+def parse_comparison(x):
+    """
+    Parses a comparison (`>`, `>=`, `<`, `<=`) or a range (`low..high`) into its lookup and its operands.
+
+    Example:
+        input -> '100..200'
+        output -> ('range', ('100', '200'))
+
+        input -> '>= 500'
+        output -> ('gte', '500')
+
+    :return (tuple): the lookup and the operand (or the tuple of both operands of a range),
+                     or None if the value is not a comparison
+    """
+    if not isinstance(x, six.string_types):
+        return None
+    x = x.strip()
+    for operator, lookup in COMPARISON_OPERATORS:
+        if x.startswith(operator):
+            value = x[len(operator):].strip()
+            return (lookup, value) if value else None
+    low, separator, high = x.partition(RANGE_SEPARATOR)
+    low, high = low.strip(), high.strip()
+    if separator and low and high:
+        return "range", (low, high)
+    return None
+
+
+def _comparison_operands(x):
+    comparison = x.comparison if isinstance(x, SearchTerm) else parse_comparison(x)
+    if comparison is None:
+        return None
+    lookup, value = comparison
+    return value if lookup == "range" else (value,)
 
 
 def validate_string(x):
+    if isinstance(x, SearchTerm):
+        return not x.is_digit
     return not x.isdigit()
 
 
 def validate_numerical(x):
+    if isinstance(x, SearchTerm):
+        return x.is_digit
     if isinstance(x, int):
         return True
     if isinstance(x, six.string_types):
@@ -23,7 +160,31 @@ def validate_numerical(x):
     return False
 
 
+def validate_numerical_comparison(x):
+    """Whether the value is a number, or a comparison (ex: `>10`) or range (ex: `1..10`) of numbers"""
+    if validate_numerical(x):
+        return True
+    operands = _comparison_operands(x)
+    return operands is not None and all(operand.isdigit() for operand in operands)
+
+
+def validate_decimal(x):
+    if isinstance(x, (int, Decimal)) and not isinstance(x, bool):
+        return True
+    return isinstance(x, six.string_types) and DECIMAL_REGEX.match(x.strip()) is not None
+
+
+def validate_decimal_comparison(x):
+    """Whether the value is a decimal, or a comparison (ex: `>1.5`) or range (ex: `0.5..1.5`) of decimals"""
+    if validate_decimal(x):
+        return True
+    operands = _comparison_operands(x)
+    return operands is not None and all(validate_decimal(operand) for operand in operands)
+
+
 def validate_list(x):
+    if isinstance(x, SearchTerm):
+        return x.json_list is not None
     if isinstance(x, six.string_types):
         try:
             x = json.loads(x)
@@ -37,6 +198,8 @@ def validate_list(x):
 
 
 def validate_boolean(x):
+    if isinstance(x, SearchTerm):
+        return x.is_boolean
     if isinstance(x, bool):
         return True
     if isinstance(x, six.string_types):
@@ -50,4 +213,16 @@ def validate_boolean(x):
 
 
 def validate_email(x):
+    if isinstance(x, SearchTerm):
+        return x.is_email
     return isinstance(x, six.string_types) and EMAIL_REGEX.match(x)
+
+
+def validate_no_whitespace(x):
+    if isinstance(x, SearchTerm):
+        return not x.has_whitespace
+    return not WHITESPACE_REGEX.search(x.strip())
+
+
+def validate_words(x):
+    return isinstance(x, six.string_types) and WORD_REGEX.search(x) is not None
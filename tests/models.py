@@ -0,0 +1,22 @@
+# coding=utf-8
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import models
+
+
+class Contributor(models.Model):
+    display_name = models.CharField(max_length=100)
+
+
+class Article(models.Model):
+    title = models.CharField(max_length=200)
+    body = models.TextField(blank=True, default="")
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.CASCADE)
+    contributors = models.ManyToManyField(Contributor, blank=True)
+
+    class Meta:
+        ordering = ["id"]
@@ -0,0 +1,152 @@
+# coding=utf-8
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import mock
+from drf_search import aio, fields, indexes, signals
+from django.core.cache import caches
+from django.test import TestCase
+from rest_framework.exceptions import ParseError
+from .models import Article
+from .test_filters import TestFilter
+from .utils import mock_request
+
+
+async def validate_title(x):
+    return not x.startswith("draft")
+
+
+class AsyncTestFilter(aio.AsyncSearchFilterMixin, TestFilter):
+    title = fields.SearchField("title", default=True, validators=[validate_title])
+
+
+class SyncTestFilter(TestFilter):
+    title = fields.SearchField("title", default=True, validators=[lambda x: not x.startswith("draft")])
+
+
+class AsyncBooleanTestFilter(AsyncTestFilter):
+    boolean_queries = True
+
+
+class AsyncIndexedTestFilter(AsyncTestFilter):
+    memory_index = indexes.InvertedIndex(Article, ["title"])
+
+
+class AsyncCachedTestFilter(AsyncTestFilter):
+    search_plan_cache_size = 2
+    cache_results = True
+
+
+class AsyncValidateTests(TestCase):
+    async def test_async_validator(self):
+        field = fields.SearchField("title", validators=[validate_title])
+        self.assertTrue(await aio.avalidate(field, "blue"))
+        self.assertFalse(await aio.avalidate(field, "draft blue"))
+
+    async def test_sync_validator(self):
+        field = fields.IntegerSearchField("id")
+        self.assertTrue(await aio.avalidate(field, "1"))
+        self.assertFalse(await aio.avalidate(field, "blue"))
+
+    async def test_validated_once(self):
+        validator = mock.AsyncMock(return_value=True)
+        field = fields.SearchField("title", validators=[validator])
+        term = aio.SearchTerm("blue")
+        self.assertTrue(await aio.avalidate(field, term))
+        self.assertTrue(await aio.avalidate(field, term))
+        validator.assert_awaited_once_with(term)
+
+    async def test_is_valid_overridden(self):
+        class ShortSearchField(fields.SearchField):
+            def is_valid(self, search_value):
+                return len(search_value) < 4
+
+        self.assertTrue(await aio.avalidate(ShortSearchField("title"), "abc"))
+        self.assertFalse(await aio.avalidate(ShortSearchField("title"), "abcd"))
+
+    def test_is_async_validator(self):
+        self.assertTrue(aio.is_async_validator(validate_title))
+        self.assertTrue(aio.is_async_validator(mock.AsyncMock()))
+        self.assertFalse(aio.is_async_validator(lambda x: True))
+
+
+class AsyncFilterQuerysetTests(TestCase):
+    def setUp(self):
+        caches["default"].clear()
+        self.kind_of_blue = Article.objects.create(title="Kind of Blue")
+        self.blue_train = Article.objects.create(title="Blue Train")
+        self.draft = Article.objects.create(title="draft blue")
+
+    async def test_matches_sync(self):
+        request = mock_request("blue, train")
+        queryset = await AsyncTestFilter().afilter_queryset(request, Article.objects.all())
+        self.assertEqual(str(queryset.query),
+                         str(SyncTestFilter().filter_queryset(request, Article.objects.all()).query))
+        self.assertEqual(await AsyncTestFilter.aevaluate(queryset), [self.blue_train])
+
+    async def test_async_validator(self):
+        searches = await AsyncTestFilter().afilter_searching(mock_request("title: draft blue"))
+        self.assertEqual(searches, [])
+        searches = await AsyncTestFilter().afilter_searching(mock_request("title: blue"))
+        self.assertEqual(searches, [("blue", set(["title__icontains"]))])
+
+    def test_sync(self):
+        """The sync search path can not await the async validators"""
+        with self.assertRaisesRegex(TypeError, "validate_title"):
+            AsyncTestFilter().filter_queryset(mock_request("title: blue"), Article.objects.all())
+
+    async def test_not_searching(self):
+        queryset = Article.objects.all()
+        self.assertIs(await AsyncTestFilter().afilter_queryset(mock_request(""), queryset), queryset)
+        with self.assertRaises(ParseError):
+            await AsyncTestFilter().afilter_queryset(mock_request("title: draft"), queryset)
+
+    async def test_boolean_queries(self):
+        queryset = await AsyncBooleanTestFilter().afilter_queryset(
+            mock_request("title: kind OR title: train"), Article.objects.all())
+        self.assertEqual(await aio.aevaluate(queryset), [self.kind_of_blue, self.blue_train])
+        queryset = await AsyncBooleanTestFilter().afilter_queryset(
+            mock_request("title: draft OR title: train"), Article.objects.all())
+        self.assertEqual(await aio.aevaluate(queryset), [self.blue_train])
+        with self.assertRaises(ParseError):
+            # the async validator rejects the only search
+            await AsyncBooleanTestFilter().afilter_queryset(mock_request("title: draft"), Article.objects.all())
+
+    async def test_memory_index(self):
+        self.addCleanup(AsyncIndexedTestFilter.memory_index.disconnect)
+        queryset = await AsyncIndexedTestFilter().afilter_queryset(mock_request("title: train"), Article.objects.all())
+        self.assertTrue(AsyncIndexedTestFilter.memory_index.loaded)
+        self.assertNotIn("LIKE", str(queryset.query))
+        self.assertEqual(await aio.aevaluate(queryset), [self.blue_train])
+
+    async def test_search_plan_cache(self):
+        filterer = AsyncCachedTestFilter()
+        filterer.get_search_plan_cache().clear()
+        await filterer.aget_search_plan(mock_request("title: blue"))
+        await filterer.aget_search_plan(mock_request("title:   blue"))
+        self.assertEqual(filterer.get_search_plan_cache().info().hits, 1)
+
+    async def test_cached_results(self):
+        queryset = Article.objects.order_by("-id")
+        results = await AsyncCachedTestFilter().afilter_queryset(mock_request("title: blue"), queryset)
+        self.assertEqual(await aio.aevaluate(results), [self.draft, self.blue_train, self.kind_of_blue])
+        with mock.patch.object(AsyncCachedTestFilter, "build_filters") as mock_build:
+            results = await AsyncCachedTestFilter().afilter_queryset(mock_request("title: blue"), queryset)
+        self.assertFalse(mock_build.called)
+        self.assertEqual(await aio.aevaluate(results), [self.draft, self.blue_train, self.kind_of_blue])
+
+    async def test_metrics(self):
+        received = list()
+
+        def receiver(sender, metrics, **kwargs):
+            received.append(metrics)
+
+        signals.search_finished.connect(receiver, sender=AsyncTestFilter)
+        try:
+            await AsyncTestFilter().afilter_queryset(mock_request("title: draft, title: blue"), Article.objects.all())
+        finally:
+            signals.search_finished.disconnect(receiver, sender=AsyncTestFilter)
+        self.assertEqual(dict(received[0].validations), {"title": [1, 1]})
+        self.assertIn("validate", received[0].timings)
@@ -0,0 +1,109 @@
+# coding=utf-8
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from drf_search import autocomplete, filters, fields
+from django.test import TestCase
+from .models import Article
+
+
+class AutocompleteFilter(filters.BaseSearchFilter):
+    title = fields.SearchField("title", default=True, autocomplete=True, aliases="t")
+    body = fields.SearchField("body", default=True, autocomplete=True)
+    id = fields.IntegerSearchField("id", default=True)
+
+
+class CompletionIndexTests(TestCase):
+    def setUp(self):
+        self.index = autocomplete.CompletionIndex("title")
+        for pk, value in enumerate(["Miles Davis", "Mingus", "miles davis", "Monk", "Miles Davis", "Coltrane"]):
+            self.index.add(pk, value)
+
+    def test_complete(self):
+        self.assertEqual(self.index.complete("mi"), [("Miles Davis", 3), ("Mingus", 1)])
+        self.assertEqual(self.index.complete("MIN"), [("Mingus", 1)])
+        self.assertEqual(self.index.complete("m", limit=2), [("Miles Davis", 3), ("Mingus", 1)])
+        self.assertEqual(self.index.complete("x"), [])
+
+    def test_empty_prefix(self):
+        self.assertEqual(self.index.complete("", limit=1), [("Miles Davis", 3)])
+
+    def test_replace(self):
+        self.index.add(0, "Monk")
+        self.index.add(2, "Monk")
+        self.assertEqual(self.index.complete("m"), [("Monk", 3), ("Miles Davis", 1), ("Mingus", 1)])
+
+    def test_remove(self):
+        self.index.remove(1)
+        self.index.remove(1)
+        self.assertEqual(self.index.complete("min"), [])
+        self.assertEqual(len(self.index), 3)
+
+
+class AutocompleteTests(TestCase):
+    def setUp(self):
+        Article.objects.create(title="Miles Ahead", body="Miles Davis")
+        Article.objects.create(title="Milestones", body="Miles Davis")
+        Article.objects.create(title="Mingus Ah Um", body="Charles Mingus")
+        self.autocomplete = autocomplete.Autocomplete(AutocompleteFilter, Article)
+        self.addCleanup(self.autocomplete.disconnect)
+
+    def test_field_names(self):
+        self.assertEqual(self.autocomplete.get_field_names("title: blue, body: Mi"), (("body",), "Mi"))
+        field_names, prefix = self.autocomplete.get_field_names("Mi")
+        self.assertCountEqual(field_names, ["title", "t", "body", "id"])
+        self.assertEqual(prefix, "Mi")
+        self.assertEqual(self.autocomplete.get_field_names("title:"), (("title",), ""))
+
+    def test_default_fields(self):
+        self.assertEqual(self.autocomplete.complete("mi"), [
+            autocomplete.Completion("body", "Miles Davis", 2),
+            autocomplete.Completion("title", "Miles Ahead", 1),
+            autocomplete.Completion("title", "Milestones", 1),
+            autocomplete.Completion("title", "Mingus Ah Um", 1)])
+
+    def test_field(self):
+        self.assertEqual(self.autocomplete.complete("body: Mi"), [autocomplete.Completion("body", "Miles Davis", 2)])
+        self.assertEqual(self.autocomplete.complete("t: mile", limit=1),
+                         [autocomplete.Completion("t", "Miles Ahead", 1)])
+
+    def test_not_autocompleted(self):
+        self.assertEqual(self.autocomplete.complete("id: 1"), [])
+
+    def test_no_queries(self):
+        self.autocomplete.complete("mi")
+        with self.assertNumQueries(0):
+            self.autocomplete.complete("ming")
+
+    def test_signals(self):
+        self.autocomplete.complete("mi")
+        article = Article.objects.create(title="Mingus", body="Charles Mingus")
+        self.assertEqual(self.autocomplete.complete("body: ch"),
+                         [autocomplete.Completion("body", "Charles Mingus", 2)])
+        article.delete()
+        self.assertEqual(self.autocomplete.complete("body: ch"),
+                         [autocomplete.Completion("body", "Charles Mingus", 1)])
+
+    def test_queryset(self):
+        queryset = Article.objects.exclude(body="Miles Davis")
+        completer = autocomplete.Autocomplete(AutocompleteFilter, Article, queryset)
+        self.addCleanup(completer.disconnect)
+        self.assertEqual(completer.complete("mi"), [autocomplete.Completion("title", "Mingus Ah Um", 1)])
+
+        article = Article.objects.get(title="Milestones")
+        article.body = "Miles Davis Sextet"
+        article.save()
+        self.assertEqual(completer.complete("title: mi"), [
+            autocomplete.Completion("title", "Milestones", 1), autocomplete.Completion("title", "Mingus Ah Um", 1)])
+        article.body = "Miles Davis"
+        article.save()
+        self.assertEqual(completer.complete("title: mi"), [autocomplete.Completion("title", "Mingus Ah Um", 1)])
+
+    def test_relation(self):
+        class RelatedFilter(filters.BaseSearchFilter):
+            email = fields.SearchField("user__email", autocomplete=True)
+
+        with self.assertRaises(ValueError):
+            autocomplete.Autocomplete(RelatedFilter, Article)
@@ -0,0 +1,47 @@
+# coding=utf-8
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from drf_search import cache
+from django.test import TestCase
+
+
+class SearchPlanCacheTests(TestCase):
+    def test_get_set(self):
+        plan_cache = cache.SearchPlanCache(2)
+        self.assertEqual(plan_cache.get("miles"), None)
+        plan_cache.set("miles", "davis")
+        self.assertEqual(plan_cache.get("miles"), "davis")
+        self.assertEqual(len(plan_cache), 1)
+        self.assertEqual(plan_cache.info(), cache.CacheInfo(1, 1, 0, 2, 1))
+
+    def test_eviction(self):
+        plan_cache = cache.SearchPlanCache(2)
+        plan_cache.set("miles", 1)
+        plan_cache.set("john", 2)
+        plan_cache.get("miles")  # `john` is now the least recently used
+        plan_cache.set("herbie", 3)
+        self.assertIn("miles", plan_cache)
+        self.assertIn("herbie", plan_cache)
+        self.assertNotIn("john", plan_cache)
+        self.assertEqual(plan_cache.evictions, 1)
+
+        # replacing a key does not evict anything
+        plan_cache.set("herbie", 4)
+        self.assertEqual(plan_cache.get("herbie"), 4)
+        self.assertEqual(plan_cache.evictions, 1)
+
+    def test_disabled(self):
+        plan_cache = cache.SearchPlanCache(0)
+        plan_cache.set("miles", 1)
+        self.assertEqual(len(plan_cache), 0)
+        self.assertEqual(plan_cache.get("miles"), None)
+
+    def test_clear(self):
+        plan_cache = cache.SearchPlanCache(2)
+        plan_cache.set("miles", 1)
+        plan_cache.get("miles")
+        plan_cache.clear()
+        self.assertEqual(plan_cache.info(), cache.CacheInfo(0, 0, 0, 2, 0))
@@ -4,6 +4,10 @@ from __future__ import division
 from __future__ import print_function
 from __future__ import unicode_literals
 
+import copy
+import pickle
+from decimal import Decimal
+import mock
 from mock import patch
 from drf_search import fields, validators
 from django.test import TestCase
@@ -17,6 +21,7 @@ class SearchFieldTest(TestCase):
         self.assertEqual(field.field_lookup, "icontains")
         self.assertEqual(field.constructed, "pk__icontains")
         self.assertEqual(field.default, False)
+        self.assertEqual(field.weight, 1)
         self.assertEqual(field._validators, [])
 
         field = fields.SearchField(
@@ -30,6 +35,11 @@ class SearchFieldTest(TestCase):
         self.assertEqual(field.default, True)
         self.assertEqual(field._validators, [validators.validate_list])
 
+    def test_weight(self):
+        field = fields.IntegerSearchField("pk", weight=2.5)
+        self.assertEqual(field.weight, 2.5)
+        self.assertEqual(copy.deepcopy(field).weight, 2.5)
+
     def test_validators(self):
         # no validators
         field = fields.SearchField("pk")
@@ -50,6 +60,23 @@ class SearchFieldTest(TestCase):
         self.assertTrue(field.is_valid("9780123456789"))
         self.assertFalse(field.is_valid("abcdef"))
 
+    def test_validator_signature(self):
+        field1 = fields.IntegerSearchField("pk")
+        field2 = fields.IntegerSearchField("isbn", field_lookup="startswith")
+        field3 = fields.IntegerSearchField("pk", validators=lambda x: len(x) == 13)
+        self.assertEqual(field1.validator_signature, field2.validator_signature)
+        self.assertNotEqual(field1.validator_signature, field3.validator_signature)
+        self.assertEqual(field1.validator_signature, field1.freeze().validator_signature)
+
+    def test_is_valid__search_term(self):
+        validator = mock.Mock(return_value=True)
+        field1 = fields.StringSearchField("fname", validators=[validator])
+        field2 = fields.StringSearchField("lname", validators=[validator])
+        term = validators.SearchTerm("miles")
+        self.assertTrue(field1.is_valid(term))
+        self.assertTrue(field2.is_valid(term))
+        validator.assert_called_once_with(term)
+
     def test_field_lookup(self):
         field = fields.SearchField("pk")
         self.assertEqual(field.field_lookup, "icontains")
@@ -93,6 +120,81 @@ class SearchFieldTest(TestCase):
             self.assertEqual(field.constructed, expected_constructed)
         self.assertEqual(field._constructed, expected_constructed)
 
+    def test_freeze(self):
+        validator = mock.Mock(return_value=True)
+        field = fields.SearchField("pk", validators=[validator], aliases="id", weight=2)
+        frozen = field.freeze()
+        self.assertIsNot(frozen, field)
+        self.assertTrue(frozen.frozen)
+        self.assertFalse(field.frozen)
+        self.assertEqual(frozen._constructed, "pk__icontains")
+        self.assertEqual(frozen._validators, (validator,))
+        self.assertEqual(frozen.aliases, ("id",))
+        self.assertEqual(frozen.weight, 2)
+        self.assertIs(frozen.freeze(), frozen)
+
+        # the original field can still be changed, without changing the frozen field
+        field.default = True
+        field.aliases.append("key")
+        self.assertFalse(frozen.default)
+        self.assertEqual(frozen.aliases, ("id",))
+
+    def test_freeze__immutable(self):
+        frozen = fields.SearchField("pk").freeze()
+        with self.assertRaises(AttributeError):
+            frozen.default = True
+        with self.assertRaises(AttributeError):
+            frozen.extra = True
+        with self.assertRaises(AttributeError):
+            del frozen.weight
+
+        # copies of a frozen field can be changed again
+        field = copy.deepcopy(frozen)
+        field.default = True
+        self.assertFalse(field.frozen)
+
+    def test_freeze__copy(self):
+        frozen = fields.SearchField("pk", aliases="id").freeze()
+        self.assertIs(copy.copy(frozen), frozen)
+
+    def test_freeze__pickle(self):
+        frozen = fields.IntegerSearchField("id", ranges=True, validators=validators.validate_numerical).freeze()
+        with patch.object(fields.IntegerSearchField, "__init__") as mock_init:
+            unpickled = pickle.loads(pickle.dumps(frozen))
+        self.assertFalse(mock_init.called)
+        self.assertIs(type(unpickled), type(frozen))
+        self.assertEqual(unpickled._validators, frozen._validators)
+        self.assertEqual(unpickled.aliases, ())
+        self.assertTrue(unpickled.ranges)
+        self.assertEqual(unpickled.construct(">5"), "id__gt")
+        with self.assertRaises(AttributeError):
+            unpickled.default = True
+
+    def test_freeze__no_init(self):
+        field = fields.EmailSearchField("email", partial=True)
+        with patch.object(fields.EmailSearchField, "__init__") as mock_init:
+            frozen = field.freeze()
+        self.assertFalse(mock_init.called)
+        self.assertIsInstance(frozen, fields.EmailSearchField)
+        self.assertEqual(type(frozen).__name__, "EmailSearchField")
+        self.assertTrue(frozen.partial)
+        self.assertEqual(frozen._validators, tuple(field._validators))
+
+    def test_freeze__subclass_without_slots(self):
+        class CustomSearchField(fields.SearchField):
+            def __init__(self, field_name, **kwargs):
+                super(CustomSearchField, self).__init__(field_name, **kwargs)
+                self.extra = "extra"
+
+        frozen = CustomSearchField("pk").freeze()
+        self.assertEqual(frozen.extra, "extra")
+        with self.assertRaises(AttributeError):
+            frozen.extra = "changed"
+
+    def test_slots(self):
+        self.assertFalse(hasattr(fields.SearchField("pk"), "__dict__"))
+        self.assertFalse(hasattr(fields.EmailSearchField("email"), "__dict__"))
+
 
 class ExactSearchFieldTests(TestCase):
     def test_simple(self):
@@ -117,6 +219,11 @@ class ExactSearchFieldTests(TestCase):
         self.assertEqual(field.match_case, False)
         self.assertEqual(field.field_lookup, "iexact")
 
+    def test_to_python(self):
+        field = fields.SearchField("pk")
+        term = validators.SearchTerm("42")
+        self.assertIs(field.to_python(term), term)
+
 
 class StringSearchFieldTests(TestCase):
     def test_simple(self):
@@ -249,6 +356,71 @@ class IntegerSearchFieldTests(TestCase):
         self.assertFalse(field.is_valid("123"))
         self.assertTrue(field.is_valid("9780123456789"))
 
+    def test_to_python(self):
+        field = fields.IntegerSearchField("pk")
+        self.assertEqual(field.to_python("42"), 42)
+        self.assertEqual(field.to_python(validators.SearchTerm("42")), 42)
+        self.assertEqual(field.to_python("\u00b2"), "\u00b2")  # a digit, but not a decimal
+
+        # text lookups keep the search value as it is
+        field = fields.IntegerSearchField("pk", field_lookup="startswith")
+        self.assertEqual(field.to_python("42"), "42")
+
+    def test_ranges(self):
+        field = fields.IntegerSearchField("pk", ranges=True)
+        self.assertTrue(field.is_valid("100..200"))
+        self.assertTrue(field.is_valid(">=5"))
+        self.assertEqual(field.construct("42"), "pk__exact")
+        self.assertEqual(field.construct(validators.SearchTerm("100..200")), "pk__range")
+        self.assertEqual(field.construct("<10"), "pk__lt")
+        self.assertEqual(field.to_python("100..200"), [100, 200])
+        self.assertEqual(field.to_python("200..100"), [100, 200])
+        self.assertEqual(field.to_python(">=5"), 5)
+        self.assertEqual(set(field.lookups),
+                         {"pk__exact", "pk__gt", "pk__gte", "pk__lt", "pk__lte", "pk__range"})
+        self.assertTrue(copy.deepcopy(field).ranges)
+        self.assertTrue(copy.deepcopy(field.freeze()).ranges)
+
+    def test_ranges__default(self):
+        field = fields.IntegerSearchField("pk")
+        self.assertFalse(field.is_valid("100..200"))
+        self.assertEqual(field.construct("100..200"), "pk__exact")
+        self.assertEqual(field.lookups, ("pk__exact",))
+        self.assertFalse(copy.deepcopy(field).ranges)
+        self.assertFalse(field.freeze().ranges)
+
+    def test_numerical(self):
+        """The base class searches integers"""
+        field = fields.NumericalSearchField("pk")
+        self.assertTrue(field.is_valid("42"))
+        self.assertFalse(field.is_valid("abc"))
+        self.assertEqual(field.to_python("42"), 42)
+        self.assertEqual(copy.deepcopy(field).to_python("42"), 42)
+
+
+class DecimalSearchFieldTests(TestCase):
+    def test_simple(self):
+        field = fields.DecimalSearchField("price")
+        self.assertEqual(field.field_lookup, "exact")
+        self.assertEqual(field.constructed, "price__exact")
+        self.assertEqual(len(field._validators), 1)
+
+    def test_is_valid(self):
+        field = fields.DecimalSearchField("price")
+        self.assertTrue(field.is_valid("-1.5"))
+        self.assertFalse(field.is_valid("1.5..2.5"))
+        self.assertFalse(field.is_valid("abc"))
+        field = fields.DecimalSearchField("price", ranges=True)
+        self.assertTrue(field.is_valid("1.5..2.5"))
+        self.assertTrue(field.is_valid("<0.5"))
+
+    def test_to_python(self):
+        field = fields.DecimalSearchField("price", ranges=True)
+        self.assertEqual(field.to_python("-1.5"), Decimal("-1.5"))
+        self.assertEqual(field.to_python("2.5..1.5"), [Decimal("1.5"), Decimal("2.5")])
+        self.assertEqual(field.to_python(">0.5"), Decimal("0.5"))
+        self.assertEqual(field.construct(">0.5"), "price__gt")
+
 
 class BooleanSearchFieldTests(TestCase):
     def test_simple(self):
@@ -282,6 +454,25 @@ class BooleanSearchFieldTests(TestCase):
         self.assertFalse(field.is_valid("False"))
         self.assertFalse(field.is_valid("abc"))
 
+    def test_to_python(self):
+        field = fields.BooleanSearchField("active", field_lookup="exact")
+        self.assertIs(field.to_python("True"), True)
+        self.assertIs(field.to_python("1"), True)
+        self.assertIs(field.to_python("false"), False)
+        self.assertIs(field.to_python("0"), False)
+        self.assertIs(field.to_python(False), False)
+
+        # the default `iexact` lookup is searched with `exact` and a boolean
+        field = fields.BooleanSearchField("active")
+        self.assertIs(field.to_python("True"), True)
+        self.assertIs(field.to_python("0"), False)
+        self.assertEqual(field.construct("True"), "active__exact")
+        self.assertEqual(field.lookups, ("active__iexact", "active__exact"))
+
+        field = fields.BooleanSearchField("active", field_lookup="contains")
+        self.assertEqual(field.to_python("True"), "True")
+        self.assertEqual(field.construct("True"), "active__contains")
+
 
 class ListSearchFieldTests(TestCase):
     def test_simple(self):
@@ -308,3 +499,17 @@ class ListSearchFieldTests(TestCase):
         field = fields.ListSearchField("pk", validators=lambda x: len(x) == 3)
         self.assertFalse(field.is_valid([123, "abc"]))
         self.assertTrue(field.is_valid([1, 2, 3]))
+
+    def test_to_python(self):
+        field = fields.ListSearchField("pk")
+        self.assertEqual(field.to_python("[1, 2, 3]"), [1, 2, 3])
+        self.assertEqual(field.to_python([1, 2]), [1, 2])
+        self.assertEqual(field.to_python("abc"), "abc")
+
+    def test_to_python__parsed_once(self):
+        field = fields.ListSearchField("pk")
+        term = validators.SearchTerm("[1, 2]")
+        self.assertTrue(field.is_valid(term))
+        with patch("drf_search.validators.json.loads") as mock_loads:
+            self.assertEqual(field.to_python(term), [1, 2])
+        self.assertFalse(mock_loads.called)
@@ -7,9 +7,21 @@ from __future__ import unicode_literals
 import six
 import mock
 from contextlib import contextmanager
-from drf_search import filters, fields
+from drf_search import filters, fields, signals
+from drf_search.query import AndNode, OrNode, SearchCost, simplify_search
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import connection
+from django.db.models import Q
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from rest_framework.exceptions import NotFound, ParseError
+from rest_framework import serializers
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from .models import Article, Contributor
+from .utils import mock_request
 
 
 class TestFilter(filters.BaseSearchFilter):
@@ -20,6 +32,41 @@ class TestFilter(filters.BaseSearchFilter):
     contributor = fields.SearchField("contributors__display_name")
 
 
+class CachedTestFilter(TestFilter):
+    search_plan_cache_size = 2
+
+
+class ExistsTestFilter(TestFilter):
+    use_exists_subqueries = True
+
+
+class UnionTestFilter(TestFilter):
+    use_union_queries = True
+    title = fields.SearchField("title", default=True)
+
+
+class LimitedTestFilter(TestFilter):
+    max_search_terms = 2
+    max_search_joins = 1
+    max_search_cost = 12
+    regex = fields.RegexSearchField("title", match_case=False)
+
+
+class CachedResultsTestFilter(TestFilter):
+    cache_results = True
+    result_cache_max_results = 2
+
+
+class RankedTestFilter(TestFilter):
+    rank_results = True
+    title = fields.SearchField("title", default=True, weight=2)
+    contributor = fields.SearchField("contributors__display_name", default=True)
+
+
+def mock_view(paginator=None, filter_backends=(UnionTestFilter,)):
+    return mock.Mock(paginator=paginator, filter_backends=filter_backends)
+
+
 @contextmanager
 def mock_search_terms(*terms):
     with mock.patch("drf_search.filters.BaseSearchFilter.get_search_terms") as mock_terms:
@@ -133,6 +180,37 @@ class SearchFilterMetaclassTest(TestCase):
         self.assertEqual(list(search_fields.keys()), expected_fields)
 
 
+class FrozenMetadataTests(TestCase):
+    def test_field_names(self):
+        self.assertEqual(TestFilter._search_field_names, frozenset(["id", "title", "email", "@", "contributor"]))
+        self.assertEqual(set(TestFilter._default_field_names), {"id", "email", "@"})
+        self.assertEqual(TestFilter._default_field_names, tuple(TestFilter.get_default_fields().keys()))
+
+    def test_immutable(self):
+        with self.assertRaises(TypeError):
+            TestFilter._search_fields["jazz"] = fields.SearchField("jazz")
+        self.assertNotIn("jazz", TestFilter._search_fields)
+
+    def test_subclass(self):
+        class ChildFilter(TestFilter):
+            isbn = fields.IntegerSearchField("isbn", default=True, aliases="ean")
+
+        self.assertEqual(ChildFilter._search_field_names, TestFilter._search_field_names | {"isbn", "ean"})
+        self.assertEqual(set(ChildFilter._default_field_names), {"id", "email", "@", "isbn", "ean"})
+        self.assertIs(ChildFilter._search_fields["title"], TestFilter._search_fields["title"])
+
+    def test_frozen_fields(self):
+        title = TestFilter._search_fields["title"]
+        self.assertTrue(title.frozen)
+        self.assertIsNot(title, TestFilter.title)
+        self.assertIs(TestFilter._search_fields["email"], TestFilter._search_fields["@"])
+
+        class ChildFilter(filters.BaseSearchFilter):
+            title = TestFilter._search_fields["title"]
+
+        self.assertIs(ChildFilter._search_fields["title"], title)  # frozen fields are shared as they are
+
+
 class DefaultFieldsTests(BaseFilterTest):
     def test_simple(self):
         self.assertEqual(len(self.filterer.get_default_fields()), 3)
@@ -239,6 +317,24 @@ class IterSearching(BaseFilterTest):
         self.assertEqual(len(result), 2)
         self.assertEqual(result, [("title", None), ("email", None)])
 
+    def test_field_regex__compiled_once(self):
+        self.assertEqual(TestFilter._field_pattern.pattern, TestFilter.field_regex)
+        self.assertIs(self.filterer.get_field_pattern(), TestFilter._field_pattern)
+
+    def test_field_regex__overridden(self):
+        class DashFilter(TestFilter):
+            field_regex = r"(-[\w]+\:)"
+
+        self.filterer = DashFilter()
+        self.assertEqual(self.filterer.get_field_pattern().pattern, DashFilter.field_regex)
+        result = self.run_iter_searching("-title: draft title: miles")
+        self.assertEqual(result, [("-title", "draft title: miles")])
+
+        # changing the regex on an instance is still listened to
+        self.filterer.field_regex = r"([\w]+\=)"
+        result = self.run_iter_searching("title= draft")
+        self.assertEqual(result, [("title=", "draft")])
+
 
 class ValidateFieldsTests(BaseFilterTest):
     def test_simple(self):
@@ -274,6 +370,29 @@ class ValidateFieldsTests(BaseFilterTest):
         with six.assertRaisesRegex(self, NotFound, "Field 'jazz' is not searchable"):
             list(self.filterer._validate_fields(("id", "@", "jazz"), "abcd"))
 
+    def test_grouped_by_signature(self):
+        """Fields that share validators are validated once for the whole group"""
+        with mock.patch.object(fields.SearchField, "is_valid", autospec=True) as mock_is_valid:
+            mock_is_valid.return_value = True
+            valid_fields = list(self.filterer._validate_fields(("title", "contributor", "id"), "abcd"))
+        self.assertEqual(self._get_field_names(valid_fields), ["title", "contributors__display_name", "id"])
+        self.assertEqual(mock_is_valid.call_count, 2)
+
+    def test_grouped_by_signature__is_valid(self):
+        """Fields that override `is_valid` are never grouped with fields that do not"""
+        class ShortSearchField(fields.SearchField):
+            def is_valid(self, search_value):
+                return len(search_value) < 4
+
+        class ShortTestFilter(filters.BaseSearchFilter):
+            title = fields.SearchField("title")
+            short = ShortSearchField("title", field_lookup="iexact")
+
+        filterer = ShortTestFilter()
+        self.assertEqual(self._get_field_names(filterer._validate_fields(("title", "short"), "abcd")), ["title"])
+        self.assertEqual(self._get_field_names(filterer._validate_fields(("short", "title"), "abcd")), ["title"])
+        self.assertEqual(len(list(filterer._validate_fields(("title", "short"), "abc"))), 2)
+
 
 class FilterSearchingTests(BaseFilterTest):
     def test_simple(self):
@@ -300,3 +419,706 @@ class FilterSearchingTests(BaseFilterTest):
         split_terms = [(("id",), "Miles"), (("jazz",), "Davis")]
         with six.assertRaisesRegex(self, NotFound, "Field 'jazz' is not searchable"):
             self.run_filter_searching(*split_terms)
+
+
+class SearchPlanCacheTests(TestCase):
+    def setUp(self):
+        CachedTestFilter.get_search_plan_cache().clear()
+        self.filterer = CachedTestFilter()
+
+    def test_per_class(self):
+        self.assertEqual(TestFilter.get_search_plan_cache().maxsize, 0)
+        self.assertEqual(CachedTestFilter.get_search_plan_cache().maxsize, 2)
+        self.assertIsNot(TestFilter.get_search_plan_cache(), CachedTestFilter.get_search_plan_cache())
+
+    def test_plan_key(self):
+        key = self.filterer.get_search_plan_key(mock_request(" first   name: Miles,  Davis "))
+        self.assertEqual(key, ((None, "first"), ("name", "Miles"), (None, "Davis")))
+
+    def test_inner_whitespace(self):
+        Article.objects.create(title="Miles  Davis")
+        miles_davis = Article.objects.create(title="Miles Davis")
+        self.filterer.filter_queryset(mock_request("title: Miles  Davis"), Article.objects.all())
+        results = self.filterer.filter_queryset(mock_request("title: Miles Davis"), Article.objects.all())
+        self.assertEqual(list(results), [miles_davis])
+
+    def test_cached(self):
+        plan = self.filterer.get_search_plan(mock_request("title: Miles, Davis"))
+        self.assertIn(("Miles", frozenset({"title__icontains"})), plan)
+        self.assertIn(("Davis", frozenset({"user__email__icontains"})), plan)
+
+        with mock.patch.object(self.filterer, "filter_searching") as mock_searching:
+            cached_plan = self.filterer.get_search_plan(mock_request("title:  Miles,Davis"))
+            self.assertFalse(mock_searching.called)
+        self.assertEqual(plan, cached_plan)
+
+        info = CachedTestFilter.get_search_plan_cache().info()
+        self.assertEqual((info.hits, info.misses, info.currsize), (1, 1, 1))
+
+    def test_eviction(self):
+        for search in ("Miles", "Davis", "Herbie"):
+            self.filterer.get_search_plan(mock_request(search))
+        self.assertEqual(CachedTestFilter.get_search_plan_cache().evictions, 1)
+
+    def test_disabled(self):
+        filterer = TestFilter()
+        with mock.patch.object(filterer, "filter_searching") as mock_searching:
+            filterer.get_search_plan(mock_request("Miles"))
+            filterer.get_search_plan(mock_request("Miles"))
+            self.assertEqual(mock_searching.call_count, 2)
+        self.assertEqual(len(TestFilter.get_search_plan_cache()), 0)
+
+
+class FilterQuerysetTests(TestCase):
+    def setUp(self):
+        miles = Contributor.objects.create(display_name="Miles Davis")
+        john = Contributor.objects.create(display_name="John Coltrane")
+        self.user = User.objects.create(username="teo", email="teo.macero@columbia.com")
+        self.kind_of_blue = Article.objects.create(title="Kind of Blue", user=self.user)
+        self.kind_of_blue.contributors.add(miles, john)
+        self.giant_steps = Article.objects.create(title="Giant Steps")
+        self.giant_steps.contributors.add(john)
+
+    def search(self, search, filter_class=TestFilter):
+        return filter_class().filter_queryset(mock_request(search), Article.objects.all())
+
+    def test_simple(self):
+        self.assertEqual(list(self.search("title: blue")), [self.kind_of_blue])
+        self.assertEqual(list(self.search("teo.macero")), [self.kind_of_blue])
+        self.assertEqual(list(self.search("")), [self.kind_of_blue, self.giant_steps])
+
+    def test_boolean_field(self):
+        class BooleanFieldTestFilter(TestFilter):
+            active = fields.BooleanSearchField("user__is_active")
+
+        self.giant_steps.user = User.objects.create(username="rudy", is_active=False)
+        self.giant_steps.save()
+        self.assertEqual(list(self.search("active: true", BooleanFieldTestFilter)), [self.kind_of_blue])
+        self.assertEqual(list(self.search("active: FALSE", BooleanFieldTestFilter)), [self.giant_steps])
+        self.assertEqual(list(self.search("active: 1", BooleanFieldTestFilter)), [self.kind_of_blue])
+
+    def test_to_many(self):
+        self.assertEqual(list(self.search("contributor: o")), [self.kind_of_blue, self.giant_steps])
+        self.assertEqual(list(self.search("contributor: miles, contributor: john")), [self.kind_of_blue])
+
+    def test_invalid(self):
+        with six.assertRaisesRegex(self, ParseError, "The search was not valid for any of the provided fields"):
+            self.search("id: miles")
+
+    def test_build_filters(self):
+        filterer = TestFilter()
+        searches = [("blue", {"title__icontains"}), ("teo", {"user__email__icontains"}),
+                    ("miles", {"contributors__display_name__icontains"}),
+                    ("john", {"contributors__display_name__icontains"})]
+        queries = filterer.build_filters(Article.objects.all(), searches)
+        self.assertEqual(len(queries), 3)
+        self.assertEqual(queries[0].children, [("title__icontains", "blue"), ("user__email__icontains", "teo")])
+        self.assertEqual(self.search("title: blue, email: teo, contributor: miles, contributor: john").count(), 1)
+
+
+class ExistsSubqueriesTests(FilterQuerysetTests):
+    def search(self, search, filter_class=ExistsTestFilter):
+        return super(ExistsSubqueriesTests, self).search(search, filter_class)
+
+    def test_no_join(self):
+        queryset = self.search("contributor: o")
+        self.assertFalse(queryset.query.distinct)
+        self.assertNotIn("JOIN", str(queryset.query).split("EXISTS")[0])
+
+        # the join to a to-one relation is kept on the outer query
+        queryset = self.search("email: teo")
+        self.assertIn("JOIN", str(queryset.query))
+        self.assertNotIn("EXISTS", str(queryset.query))
+
+    def test_relation_cache(self):
+        ExistsTestFilter._relation_cache.clear()
+        with mock.patch("drf_search.filters.crosses_to_many", return_value=True) as mock_crosses:
+            list(self.search("contributor: o"))
+            list(self.search("contributor: miles"))
+        self.assertEqual(mock_crosses.call_count, 1)
+        self.assertEqual(ExistsTestFilter._relation_cache[(Article, "contributors__display_name__icontains")], True)
+        self.assertIsNot(TestFilter._relation_cache, ExistsTestFilter._relation_cache)
+        ExistsTestFilter._relation_cache.clear()
+
+
+class UnionQueriesTests(FilterQuerysetTests):
+    def setUp(self):
+        super(UnionQueriesTests, self).setUp()
+        self.paginator = PageNumberPagination()
+        self.paginator.page_size = 1
+
+    def search(self, search, filter_class=UnionTestFilter, view=None, **params):
+        view = view or mock_view(self.paginator)
+        return filter_class().filter_queryset(mock_request(search, **params), Article.objects.all(), view)
+
+    def test_union(self):
+        queryset = self.search("teo")
+        self.assertIn("UNION", str(queryset.query))
+        self.assertEqual(list(queryset), [self.kind_of_blue])
+
+    def test_not_paginated(self):
+        queryset = self.search("teo", view=mock_view(None))
+        self.assertNotIn("UNION", str(queryset.query))
+        self.assertEqual(list(queryset), [self.kind_of_blue])
+
+    def test_no_limit(self):
+        queryset = self.search("teo", page=2)
+        self.assertNotIn("LIMIT", str(queryset.query))
+
+    def test_paginated(self):
+        """The paginator counts every result, and not only the ones up to the page"""
+        miles = Contributor.objects.create(display_name="Miles Blue")
+        for index in range(20):
+            Article.objects.create(title="Blue {}".format(index)).contributors.add(miles)
+        self.paginator.page_size = 5
+        request = Request(APIRequestFactory().get("/", {"search": "blue"}))
+        view = mock_view(self.paginator)
+        queryset = UnionTestFilter().filter_queryset(request, Article.objects.all(), view)
+        page = self.paginator.paginate_queryset(queryset, request, view)
+        self.assertEqual(len(page), 5)
+        self.assertEqual(len(set(page)), 5)
+        self.assertEqual(self.paginator.page.paginator.count, 21)
+        self.assertIn("page=2", self.paginator.get_next_link())
+
+
+class SearchRankTests(TestCase):
+    def setUp(self):
+        miles = Contributor.objects.create(display_name="Miles Davis")
+        self.milestones = Article.objects.create(title="Milestones")
+        self.miles_ahead = Article.objects.create(title="Miles Ahead")
+        self.sketches = Article.objects.create(title="Sketches of Spain")
+        self.sketches.contributors.add(miles)
+        self.miles = Article.objects.create(title="Miles")
+
+    def search(self, search):
+        return RankedTestFilter().filter_queryset(mock_request(search), Article.objects.all())
+
+    def test_rank(self):
+        queryset = self.search("miles")
+        self.assertEqual(list(queryset), [self.miles, self.milestones, self.miles_ahead, self.sketches])
+        self.assertEqual(list(result.search_rank for result in queryset), [6, 2, 2, 1])
+
+    def test_multiple_terms(self):
+        self.sketches.title = "Miles Sketches"
+        self.sketches.save()
+        queryset = self.search("miles, sketches")
+        self.assertEqual(list(queryset), [self.sketches])
+        self.assertEqual(queryset[0].search_rank, 5)
+
+    def test_to_many(self):
+        """Matching a to-many relation does not duplicate the results"""
+        Contributor.objects.create(display_name="Miles Ahead").article_set.add(self.sketches)
+        queryset = self.search("miles")
+        self.assertEqual(list(queryset), [self.miles, self.milestones, self.miles_ahead, self.sketches])
+
+
+class SearchCostTests(TestCase):
+    def setUp(self):
+        self.filterer = LimitedTestFilter()
+        self.queryset = Article.objects.all()
+
+    def test_get_search_cost(self):
+        searches = [("blue", {"title__icontains", "user__email__icontains"}),
+                    ("^blue", {"title__iregex"}),
+                    ("miles", {"contributors__display_name__icontains", "user__email__icontains"})]
+        cost = self.filterer.get_search_cost(self.queryset, searches)
+        self.assertEqual(cost, SearchCost(terms=3, clauses=5, joins=2, regex=1, total=16))
+        self.assertEqual(self.filterer.get_search_cost(self.queryset, []), SearchCost(0, 0, 0, 0, 0))
+
+    def test_within_limits(self):
+        queryset = self.filterer.filter_queryset(mock_request("title: blue, regex: ^kind"), self.queryset)
+        self.assertEqual(list(queryset), [])
+        self.assertEqual(self.filterer.search_cost, SearchCost(terms=2, clauses=2, joins=0, regex=1, total=11))
+
+    def test_rejected(self):
+        with six.assertRaisesRegex(self, ParseError, "terms 3 exceeds the limit of 2"):
+            self.filterer.filter_queryset(mock_request("title: a, title: b, title: c"), self.queryset)
+        with six.assertRaisesRegex(self, ParseError, "joins 2 exceeds the limit of 1"):
+            self.filterer.filter_queryset(mock_request("email: a, contributor: b"), self.queryset)
+        with six.assertRaisesRegex(self, ParseError, "cost 20 exceeds the limit of 12"):
+            self.filterer.filter_queryset(mock_request("regex: a, regex: b"), self.queryset)
+        self.assertEqual(self.filterer.search_cost.total, 20)
+
+    def test_truncated(self):
+        self.filterer.truncate_expensive_searches = True
+        self.filterer.filter_queryset(mock_request("title: a, regex: b, regex: c"), self.queryset)
+        self.assertEqual(self.filterer.search_cost, SearchCost(terms=2, clauses=2, joins=0, regex=1, total=11))
+
+        # nothing fits within the limits
+        self.filterer.max_search_cost = 5
+        with six.assertRaisesRegex(self, ParseError, "cost 11 exceeds the limit of 5"):
+            self.filterer.filter_queryset(mock_request("regex: b, title: a"), self.queryset)
+
+
+class ResultCacheTests(TestCase):
+    def setUp(self):
+        caches["default"].clear()
+        self.miles = Contributor.objects.create(display_name="Miles Davis")
+        self.kind_of_blue = Article.objects.create(title="Kind of Blue")
+        self.blue_train = Article.objects.create(title="Blue Train")
+        self.kind_of_blue.contributors.add(self.miles)
+
+    def search(self, search, queryset=None):
+        queryset = Article.objects.order_by("-id") if queryset is None else queryset
+        return CachedResultsTestFilter().filter_queryset(mock_request(search), queryset)
+
+    def test_cached(self):
+        self.assertEqual(list(self.search("title: blue")), [self.blue_train, self.kind_of_blue])
+        with mock.patch.object(CachedResultsTestFilter, "build_filters") as mock_build:
+            with self.assertNumQueries(1):
+                self.assertEqual(list(self.search("title: blue")), [self.blue_train, self.kind_of_blue])
+        self.assertFalse(mock_build.called)
+
+    def test_base_queryset(self):
+        """Different base querysets do not share their results"""
+        self.assertEqual(list(self.search("title: blue")), [self.blue_train, self.kind_of_blue])
+        self.assertEqual(list(self.search("title: blue", Article.objects.order_by("id"))),
+                         [self.kind_of_blue, self.blue_train])
+        self.assertEqual(list(self.search("title: blue", Article.objects.filter(title__startswith="Kind"))),
+                         [self.kind_of_blue])
+
+    def test_invalidated__save(self):
+        self.assertEqual(list(self.search("title: train")), [self.blue_train])
+        Article.objects.create(title="Soultrane")
+        self.assertEqual(list(self.search("title: train")), [self.blue_train])  # does not match anyway
+        soul_train = Article.objects.create(title="Soul Train")
+        self.assertEqual(list(self.search("title: train")), [soul_train, self.blue_train])
+
+        soul_train.delete()
+        self.assertEqual(list(self.search("title: train")), [self.blue_train])
+
+    def test_invalidated__related(self):
+        self.assertEqual(list(self.search("contributor: miles")), [self.kind_of_blue])
+        self.miles.display_name = "John Coltrane"
+        self.miles.save()
+        self.assertEqual(list(self.search("contributor: miles")), [])
+
+        self.blue_train.contributors.add(Contributor.objects.create(display_name="Miles"))
+        self.assertEqual(list(self.search("contributor: miles")), [self.blue_train])
+
+    def test_invalidated__base_queryset(self):
+        """The models joined by the queryset invalidate the results, even if the search does not read them"""
+        user = User.objects.create(username="teo")
+        Article.objects.filter(pk=self.blue_train.pk).update(user=user)
+        queryset = Article.objects.filter(user__is_active=True)
+        models = CachedResultsTestFilter().get_result_models(queryset, [("blue", {"title__icontains"})])
+        self.assertEqual(models, set([Article, User]))
+        self.assertEqual(list(self.search("title: blue", queryset)), [self.blue_train])
+        user.is_active = False
+        user.save()
+        self.assertEqual(list(self.search("title: blue", queryset)), [])
+
+    def test_max_results(self):
+        Article.objects.create(title="Blue in Green")
+        with CaptureQueriesContext(connection) as queries:
+            queryset = self.search("title: blue")
+        self.assertEqual(len(queries), 1)
+        self.assertIn("LIMIT 3", queries[0]["sql"])  # only one more pk than can be cached
+        self.assertNotIn("CASE", str(queryset.query))
+        self.assertEqual(queryset.count(), 3)
+
+    def test_watched_when_defined(self):
+        """The results are invalidated in processes that save rows without ever searching"""
+        with mock.patch("drf_search.filters.SearchResultCache.watch") as mock_watch:
+            class DefinedTestFilter(TestFilter):
+                cache_results = True
+        self.assertTrue(mock_watch.called)
+
+        result_cache = CachedResultsTestFilter().get_result_cache()
+        version = result_cache.get_version(Contributor)
+        Contributor.objects.create(display_name="John Coltrane")
+        self.assertGreater(result_cache.get_version(Contributor), version)
+
+    def test_no_results(self):
+        self.assertEqual(list(self.search("title: giant")), [])
+
+
+class InstrumentationTests(TestCase):
+    def setUp(self):
+        self.kind_of_blue = Article.objects.create(title="Kind of Blue")
+        self.received = list()
+
+    def receiver(self, sender, **kwargs):
+        self.received.append((sender, kwargs))
+
+    @contextmanager
+    def listening(self, sender=None):
+        signals.search_finished.connect(self.receiver, sender=sender)
+        try:
+            yield
+        finally:
+            signals.search_finished.disconnect(self.receiver, sender=sender)
+
+    def test_no_listener(self):
+        filterer = TestFilter()
+        with mock.patch("drf_search.filters.SearchMetrics") as mock_metrics:
+            filterer.filter_queryset(mock_request("blue, 1"), Article.objects.all())
+        self.assertFalse(mock_metrics.called)
+        self.assertIsNone(filterer.search_metrics)
+        self.assertIs(filterer.measure("build"), signals.NULL_PHASE)
+
+    def test_other_sender(self):
+        with self.listening(sender=CachedTestFilter):
+            TestFilter().filter_queryset(mock_request("blue"), Article.objects.all())
+        self.assertEqual(self.received, [])
+
+    def test_metrics(self):
+        filterer = TestFilter()
+        request = mock_request("title: blue, 1")
+        with self.listening(sender=TestFilter):
+            filterer.filter_queryset(request, Article.objects.all())
+        self.assertEqual(len(self.received), 1)
+        sender, kwargs = self.received[0]
+        self.assertIs(sender, TestFilter)
+        self.assertIs(kwargs["search_filter"], filterer)
+        self.assertIs(kwargs["request"], request)
+        metrics = kwargs["metrics"]
+        self.assertIs(metrics, filterer.search_metrics)
+        six.assertCountEqual(self, metrics.timings.keys(), ["tokenize", "split_terms", "validate", "build", "total"])
+        self.assertEqual(dict(metrics.validations), {"title": [1, 0], "id": [1, 0], "email": [0, 1], "@": [0, 1]})
+        self.assertEqual(metrics.clauses, 2)
+
+    def test_metrics__execute(self):
+        caches["default"].clear()
+        with self.listening():
+            CachedResultsTestFilter().filter_queryset(mock_request("title: blue"), Article.objects.all())
+        self.assertIn("execute", self.received[0][1]["metrics"].timings)
+
+    def test_metrics__cached_plan(self):
+        CachedTestFilter.get_search_plan_cache().clear()
+        with self.listening():
+            CachedTestFilter().filter_queryset(mock_request("blue"), Article.objects.all())
+            CachedTestFilter().filter_queryset(mock_request("blue"), Article.objects.all())
+        six.assertCountEqual(self, self.received[1][1]["metrics"].timings.keys(), ["build", "total"])
+
+
+class BatchSearchTests(TestCase):
+    def setUp(self):
+        self.miles = Contributor.objects.create(display_name="Miles Davis")
+        self.kind_of_blue = Article.objects.create(title="Kind of Blue")
+        self.blue_train = Article.objects.create(title="Blue Train")
+        self.giant_steps = Article.objects.create(title="Giant Steps")
+        self.kind_of_blue.contributors.add(self.miles)
+        self.blue_train.contributors.add(Contributor.objects.create(display_name="Lee Morgan"))
+
+    def batch(self, searches, **kwargs):
+        return TestFilter().batch_search(mock_request(""), Article.objects.all(), searches, **kwargs)
+
+    def test_single_query(self):
+        with self.assertNumQueries(1):
+            results = self.batch(["title: blue", "title: giant, title: steps", "title: train"])
+        self.assertEqual(list(results.items()), [
+            ("title: blue", [self.kind_of_blue, self.blue_train]),
+            ("title: giant, title: steps", [self.giant_steps]),
+            ("title: train", [self.blue_train])])
+
+    def test_matches_filter_queryset(self):
+        searches = ["title: blue, contributor: miles", "contributor: davis", "contributor: e"]
+        results = self.batch(searches)
+        for search in searches:
+            expected = list(TestFilter().filter_queryset(mock_request(search), Article.objects.all()))
+            self.assertEqual(results[search], expected)
+
+    def test_to_many__no_duplicates(self):
+        self.kind_of_blue.contributors.add(Contributor.objects.create(display_name="John Coltrane"))
+        results = self.batch(["contributor: n", "title: kind"])
+        self.assertEqual(results["contributor: n"], [self.kind_of_blue, self.blue_train])
+        self.assertEqual(results["title: kind"], [self.kind_of_blue])
+
+    def test_annotations(self):
+        with mock.patch.object(TestFilter, "build_batch_query", side_effect=[Q(title__icontains="blue"),
+                                                                              Q(title__icontains="train")]):
+            results = self.batch(["blue", "train"])
+        blue_train = results["train"][0]
+        self.assertTrue(blue_train.search_match_0)
+        self.assertTrue(blue_train.search_match_1)
+        self.assertFalse(results["blue"][0].search_match_1)
+
+    def test_invalid_and_empty(self):
+        with self.assertNumQueries(0):
+            results = self.batch(["", "title:", "email: 1"])
+        self.assertEqual(dict(results), {"": [], "title:": [], "email: 1": []})
+
+    def test_duplicates(self):
+        results = self.batch(["title: blue", "title: blue"])
+        self.assertEqual(list(results.keys()), ["title: blue"])
+
+    def test_limit(self):
+        with CaptureQueriesContext(connection) as queries:
+            results = self.batch(["title: blue", "title: train"], limit=1)
+        self.assertEqual(results["title: blue"], [self.kind_of_blue])
+        self.assertEqual(results["title: train"], [self.blue_train])
+        self.assertIn("LIMIT 1", queries[0]["sql"])
+
+        results = TestFilter().batch_search(mock_request(""), Article.objects.order_by("-id"), ["title: blue"], limit=1)
+        self.assertEqual(results["title: blue"], [self.blue_train])
+
+    def test_limit__not_supported(self):
+        with mock.patch.object(connection.features, "allow_sliced_subqueries_with_in", False):
+            with CaptureQueriesContext(connection) as queries:
+                results = self.batch(["title: blue", "title: train"], limit=1)
+        self.assertEqual(results["title: blue"], [self.kind_of_blue])
+        self.assertNotIn("LIMIT", queries[0]["sql"])
+
+    def test_cost(self):
+        """A single search over the cost limits rejects the whole batch"""
+        with mock.patch.object(TestFilter, "max_search_terms", 1):
+            with self.assertRaises(ParseError):
+                self.batch(["title: blue", "title: kind, title: blue"])
+
+    def test_max_batch_size(self):
+        with mock.patch.object(TestFilter, "max_batch_size", 2):
+            with self.assertRaises(ParseError):
+                self.batch(["a", "b", "c"])
+
+    def test_request_params(self):
+        request = filters.SearchRequest(mock_request("title: blue", page=2), "search", "title: train")
+        self.assertEqual(request.query_params, {"search": "title: train", "page": 2})
+        self.assertIsNotNone(request.method)
+        self.assertEqual(filters.SearchRequest(None, "q", "blue").query_params, {"q": "blue"})
+
+
+class SearchValueTests(TestCase):
+    class ValueTestFilter(filters.BaseSearchFilter):
+        id = fields.IntegerSearchField("id", default=True, ranges=True)
+        ids = fields.ListSearchField("id")
+        title = fields.SearchField("title", default=True)
+
+    def setUp(self):
+        self.filterer = self.ValueTestFilter()
+        self.kind_of_blue = Article.objects.create(title="Kind of Blue")
+        self.blue_train = Article.objects.create(title="Blue Train")
+
+    def test_get_search_value(self):
+        self.assertEqual(self.filterer.get_search_value("id__exact", "42"), 42)
+        self.assertEqual(self.filterer.get_search_value("id__in", "[1, 2]"), [1, 2])
+        self.assertEqual(self.filterer.get_search_value("title__icontains", "42"), "42")
+        self.assertEqual(self.filterer.get_search_value("unknown__exact", "42"), "42")
+
+    def test_native_values(self):
+        with mock_search_terms("ids: [{}]".format(self.blue_train.pk), str(self.kind_of_blue.pk)):
+            searches = self.filterer.filter_searching(mock_request(""))
+            queries = self.filterer.build_filters(Article.objects.all(), searches)
+        self.assertEqual(queries[0].children[0], ("id__in", [self.blue_train.pk]))
+        six.assertCountEqual(self, queries[0].children[1].children,
+                             [("id__exact", self.kind_of_blue.pk), ("title__icontains", str(self.kind_of_blue.pk))])
+
+    def test_list_search(self):
+        with mock_search_terms("ids: [{}]".format(self.blue_train.pk)):
+            queryset = self.filterer.filter_queryset(mock_request(""), Article.objects.all())
+        self.assertEqual(list(queryset), [self.blue_train])
+
+    def test_range_search(self):
+        giant_steps = Article.objects.create(title="Giant Steps")
+        with mock_search_terms("id: {}..{}".format(self.blue_train.pk, giant_steps.pk)):
+            searches = self.filterer.filter_searching(mock_request(""))
+            queryset = self.filterer.filter_queryset(mock_request(""), Article.objects.all())
+        self.assertEqual(searches[0][1], {"id__range"})
+        self.assertIn("BETWEEN", str(queryset.query))
+        self.assertEqual(list(queryset), [self.blue_train, giant_steps])
+
+    def test_comparison_search(self):
+        with mock_search_terms("id: >{}".format(self.kind_of_blue.pk)):
+            queryset = self.filterer.filter_queryset(mock_request(""), Article.objects.all())
+        self.assertEqual(list(queryset), [self.blue_train])
+
+        with mock_search_terms("<={}".format(self.kind_of_blue.pk)):  # default fields
+            queryset = self.filterer.filter_queryset(mock_request(""), Article.objects.all())
+        self.assertEqual(list(queryset), [self.kind_of_blue])
+
+
+class BooleanSearchTests(TestCase):
+    class BooleanTestFilter(TestFilter):
+        boolean_queries = True
+        title = fields.SearchField("title", default=True)
+
+    def setUp(self):
+        self.miles = Contributor.objects.create(display_name="Miles Davis")
+        self.kind_of_blue = Article.objects.create(title="Kind of Blue")
+        self.blue_train = Article.objects.create(title="Blue Train")
+        self.giant_steps = Article.objects.create(title="Giant Steps")
+        self.war_and_peace = Article.objects.create(title="War AND Peace")
+        self.kind_of_blue.contributors.add(self.miles)
+
+    def search(self, search):
+        return list(self.BooleanTestFilter().filter_queryset(mock_request(search), Article.objects.all()))
+
+    def test_or(self):
+        self.assertEqual(self.search("title: train OR title: steps"), [self.blue_train, self.giant_steps])
+
+    def test_and_not(self):
+        self.assertEqual(self.search("title: blue AND NOT title: train"), [self.kind_of_blue])
+        self.assertEqual(self.search("blue, NOT train"), [self.kind_of_blue])
+
+    def test_parentheses(self):
+        self.assertEqual(self.search("(title: train OR contributor: miles) title: blue"),
+                         [self.kind_of_blue, self.blue_train])
+        self.assertEqual(self.search("NOT (blue OR steps)"), [self.war_and_peace])
+
+    def test_quoted(self):
+        self.assertEqual(self.search('title: "war AND peace"'), [self.war_and_peace])
+
+    def test_single_query(self):
+        filterer = self.BooleanTestFilter()
+        with mock.patch.object(Article.objects.none().__class__, "filter", autospec=True,
+                               side_effect=lambda queryset, *args, **kwargs: queryset) as mock_filter:
+            filterer.filter_queryset(mock_request("title: a OR (title: b AND NOT title: c)"), Article.objects.all())
+        self.assertEqual(mock_filter.call_count, 1)
+
+    def test_to_many(self):
+        """Every AND'd search on a to-many relation can match a different related row"""
+        self.kind_of_blue.contributors.add(Contributor.objects.create(display_name="John Coltrane"))
+        self.assertEqual(self.search("contributor: miles, contributor: john"), [self.kind_of_blue])
+        self.assertEqual(self.search("contributor: miles AND contributor: john AND blue"), [self.kind_of_blue])
+        self.assertEqual(self.search("contributor: miles AND (contributor: john OR steps)"), [self.kind_of_blue])
+
+        filterer = self.BooleanTestFilter()
+        queries = filterer.build_boolean_filters(Article.objects.all(), simplify_search(AndNode(
+            OrNode(Q(contributors__display_name__icontains="miles")), OrNode(Q(title__icontains="blue")),
+            OrNode(Q(contributors__display_name__icontains="john")), OrNode(Q(id__exact=1)))))
+        self.assertEqual(len(queries), 3)
+
+    def test_batch_search(self):
+        searches = ["title: train OR title: steps", "blue AND NOT train", "contributor: miles AND (john OR blue)",
+                    "id: blue AND title: steps", "id: blue"]
+        with self.assertNumQueries(1):
+            results = self.BooleanTestFilter().batch_search(mock_request(""), Article.objects.all(), searches)
+        for search in searches[:3]:
+            self.assertEqual(results[search], self.search(search))
+        self.assertEqual(results["title: train OR title: steps"], [self.blue_train, self.giant_steps])
+        self.assertEqual(results["id: blue AND title: steps"], [])
+        self.assertEqual(results["id: blue"], [])
+        with self.assertRaises(ParseError):
+            self.BooleanTestFilter().batch_search(mock_request(""), Article.objects.all(), ["title: blue AND"])
+
+    def test_invalid_leaf(self):
+        # `id` is never valid for `blue`, so that branch is folded away
+        self.assertEqual(self.search("id: blue OR title: steps"), [self.giant_steps])
+        self.assertEqual(self.search("id: blue AND title: steps"), [])
+        self.assertEqual(self.search("NOT id: blue, title: steps"), [self.giant_steps])
+
+    def test_not_valid(self):
+        with self.assertRaises(ParseError):
+            self.search("id: blue")
+        with self.assertRaises(ParseError):
+            self.search("title: blue AND")
+        self.assertEqual(len(self.search("")), 4)
+
+    def test_cost(self):
+        with mock.patch.object(self.BooleanTestFilter, "max_search_terms", 1):
+            with mock.patch.object(self.BooleanTestFilter, "truncate_expensive_searches", True):
+                with self.assertRaises(ParseError):
+                    self.search("title: train OR title: steps")
+
+    def test_disabled(self):
+        queryset = TestFilter().filter_queryset(mock_request("title: train OR title: steps"), Article.objects.all())
+        self.assertEqual(list(queryset), [])  # searches for the whole text
+
+
+class StreamQuerysetTests(TestCase):
+    class ArticleSerializer(serializers.ModelSerializer):
+        class Meta:
+            model = Article
+            fields = ("id", "title")
+
+    def setUp(self):
+        self.kind_of_blue = Article.objects.create(title="Kind of Blue")
+        self.giant_steps = Article.objects.create(title="Giant Steps")
+        self.blue_train = Article.objects.create(title="Blue Train")
+
+    def test_rows(self):
+        rows = TestFilter().stream_queryset(mock_request("title: blue"), Article.objects.all(), chunk_size=1)
+        self.assertEqual(list(rows), [self.kind_of_blue, self.blue_train])
+
+    def test_serialized(self):
+        rows = TestFilter().stream_queryset(mock_request("title: blue"), Article.objects.all(), ordering=["-title"],
+                                            serializer_class=self.ArticleSerializer)
+        self.assertEqual(list(dict(row) for row in rows), [
+            {"id": self.kind_of_blue.pk, "title": "Kind of Blue"},
+            {"id": self.blue_train.pk, "title": "Blue Train"}])
+
+    def test_fields(self):
+        rows = TestFilter().stream_queryset(mock_request("title: blue"), Article.objects.all(), fields=["title"])
+        self.assertEqual(list(rows), [{"title": "Kind of Blue"}, {"title": "Blue Train"}])
+
+    def test_search_rank(self):
+        rows = RankedTestFilter().stream_queryset(mock_request("blue"), Article.objects.all(),
+                                                  ordering=["-search_rank"], chunk_size=1)
+        self.assertEqual(list(rows), [self.kind_of_blue, self.blue_train])
+
+    def test_lazy(self):
+        with self.assertNumQueries(0):
+            rows = TestFilter().stream_queryset(mock_request("title: blue"), Article.objects.all())
+        with self.assertNumQueries(1):
+            next(rows)
+
+
+class SearchFacetsTests(TestCase):
+    class FacetTestFilter(TestFilter):
+        title = fields.SearchField("title", default=True)
+
+    class BooleanFacetTestFilter(FacetTestFilter):
+        boolean_queries = True
+
+    def setUp(self):
+        self.miles = Contributor.objects.create(display_name="Miles Davis")
+        self.coltrane = Contributor.objects.create(display_name="John Coltrane")
+        self.kind_of_blue = Article.objects.create(title="Kind of Blue")
+        self.kind_of_blue.contributors.add(self.miles, self.coltrane)
+        self.blue_train = Article.objects.create(title="Blue Train")
+        self.blue_train.contributors.add(self.coltrane)
+        self.miles_ahead = Article.objects.create(title="Miles Ahead")
+        self.miles_ahead.contributors.add(self.miles)
+
+    def get_facets(self, search, filter_class=FacetTestFilter):
+        return filter_class().get_search_facets(mock_request(search), Article.objects.all())
+
+    def test_facets(self):
+        facets = self.get_facets("blue, contributor: miles")
+        self.assertEqual(facets["count"], 1)
+        self.assertEqual(facets["fields"], {"title": 1, "email": 0, "contributor": 1})
+        self.assertEqual(facets["terms"], [
+            {"term": "blue", "count": 1, "fields": {"title": 1, "email": 0}},
+            {"term": "miles", "count": 1, "fields": {"contributor": 1}}])
+
+    def test_to_many(self):
+        facets = self.get_facets("contributor: a")
+        self.assertEqual(facets["count"], 3)
+        self.assertEqual(facets["fields"], {"contributor": 3})
+
+    def test_single_query(self):
+        with self.assertNumQueries(1):
+            self.get_facets("blue, contributor: miles")
+
+    def test_searched_once(self):
+        received = list()
+
+        def receiver(sender, **kwargs):
+            received.append(sender)
+
+        signals.search_finished.connect(receiver, sender=self.FacetTestFilter)
+        self.addCleanup(signals.search_finished.disconnect, receiver, sender=self.FacetTestFilter)
+        with mock.patch.object(self.FacetTestFilter, "filter_searching", autospec=True,
+                               side_effect=filters.BaseSearchFilter.filter_searching) as mock_searching:
+            facets = self.get_facets("blue, contributor: miles")
+        self.assertEqual(facets["count"], 1)
+        self.assertEqual(mock_searching.call_count, 1)
+        self.assertEqual(received, [])
+
+    def test_boolean(self):
+        facets = self.get_facets("title: train OR contributor: miles", self.BooleanFacetTestFilter)
+        self.assertEqual(facets["count"], 3)
+        self.assertEqual(facets["fields"], {"title": 1, "contributor": 2})
+
+    def test_paginated(self):
+        """The facets count every result, and not only the page of a paginated view"""
+        paginator = PageNumberPagination()
+        paginator.page_size = 1
+        request = mock_request("blue", page="1")
+        facets = UnionTestFilter().get_search_facets(request, Article.objects.all(), mock_view(paginator))
+        self.assertEqual(facets["count"], 2)
+        self.assertEqual(facets["fields"], {"email": 0, "title": 2})
+
+    def test_not_searching(self):
+        self.assertIsNone(self.get_facets(""))
+        self.assertIsNone(self.get_facets("", self.BooleanFacetTestFilter))
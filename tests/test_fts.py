@@ -0,0 +1,83 @@
+# coding=utf-8
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from drf_search import filters, fields, fts
+from django.test import TestCase
+from .models import Article
+from .utils import mock_request
+
+
+class ArticleSearchFilter(filters.BaseSearchFilter):
+    title = fields.FullTextSearchField("title", default=True)
+    body = fields.FullTextSearchField("body", default=True)
+
+
+class RankedArticleSearchFilter(ArticleSearchFilter):
+    full_text_ordering = True
+
+
+class BuildMatchExpressionTests(TestCase):
+    def test_simple(self):
+        self.assertEqual(fts.build_match_expression("title", "miles"), '{"title"} : ("miles")')
+        self.assertEqual(fts.build_match_expression("title", 'Miles "Davis"'), '{"title"} : ("Miles" "Davis")')
+
+    def test_no_words(self):
+        self.assertEqual(fts.build_match_expression("title", '" * -'), None)
+
+
+class FullTextSearchFieldTests(TestCase):
+    def test_simple(self):
+        field = fields.FullTextSearchField("title")
+        self.assertEqual(field.field_lookup, "fts")
+        self.assertEqual(field.constructed, "title__fts")
+
+        # does not listen to kwarg
+        field = fields.FullTextSearchField("title", field_lookup="exact")
+        self.assertEqual(field.field_lookup, "fts")
+
+    def test_is_valid(self):
+        field = fields.FullTextSearchField("title")
+        self.assertTrue(field.is_valid("miles davis"))
+        self.assertFalse(field.is_valid('" *'))
+
+
+class FullTextIndexTests(TestCase):
+    def setUp(self):
+        self.index = fts.FullTextIndex(Article, ["title", "body"])
+        self.index.create()
+        self.addCleanup(self.index.drop)
+        self.kind_of_blue = Article.objects.create(title="Kind of Blue", body="Miles Davis and John Coltrane")
+        self.index.rebuild()
+        self.index.connect()
+        self.addCleanup(self.index.disconnect)
+        self.miles_ahead = Article.objects.create(title="Miles Ahead", body="Miles Davis and Gil Evans")
+        self.giant_steps = Article.objects.create(title="Giant Steps", body="John Coltrane")
+
+    def search(self, search, filter_class=ArticleSearchFilter):
+        return list(filter_class().filter_queryset(mock_request(search), Article.objects.all()))
+
+    def test_lookup(self):
+        self.assertEqual(list(Article.objects.filter(title__fts="miles")), [self.miles_ahead])
+        self.assertEqual(list(Article.objects.filter(body__fts="coltrane")), [self.kind_of_blue, self.giant_steps])
+        self.assertEqual(list(Article.objects.filter(body__fts="?")), [])
+
+    def test_sync(self):
+        self.giant_steps.title = "Giant Steps (Remastered)"
+        self.giant_steps.save()
+        self.assertEqual(list(Article.objects.filter(title__fts="remastered")), [self.giant_steps])
+
+        self.giant_steps.delete()
+        self.assertEqual(list(Article.objects.filter(body__fts="coltrane")), [self.kind_of_blue])
+
+    def test_filter_queryset(self):
+        self.assertEqual(self.search("title: blue"), [self.kind_of_blue])
+        self.assertEqual(self.search("coltrane"), [self.kind_of_blue, self.giant_steps])
+        self.assertEqual(self.search("miles davis, gil"), [self.miles_ahead])
+
+    def test_full_text_ordering(self):
+        # `Miles Ahead` matches `miles` in both the title and the body
+        self.assertEqual(self.search("miles"), [self.kind_of_blue, self.miles_ahead])
+        self.assertEqual(self.search("miles", RankedArticleSearchFilter), [self.miles_ahead, self.kind_of_blue])
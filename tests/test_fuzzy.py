@@ -0,0 +1,121 @@
+# coding=utf-8
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import mock
+from drf_search import filters, fields, fuzzy
+from django.test import TestCase
+from .models import Article
+from .utils import mock_request
+
+
+class FuzzyArticleFilter(filters.BaseSearchFilter):
+    title = fields.FuzzySearchField("title", default=True)
+
+
+class StrictFuzzyArticleFilter(filters.BaseSearchFilter):
+    title = fields.FuzzySearchField("title", default=True, max_distance=1)
+
+
+class EditDistanceTests(TestCase):
+    def test_distance(self):
+        self.assertEqual(fuzzy.edit_distance("mils davis", "miles davis"), 1)
+        self.assertEqual(fuzzy.edit_distance("kitten", "sitting"), 3)
+        self.assertEqual(fuzzy.edit_distance("", "abc"), 3)
+        self.assertEqual(fuzzy.edit_distance("blue", "blue"), 0)
+
+
+class BKTreeTests(TestCase):
+    def setUp(self):
+        self.tree = fuzzy.BKTree()
+        for value in ["miles", "mile", "smiles", "coltrane", "mils", "miles"]:
+            self.tree.add(value)
+
+    def test_size(self):
+        self.assertEqual(len(self.tree), 5)
+
+    def test_search(self):
+        self.assertEqual(self.tree.search("mils", 1), [(0, "mils"), (1, "mile"), (1, "miles")])
+        self.assertEqual(self.tree.search("mils", 0), [(0, "mils")])
+        self.assertEqual(self.tree.search("coltrain", 2), [(2, "coltrane")])
+
+    def test_empty(self):
+        self.assertEqual(fuzzy.BKTree().search("mils", 2), [])
+
+    def test_compares_fewer(self):
+        for index in range(200):
+            self.tree.add("value {}".format(index))
+        distance = mock.Mock(side_effect=fuzzy.edit_distance)
+        self.tree.distance = distance
+        self.assertEqual(self.tree.search("value 42", 0), [(0, "value 42")])
+        self.assertLess(distance.call_count, len(self.tree))
+
+
+class FuzzyIndexTests(TestCase):
+    def setUp(self):
+        self.miles_davis = Article.objects.create(title="Miles Davis")
+        self.miles_ahead = Article.objects.create(title="Miles Ahead")
+        self.index = fuzzy.get_fuzzy_index(Article, "title")
+        self.addCleanup(self.index.disconnect)
+
+    def test_search(self):
+        self.assertEqual(self.index.search("mils davis"), ["Miles Davis"])
+        self.assertEqual(self.index.search("MILES DAVIS", 0), ["Miles Davis"])
+        self.assertEqual(self.index.search("giant steps"), [])
+
+    def test_short_term(self):
+        Article.objects.create(title="a")
+        self.assertEqual(self.index.search("b", 2), [])
+
+    def test_loaded_once(self):
+        with self.assertNumQueries(1):
+            self.index.search("mils davis")
+            self.index.search("mils ahead")
+
+    def test_incremental(self):
+        self.index.search("mils davis")
+        with self.assertNumQueries(1):  # only the insert
+            Article.objects.create(title="Kind of Blue")
+        with self.assertNumQueries(0):
+            self.assertEqual(self.index.search("kind of bleu"), ["Kind of Blue"])
+
+    def test_stale(self):
+        self.index.search("mils davis")
+        self.miles_davis.delete()
+        self.miles_ahead.title = "Giant Steps"
+        self.miles_ahead.save()
+        with self.assertNumQueries(1):  # more than a quarter of the tree is stale
+            self.assertEqual(self.index.search("miles davis"), [])
+
+
+class FuzzySearchFieldTests(TestCase):
+    def setUp(self):
+        self.miles_davis = Article.objects.create(title="Miles Davis")
+        self.miles_ahead = Article.objects.create(title="Miles Ahead")
+        self.addCleanup(fuzzy.get_fuzzy_index(Article, "title").disconnect)
+
+    def search(self, search, filter_class=FuzzyArticleFilter):
+        return filter_class().filter_queryset(mock_request(search), Article.objects.all())
+
+    def test_field(self):
+        field = fields.FuzzySearchField("title", max_distance=1)
+        self.assertEqual(field.constructed, "title__fuzzy")
+        self.assertEqual(field.to_python("mils").max_distance, 1)
+        self.assertFalse(field.is_valid("!!"))
+        self.assertEqual(field.freeze().max_distance, 1)
+
+    def test_search(self):
+        self.assertEqual(list(self.search("Mils Davis")), [self.miles_davis])
+        self.assertEqual(list(self.search("miles ahaed")), [self.miles_ahead])
+        self.assertEqual(list(self.search("miles ahaed", StrictFuzzyArticleFilter)), [])
+        self.assertEqual(list(self.search("miles ahad", StrictFuzzyArticleFilter)), [self.miles_ahead])
+
+    def test_in_lookup(self):
+        query = str(self.search("Mils Davis").query)
+        self.assertIn("IN (Miles Davis)", query)
+        self.assertNotIn("LIKE", query)
+
+    def test_no_matches(self):
+        self.assertEqual(list(self.search("giant steps")), [])
@@ -0,0 +1,96 @@
+# coding=utf-8
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import mock
+from drf_search import filters, fields, indexes
+from django.db.models import Q
+from django.test import TestCase
+from .models import Article
+from .utils import mock_request
+
+
+class GetGramsTests(TestCase):
+    def test_grams(self):
+        self.assertEqual(indexes.get_grams("blues"), set(["blu", "lue", "ues"]))
+        self.assertEqual(indexes.get_grams("bl"), set())
+
+
+class InvertedIndexTests(TestCase):
+    def setUp(self):
+        self.kind_of_blue = Article.objects.create(title="Kind of Blue", body="Miles")
+        self.blue_train = Article.objects.create(title="Blue Train", body="Coltrane")
+        self.giant_steps = Article.objects.create(title="Giant Steps", body="Coltrane")
+        self.index = indexes.InvertedIndex(Article, ["title", "body"])
+        self.addCleanup(self.index.disconnect)
+
+    def test_lookups(self):
+        self.assertEqual(self.index.match("title", "exact", "Blue Train"), set([self.blue_train.pk]))
+        self.assertEqual(self.index.match("title", "exact", "blue train"), set())
+        self.assertEqual(self.index.match("title", "iexact", "blue train"), set([self.blue_train.pk]))
+        self.assertEqual(self.index.match("title", "contains", "Blue"), set([self.kind_of_blue.pk, self.blue_train.pk]))
+        self.assertEqual(self.index.match("title", "contains", "blue"), set())
+        self.assertEqual(self.index.match("title", "icontains", "BLUE"),
+                         set([self.kind_of_blue.pk, self.blue_train.pk]))
+        self.assertEqual(self.index.match("title", "istartswith", "blue"), set([self.blue_train.pk]))
+        self.assertEqual(self.index.match("title", "endswith", "Steps"), set([self.giant_steps.pk]))
+        self.assertEqual(self.index.match("body", "icontains", "trane"), set([self.blue_train.pk, self.giant_steps.pk]))
+
+    def test_short_term(self):
+        self.assertEqual(self.index.match("title", "icontains", "IN"), set([self.kind_of_blue.pk, self.blue_train.pk]))
+
+    def test_not_answered(self):
+        self.assertIsNone(self.index.match("title", "iregex", "blue"))
+        self.assertIsNone(self.index.match("user__email", "icontains", "blue"))
+        self.assertFalse(self.index.loaded)
+
+    def test_loaded_once(self):
+        with self.assertNumQueries(1):
+            self.index.match("title", "icontains", "blue")
+            self.index.match("title", "icontains", "train")
+
+    def test_signals(self):
+        self.index.load()
+        self.blue_train.title = "Blue Monk"
+        self.blue_train.save()
+        miles_ahead = Article.objects.create(title="Miles Ahead")
+        self.kind_of_blue.delete()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.index.match("title", "icontains", "blue"), set([self.blue_train.pk]))
+            self.assertEqual(self.index.match("title", "icontains", "train"), set())
+            self.assertEqual(self.index.match("title", "iexact", "miles ahead"), set([miles_ahead.pk]))
+
+    def test_build_query(self):
+        self.assertEqual(self.index.build_query(Article, "title__icontains", "train"), Q(pk__in=[self.blue_train.pk]))
+        self.assertIsNone(self.index.build_query(Article, "title__iregex", "train"))
+        self.assertIsNone(self.index.build_query(mock.Mock(), "title__icontains", "train"))
+
+
+class MemoryIndexFilterTests(TestCase):
+    class IndexedFilter(filters.BaseSearchFilter):
+        memory_index = indexes.InvertedIndex(Article, ["title"])
+        title = fields.SearchField("title", default=True)
+        regex = fields.RegexSearchField("title")
+        email = fields.SearchField("user__email")
+
+    def setUp(self):
+        self.kind_of_blue = Article.objects.create(title="Kind of Blue")
+        self.blue_train = Article.objects.create(title="Blue Train")
+        self.addCleanup(self.IndexedFilter.memory_index.disconnect)
+
+    def search(self, search):
+        return self.IndexedFilter().filter_queryset(mock_request(search), Article.objects.all())
+
+    def test_indexed(self):
+        queryset = self.search("title: train")
+        self.assertNotIn("LIKE", str(queryset.query))
+        self.assertEqual(list(queryset), [self.blue_train])
+
+    def test_no_matches(self):
+        self.assertEqual(list(self.search("title: steps")), [])
+
+    def test_not_indexed(self):
+        self.assertIn("LIKE", str(self.search("email: miles").query))
+        self.assertEqual(list(self.search("regex: ^Blue")), [self.blue_train])
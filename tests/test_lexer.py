@@ -0,0 +1,88 @@
+# coding=utf-8
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import re
+from drf_search import lexer
+from drf_search.query import AndNode, LeafNode, NotNode, OrNode
+from django.test import TestCase
+
+
+class TokenizeTests(TestCase):
+    def setUp(self):
+        self.pattern = lexer.compile_field_pattern(r"([\w]+\:)")
+
+    def tokenize(self, search_term):
+        return list(lexer.tokenize(self.pattern, search_term))
+
+    def test_compile_field_pattern(self):
+        self.assertEqual(self.pattern.pattern, r"([\w]+\:)")
+        self.assertIs(lexer.compile_field_pattern(self.pattern), self.pattern)
+
+    def test_simple(self):
+        self.assertEqual(self.tokenize("draft"), [(None, "draft")])
+        self.assertEqual(self.tokenize("title: draft"), [("title", "draft")])
+        self.assertEqual(self.tokenize("  title:draft  "), [("title", "draft")])
+
+    def test_multiple_fields(self):
+        result = self.tokenize("fname: Miles lname: Davis email: miles.davis@jazz.com")
+        self.assertEqual(result, [("fname", "Miles"), ("lname", "Davis"), ("email", "miles.davis@jazz.com")])
+
+    def test_mixed(self):
+        result = self.tokenize("draft email: boris.badguy@example.com")
+        self.assertEqual(result, [(None, "draft"), ("email", "boris.badguy@example.com")])
+
+    def test_no_term(self):
+        self.assertEqual(self.tokenize("title: email: "), [("title", None), ("email", None)])
+        self.assertEqual(self.tokenize("title:"), [("title", None)])
+
+    def test_empty(self):
+        self.assertEqual(self.tokenize(""), [])
+        self.assertEqual(self.tokenize("   "), [])
+
+    def test_custom_pattern(self):
+        pattern = re.compile(r"(\w+\s*=)")
+        result = list(lexer.tokenize(pattern, "title = draft  email=miles"))
+        self.assertEqual(result, [("title =", "draft"), ("email=", "miles")])
+
+
+class BooleanSearchTests(TestCase):
+    def test_tokenize(self):
+        tokens = list(lexer.tokenize_boolean('title: blue AND NOT (id: 5 OR "AND")'))
+        self.assertEqual(tokens, ["title: blue", "AND", "NOT", "(", "id: 5", "OR", '"AND"', ")"])
+
+    def test_tokenize__lower_case(self):
+        self.assertEqual(list(lexer.tokenize_boolean("war and peace")), ["war and peace"])
+        self.assertEqual(list(lexer.tokenize_boolean("ORCHESTRA")), ["ORCHESTRA"])
+
+    def test_precedence(self):
+        tree = lexer.parse_boolean_search("a OR b c, NOT d")
+        self.assertEqual(tree, AndNode(OrNode(LeafNode("a"), LeafNode("b c")), NotNode(LeafNode("d"))))
+
+        tree = lexer.parse_boolean_search("a OR b AND c")
+        self.assertEqual(tree, OrNode(LeafNode("a"), AndNode(LeafNode("b"), LeafNode("c"))))
+
+    def test_parentheses(self):
+        tree = lexer.parse_boolean_search("(a OR b) (c)")
+        self.assertEqual(tree, AndNode(OrNode(LeafNode("a"), LeafNode("b")), LeafNode("c")))
+
+        tree = lexer.parse_boolean_search("NOT NOT (a, b)")
+        self.assertEqual(tree, NotNode(NotNode(AndNode(LeafNode("a"), LeafNode("b")))))
+
+    def test_commas(self):
+        self.assertEqual(lexer.parse_boolean_search(",,a,,"), LeafNode("a"))
+        self.assertIsNone(lexer.parse_boolean_search(" , "))
+        self.assertIsNone(lexer.parse_boolean_search(""))
+
+    def test_invalid(self):
+        for search in ("a AND", "(a", "a)", "()", "OR a", "NOT"):
+            with self.assertRaises(ValueError):
+                lexer.parse_boolean_search(search)
+
+    def test_unquote(self):
+        self.assertEqual(lexer.unquote('"AND"'), "AND")
+        self.assertEqual(lexer.unquote('"say \\"hi\\""'), 'say "hi"')
+        self.assertEqual(lexer.unquote('"'), '"')
+        self.assertEqual(lexer.unquote("blue"), "blue")
@@ -0,0 +1,179 @@
+# coding=utf-8
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from drf_search import query
+from django.contrib.auth.models import User
+from django.db.models import Q
+from django.test import TestCase
+from .models import Article, Contributor
+
+
+class RelationPathsTests(TestCase):
+    def test_local(self):
+        self.assertEqual(query.relation_paths(Article, "title__icontains"), [])
+        self.assertEqual(query.relation_paths(Article, "pk"), [])
+
+    def test_relations(self):
+        self.assertEqual(query.relation_paths(Article, "user__email__iexact"), ["user"])
+        self.assertEqual(query.relation_paths(Article, "user__groups__name__icontains"), ["user", "user__groups"])
+        self.assertEqual(query.relation_paths(Article, "contributors__display_name"), ["contributors"])
+
+    def test_relation_itself(self):
+        """Filtering on the relation itself does not join to it"""
+        self.assertEqual(query.relation_paths(Article, "user"), [])
+        self.assertEqual(query.relation_paths(Article, "user__exact"), [])
+        self.assertEqual(query.relation_paths(Article, "user__in"), [])
+
+
+class RelatedModelsTests(TestCase):
+    def test_simple(self):
+        self.assertEqual(query.related_models(Article, "title__icontains"), [Article])
+        self.assertEqual(query.related_models(Article, "user__email"), [Article, User])
+        self.assertEqual(query.related_models(Article, "contributors__display_name__icontains"),
+                         [Article, Article.contributors.through, Contributor])
+        self.assertEqual(query.related_models(Contributor, "article__title"),
+                         [Contributor, Article.contributors.through, Article])
+
+
+class JoinedModelsTests(TestCase):
+    def test_joined(self):
+        self.assertEqual(query.joined_models(Article.objects.all().query), [])
+        self.assertCountEqual(query.joined_models(Article.objects.filter(user__is_active=True).query), [User, Article])
+        self.assertCountEqual(query.joined_models(Article.objects.filter(contributors__display_name="a").query),
+                              [Article, Article.contributors.through, Contributor])
+
+
+class CrossesToManyTests(TestCase):
+    def test_local(self):
+        self.assertFalse(query.crosses_to_many(Article, "title__icontains"))
+        self.assertFalse(query.crosses_to_many(Article, "pk"))
+        self.assertFalse(query.crosses_to_many(Article, "id__exact"))
+
+    def test_to_one(self):
+        self.assertFalse(query.crosses_to_many(Article, "user__email__iexact"))
+        self.assertFalse(query.crosses_to_many(Article, "user"))
+
+    def test_to_many(self):
+        self.assertTrue(query.crosses_to_many(Article, "contributors__display_name__icontains"))
+        self.assertTrue(query.crosses_to_many(Article, "user__groups__name"))
+
+    def test_reverse(self):
+        self.assertTrue(query.crosses_to_many(User, "article__title__icontains"))
+        self.assertTrue(query.crosses_to_many(Contributor, "article__title"))
+
+
+class OptimizeQTests(TestCase):
+    def assertQueryEqual(self, first, second):
+        self.assertEqual(query.query_key(first), query.query_key(second))
+
+    def test_flatten(self):
+        result = query.optimize_q(Q(title="a") | (Q(body="b") | (Q(body="c") | Q(body="d"))))
+        self.assertEqual(result.connector, Q.OR)
+        self.assertEqual(result.children, [("title", "a"), ("body", "b"), ("body", "c"), ("body", "d")])
+
+        # different connectors are not flattened
+        result = query.optimize_q(Q(title="a") | (Q(body="b") & Q(body="c")))
+        self.assertEqual(len(result.children), 2)
+        self.assertQueryEqual(result.children[1], Q(body="b") & Q(body="c"))
+
+        # neither are negated nodes
+        result = query.optimize_q(Q(title="a") | ~(Q(body="b") | Q(body="c")))
+        self.assertEqual(len(result.children), 2)
+        self.assertTrue(result.children[1].negated)
+
+    def test_duplicates(self):
+        result = query.optimize_q(Q(title__icontains="a") | Q(body__icontains="a") | Q(title__icontains="a"))
+        self.assertEqual(result.children, [("title__icontains", "a"), ("body__icontains", "a")])
+
+        title_or_body = Q(title="a") | Q(body="a")
+        result = query.optimize_q(title_or_body & (Q(body="a") | Q(title="a")) & title_or_body)
+        self.assertEqual(len(result.children), 2)
+
+    def test_merge_in(self):
+        result = query.optimize_q(Q(id__exact=1) | (Q(id__exact=2) | Q(title__icontains="blue")) | Q(id__exact=1))
+        self.assertEqual(result.children, [("id__in", [1, 2]), ("title__icontains", "blue")])
+
+        result = query.optimize_q(Q(id__in=[1, 2]) | Q(id__exact=3) | Q(id__in=[2, 4]))
+        self.assertEqual(result.children, [("id__in", [1, 2, 3, 4])])
+
+    def test_merge_in__iexact(self):
+        result = query.optimize_q(Q(isbn__iexact="123") | Q(isbn__iexact="456"))
+        self.assertEqual(result.children, [("isbn__in", ["123", "456"])])
+
+        # values with case can not be compared with `in`
+        result = query.optimize_q(Q(email__iexact="a@b.c") | Q(email__iexact="456"))
+        self.assertEqual(result.children, [("email__iexact", "a@b.c"), ("email__iexact", "456")])
+
+    def test_merge_in__only_or(self):
+        result = query.optimize_q(Q(id__exact=1) & Q(id__exact=2))
+        self.assertEqual(result.children, [("id__exact", 1), ("id__exact", 2)])
+
+    def test_same_results(self):
+        blue = Article.objects.create(title="Kind of Blue")
+        steps = Article.objects.create(title="Giant Steps")
+        Article.objects.create(title="Bitches Brew")
+        original = Q(id__exact=blue.pk) | (Q(id__exact=steps.pk) | Q(title__icontains="brew")) | Q(id__exact=blue.pk)
+        self.assertEqual(list(Article.objects.filter(original)),
+                         list(Article.objects.filter(query.optimize_q(original))))
+
+
+class CountClausesTests(TestCase):
+    def test_count(self):
+        self.assertEqual(query.count_clauses(Q(id__in=[1, 2]) | Q(title__icontains="blue")), 2)
+        self.assertEqual(query.count_clauses(Q(id=1) & (Q(title="a") | ~Q(title="b"))), 3)
+        self.assertEqual(query.count_clauses(Q()), 0)
+
+
+class QueryLookupsTests(TestCase):
+    def test_lookups(self):
+        lookups = query.query_lookups(Q(id__in=[1, 2]) | (Q(user__email="a") & ~Q(title__icontains="blue")))
+        self.assertEqual(list(lookups), ["id__in", "user__email", "title__icontains"])
+        self.assertEqual(list(query.query_lookups(Q())), [])
+
+
+class SimplifySearchTests(TestCase):
+    def test_flatten(self):
+        tree = query.AndNode(Q(a=1), query.AndNode(Q(b=1), query.AndNode(Q(c=1))))
+        self.assertEqual(query.simplify_search(tree), query.AndNode(Q(a=1), Q(b=1), Q(c=1)))
+
+    def test_duplicates(self):
+        tree = query.OrNode(Q(a=1), query.OrNode(Q(a=1), Q(b=1)), Q(b=1))
+        self.assertEqual(query.simplify_search(tree), query.OrNode(Q(a=1), Q(b=1)))
+        self.assertEqual(query.simplify_search(query.AndNode(Q(a=1), Q(a=1))), Q(a=1))
+
+    def test_never(self):
+        never = query.OrNode()
+        self.assertEqual(query.simplify_search(query.OrNode(never, Q(a=1))), Q(a=1))
+        self.assertTrue(query.never(query.simplify_search(query.AndNode(Q(a=1), query.OrNode(never, never)))))
+        self.assertTrue(query.always(query.simplify_search(query.NotNode(never))))
+        self.assertTrue(query.always(query.simplify_search(query.OrNode(Q(a=1), query.NotNode(never)))))
+        self.assertEqual(query.simplify_search(query.AndNode(Q(a=1), query.NotNode(never))), Q(a=1))
+
+    def test_not(self):
+        self.assertEqual(query.simplify_search(query.NotNode(query.NotNode(Q(a=1)))), Q(a=1))
+        self.assertEqual(query.simplify_search(query.NotNode(query.OrNode(Q(a=1)))), query.NotNode(Q(a=1)))
+
+
+class CompileSearchTests(TestCase):
+    def test_compile(self):
+        tree = query.AndNode(query.OrNode(Q(a=1), Q(b=1)), query.NotNode(Q(c=1)))
+        self.assertEqual(query.compile_search(tree), (Q(a=1) | Q(b=1)) & ~Q(c=1))
+        self.assertEqual(query.compile_search(query.AndNode()), Q())
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            query.compile_search(query.AndNode(Q(a=1), query.OrNode()))
+        with self.assertRaises(ValueError):
+            query.compile_search(query.LeafNode("blue"))
+
+    def test_same_results(self):
+        blue = Article.objects.create(title="Kind of Blue")
+        Article.objects.create(title="Blue Train")
+        steps = Article.objects.create(title="Giant Steps")
+        tree = query.OrNode(query.AndNode(Q(title__icontains="blue"), query.NotNode(Q(title__icontains="train"))),
+                            Q(title__icontains="steps"), query.OrNode())
+        result = Article.objects.filter(query.compile_search(query.simplify_search(tree)))
+        self.assertEqual(list(result), [blue, steps])
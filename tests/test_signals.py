@@ -0,0 +1,37 @@
+# coding=utf-8
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from drf_search import signals
+from django.test import TestCase
+
+
+class SearchMetricsTests(TestCase):
+    def test_phase(self):
+        metrics = signals.SearchMetrics()
+        with metrics.phase("build"):
+            pass
+        with metrics.phase("build"):
+            pass
+        self.assertEqual(list(metrics.timings.keys()), ["build"])
+        self.assertGreaterEqual(metrics.timings["build"], 0)
+
+    def test_phase__error(self):
+        metrics = signals.SearchMetrics()
+        with self.assertRaises(ValueError):
+            with metrics.phase("validate"):
+                raise ValueError()
+        self.assertIn("validate", metrics.timings)
+
+    def test_record_validation(self):
+        metrics = signals.SearchMetrics()
+        metrics.record_validation("title", True)
+        metrics.record_validation("title", False)
+        metrics.record_validation("id", False)
+        self.assertEqual(dict(metrics.validations), {"title": [1, 1], "id": [0, 1]})
+
+    def test_null_phase(self):
+        with signals.NULL_PHASE as phase:
+            self.assertIs(phase, signals.NULL_PHASE)
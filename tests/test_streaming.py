@@ -0,0 +1,76 @@
+# coding=utf-8
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import json
+from drf_search import streaming
+from django.db import connection
+from django.db.models import Q
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from .models import Article
+
+
+class ParseOrderingTests(TestCase):
+    def test_default(self):
+        self.assertEqual(streaming.parse_ordering(None), [("pk", False)])
+
+    def test_ends_with_pk(self):
+        self.assertEqual(streaming.parse_ordering(["-title", "body"]),
+                         [("title", True), ("body", False), ("pk", False)])
+        self.assertEqual(streaming.parse_ordering(["title", "-id"]), [("title", False), ("id", True)])
+
+    def test_random(self):
+        with self.assertRaises(ValueError):
+            streaming.parse_ordering(["?"])
+
+
+class KeysetQueryTests(TestCase):
+    def test_single(self):
+        self.assertEqual(streaming.keyset_query([("pk", False)], [4]), Q(pk__gt=4))
+
+    def test_multiple(self):
+        self.assertEqual(streaming.keyset_query([("title", True), ("pk", False)], ["blue", 4]),
+                         Q(title__lt="blue") | Q(title="blue", pk__gt=4))
+
+
+class IterKeysetTests(TestCase):
+    def setUp(self):
+        self.articles = list(Article.objects.create(title=title) for title in ["b", "a", "c", "a", "b"])
+
+    def test_chunks(self):
+        chunks = list(streaming.iter_keyset(Article.objects.all(), chunk_size=2))
+        self.assertEqual(list(len(chunk) for chunk in chunks), [2, 2, 1])
+        self.assertEqual(sum(chunks, []), self.articles)
+
+    def test_ordering(self):
+        rows = sum(streaming.iter_keyset(Article.objects.all(), ["-title"], chunk_size=2), [])
+        articles = self.articles
+        self.assertEqual(rows, [articles[2], articles[0], articles[4], articles[1], articles[3]])
+
+    def test_no_offset(self):
+        with CaptureQueriesContext(connection) as queries:
+            rows = sum(streaming.iter_keyset(Article.objects.all(), ["title"], chunk_size=2), [])
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(len(queries), 3)
+        self.assertFalse(any("OFFSET" in query["sql"] for query in queries))
+
+    def test_fields(self):
+        rows = sum(streaming.iter_keyset(Article.objects.all(), ["title"], chunk_size=2, fields=["title"]), [])
+        self.assertEqual(rows, list({"title": title} for title in ["a", "a", "b", "b", "c"]))
+
+    def test_exact_chunks(self):
+        chunks = list(streaming.iter_keyset(Article.objects.all(), chunk_size=5))
+        self.assertEqual(len(chunks), 1)
+
+    def test_empty(self):
+        self.assertEqual(list(streaming.iter_keyset(Article.objects.none())), [])
+
+
+class JsonLinesTests(TestCase):
+    def test_lines(self):
+        lines = list(streaming.json_lines([{"id": 1}, {"id": 2}]))
+        self.assertEqual(list(json.loads(line) for line in lines), [{"id": 1}, {"id": 2}])
+        self.assertTrue(all(line.endswith("\n") for line in lines))
@@ -0,0 +1,115 @@
+# coding=utf-8
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from io import StringIO
+from drf_search import filters, fields, trigrams
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from .models import Article
+from .utils import mock_request
+
+
+class TrigramArticleFilter(filters.BaseSearchFilter):
+    title = fields.SearchField("title", default=True, trigrams=True)
+    body = fields.SearchField("body", match_case=True, trigrams=True)
+    exact = fields.SearchField("title", field_lookup="iexact", trigrams=True)
+
+
+class TrigramFieldTests(TestCase):
+    def test_constructed(self):
+        self.assertEqual(fields.SearchField("title", trigrams=True).constructed, "title__trigram_icontains")
+        self.assertEqual(fields.SearchField("title", match_case=True, trigrams=True).constructed,
+                         "title__trigram_contains")
+        self.assertEqual(fields.SearchField("title", field_lookup="iexact", trigrams=True).constructed,
+                         "title__iexact")
+        self.assertEqual(fields.SearchField("title").constructed, "title__icontains")
+
+    def test_compares_text(self):
+        self.assertTrue(fields.SearchField("title", trigrams=True).freeze().compares_text)
+
+
+class TrigramIndexTests(TestCase):
+    def setUp(self):
+        self.index = trigrams.TrigramIndex(Article, ["title", "body"])
+        self.index.create()
+        self.addCleanup(self.index.drop)
+        self.kind_of_blue = Article.objects.create(title="Kind of Blue", body="Miles Davis")
+        self.index.rebuild()
+        self.index.connect()
+        self.addCleanup(self.index.disconnect)
+        self.blue_train = Article.objects.create(title="Blue Train", body="John Coltrane")
+        self.giant_steps = Article.objects.create(title="Giant Steps", body="John Coltrane")
+
+    def search(self, search):
+        return list(TrigramArticleFilter().filter_queryset(mock_request(search), Article.objects.all()))
+
+    def test_rows(self):
+        rows = self.index.trigram_model.objects.filter(object_id=self.kind_of_blue.pk, field_name="title")
+        self.assertEqual(sorted(rows.values_list("trigram", flat=True)),
+                         sorted(["kin", "ind", "nd ", "d o", " of", "of ", "f b", " bl", "blu", "lue"]))
+
+    def test_lookup(self):
+        with CaptureQueriesContext(connection) as queries:
+            results = list(Article.objects.filter(title__trigram_icontains="BLUE"))
+        self.assertEqual(results, [self.kind_of_blue, self.blue_train])
+        self.assertIn(self.index.table, queries[0]["sql"])
+        self.assertEqual(list(Article.objects.filter(title__trigram_icontains="blues")), [])
+
+    def test_verified(self):
+        # every trigram of the term is in the title, but the term itself is not
+        self.assertEqual(list(Article.objects.filter(title__trigram_icontains="bluelue")), [])
+        self.assertEqual(list(Article.objects.filter(body__trigram_contains="John")),
+                         [self.blue_train, self.giant_steps])
+
+    def test_short_term(self):
+        self.assertEqual(list(Article.objects.filter(title__trigram_icontains="ue")),
+                         [self.kind_of_blue, self.blue_train])
+
+    def test_search(self):
+        self.assertEqual(self.search("title: train"), [self.blue_train])
+        self.assertEqual(self.search("body: Coltrane"), [self.blue_train, self.giant_steps])
+        self.assertEqual(self.search("exact: blue train"), [self.blue_train])
+
+    def test_signals(self):
+        self.blue_train.title = "Blue Monk"
+        self.blue_train.save()
+        self.kind_of_blue.delete()
+        self.assertEqual(self.search("title: blue"), [self.blue_train])
+        self.assertEqual(self.search("title: train"), [])
+        self.assertFalse(self.index.trigram_model.objects.filter(object_id=self.kind_of_blue.pk).exists())
+
+    def test_rebuild(self):
+        Article.objects.filter(pk=self.giant_steps.pk).update(title="Giant Train")
+        self.assertEqual(self.search("title: train"), [self.blue_train])
+        self.index.rebuild()
+        self.assertEqual(self.search("title: train"), [self.blue_train, self.giant_steps])
+
+    def test_not_indexed(self):
+        trigrams.TrigramIndex(Article, ["body"]).unregister()
+        with CaptureQueriesContext(connection) as queries:
+            results = list(Article.objects.filter(body__trigram_icontains="john"))
+        self.assertEqual(results, [self.blue_train, self.giant_steps])
+        self.assertNotIn(self.index.table, queries[0]["sql"])
+        self.assertEqual(self.search("title: train"), [self.blue_train])
+
+    def test_not_rebuilt(self):
+        self.index.drop()
+        trigrams.TrigramIndex(Article, ["title"]).create()
+        self.assertEqual(list(Article.objects.filter(title__trigram_icontains="blue")),
+                         [self.kind_of_blue, self.blue_train])
+
+    def test_disconnect(self):
+        self.index.disconnect()
+        self.assertNotIn(self.index.table, str(Article.objects.filter(title__trigram_icontains="blue").query))
+
+    def test_command(self):
+        Article.objects.filter(pk=self.giant_steps.pk).update(title="Giant Train")
+        out = StringIO()
+        call_command("rebuild_trigrams", "tests.Article", "title", "body", stdout=out)
+        self.assertIn("tests.Article", out.getvalue())
+        self.assertEqual(self.search("title: train"), [self.blue_train, self.giant_steps])
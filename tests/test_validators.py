@@ -4,6 +4,7 @@ from __future__ import division
 from __future__ import print_function
 from __future__ import unicode_literals
 
+import mock
 from drf_search import validators
 from django.test import TestCase
 
@@ -19,6 +20,45 @@ class ValidateNumericalTests(TestCase):
         self.assertFalse(validators.validate_numerical((123,)))
 
 
+class ParseComparisonTests(TestCase):
+    def test_parse(self):
+        self.assertEqual(validators.parse_comparison("100..200"), ("range", ("100", "200")))
+        self.assertEqual(validators.parse_comparison(" 1.5 .. 2.5 "), ("range", ("1.5", "2.5")))
+        self.assertEqual(validators.parse_comparison(">500"), ("gt", "500"))
+        self.assertEqual(validators.parse_comparison(">= 500"), ("gte", "500"))
+        self.assertEqual(validators.parse_comparison("<10"), ("lt", "10"))
+        self.assertEqual(validators.parse_comparison("<=10"), ("lte", "10"))
+
+    def test_not_comparison(self):
+        self.assertIsNone(validators.parse_comparison("100"))
+        self.assertIsNone(validators.parse_comparison(">"))
+        self.assertIsNone(validators.parse_comparison("100.."))
+        self.assertIsNone(validators.parse_comparison("..200"))
+        self.assertIsNone(validators.parse_comparison(100))
+
+
+class ValidateComparisonTests(TestCase):
+    def test_numerical(self):
+        self.assertTrue(validators.validate_numerical_comparison("123"))
+        self.assertTrue(validators.validate_numerical_comparison("100..200"))
+        self.assertTrue(validators.validate_numerical_comparison("<=10"))
+        self.assertTrue(validators.validate_numerical_comparison(validators.SearchTerm(">500")))
+        self.assertFalse(validators.validate_numerical_comparison("1.5..2"))
+        self.assertFalse(validators.validate_numerical_comparison(">jazz"))
+        self.assertFalse(validators.validate_numerical_comparison("jazz"))
+
+    def test_decimal(self):
+        self.assertTrue(validators.validate_decimal("-1.5"))
+        self.assertTrue(validators.validate_decimal(".5"))
+        self.assertTrue(validators.validate_decimal(3))
+        self.assertFalse(validators.validate_decimal(True))
+        self.assertFalse(validators.validate_decimal("NaN"))
+        self.assertFalse(validators.validate_decimal("1e5"))
+        self.assertTrue(validators.validate_decimal_comparison("-1.5..2.5"))
+        self.assertTrue(validators.validate_decimal_comparison(">0.5"))
+        self.assertFalse(validators.validate_decimal_comparison("a..b"))
+
+
 class ValidateBooleanTests(TestCase):
     def test_validate(self):
         # with boolean True
@@ -59,3 +99,57 @@ class ValidateListTests(TestCase):
 
         self.assertFalse(validators.validate_list(123))
         self.assertFalse(validators.validate_list("jazz"))
+
+
+class ValidateNoWhitespaceTests(TestCase):
+    def test_validate(self):
+        self.assertTrue(validators.validate_no_whitespace("miles.davis"))
+        self.assertTrue(validators.validate_no_whitespace(" miles.davis "))
+        self.assertFalse(validators.validate_no_whitespace("miles davis"))
+        self.assertFalse(validators.validate_no_whitespace(validators.SearchTerm("miles davis")))
+
+
+class SearchTermTests(TestCase):
+    def test_profile(self):
+        term = validators.SearchTerm("123")
+        self.assertEqual(term, "123")
+        self.assertTrue(term.is_digit)
+        self.assertFalse(term.is_boolean)
+        self.assertFalse(term.is_email)
+        self.assertEqual(term.json_list, None)
+        self.assertFalse(term.has_whitespace)
+
+        term = validators.SearchTerm("TRUE")
+        self.assertFalse(term.is_digit)
+        self.assertTrue(term.is_boolean)
+
+        term = validators.SearchTerm("miles.davis@jazz.com")
+        self.assertTrue(term.is_email)
+
+        term = validators.SearchTerm("[1, 2, 3]")
+        self.assertEqual(term.json_list, [1, 2, 3])
+        self.assertTrue(term.has_whitespace)
+
+    def test_computed_once(self):
+        term = validators.SearchTerm("[1, 2, 3]")
+        with mock.patch("drf_search.validators.json.loads") as mock_loads:
+            mock_loads.return_value = [1, 2, 3]
+            self.assertTrue(validators.validate_list(term))
+            self.assertTrue(validators.validate_list(term))
+            self.assertEqual(mock_loads.call_count, 1)
+
+    def test_validate(self):
+        validator = mock.Mock(return_value=True)
+        term = validators.SearchTerm("miles")
+        self.assertTrue(term.validate(validator))
+        self.assertTrue(term.validate(validator))
+        validator.assert_called_once_with(term)
+
+    def test_builtin_validators(self):
+        """The builtin validators agree with themselves whether or not they are passed a SearchTerm"""
+        values = ["123", "abc", "true", "0", "miles.davis@jazz.com", "miles davis", "[1, 2]", '{"a": 1}', "jazz"]
+        builtins = [validators.validate_string, validators.validate_numerical, validators.validate_list,
+                    validators.validate_boolean, validators.validate_email, validators.validate_no_whitespace]
+        for value in values:
+            for validator in builtins:
+                self.assertEqual(bool(validator(value)), bool(validator(validators.SearchTerm(value))))
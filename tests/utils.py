@@ -0,0 +1,12 @@
+# coding=utf-8
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import mock
+
+
+def mock_request(search, **params):
+    params["search"] = search
+    return mock.Mock(query_params=params)